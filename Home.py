@@ -1,6 +1,11 @@
 import streamlit as st
 import leafmap.foliumap as leafmap
 
+from utils import tracing
+from utils.map_cache import map_to_streamlit
+
+tracing.set_page("Home")
+
 st.set_page_config(layout="wide")
 
 # Customize the sidebar
@@ -35,4 +40,5 @@ st.markdown(markdown)
 
 m = leafmap.Map(minimap_control=True)
 m.add_basemap("SATELLITE")
-m.to_streamlit(height=500)
\ No newline at end of file
+map_to_streamlit(m, height=500)
+tracing.perf_panel()
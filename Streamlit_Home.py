@@ -3,6 +3,15 @@ import leafmap.foliumap as leafmap
 # import geemap.foliumap as geemap
 import ee
 
+from utils import ee_auth, tracing
+from utils.ee_cache import tile_url
+from utils.layers import SNOW_COVER_VIS, snow_cover, us_states_outline, world_countries_outline
+from utils.map_cache import map_to_streamlit
+from utils.warmup import readiness_indicator, start_warmup
+
+tracing.instrument_ee()
+tracing.set_page("Home")
+
 
 # AUTHENTICATE AND INITIALIZE EARTH ENGINE-----------------------------------------------------------------------
 import json, os
@@ -32,19 +41,21 @@ project = st.secrets.get("ee_project") or os.environ.get("EE_PROJECT")
 creds = _get_oauth_credentials()
 
 if creds and project:
-    ee.Initialize(credentials=creds, project=project)
+    ee_auth.initialize(credentials=creds, project=project)
 else:
     # Local interactive fallback only (won't work on Streamlit Cloud)
     try:
-        ee.Initialize(project=project)
+        ee_auth.initialize(project=project)
     except Exception:
         ee.Authenticate()
-        ee.Initialize(project=project)
+        ee_auth.initialize(project=project)
 
 # AUTHENTICATE AND INITIALIZE EARTH ENGINE (end)-------------------------------------------------------------------
 
 
 st.set_page_config(layout="wide")
+start_warmup()
+readiness_indicator("home")
 
 # Customize the sidebar
 # To return to my personal website follow this link: https://willnelsonsworld-production.up.railway.app/
@@ -79,37 +90,16 @@ Enjoy this first Map as it shows up-to-date information about global snow cover!
 
 st.markdown(markdown)
 
-MapS = leafmap.Map()
-
-# Build an ee.Image (not ImageCollection)
-snowCover = (
-    ee.ImageCollection("MODIS/061/MOD10A1")
-      .filterDate("2025-12-28", "2026-01-05")
-      .select("NDSI_Snow_Cover")
-      .mosaic()
-)
-
-snowCoverVis = {
-    "min": 0,
-    "max": 100,
-    "palette": ["000000", "0dffff", "0524ff", "ffffff"],
-}
-
-collection = ee.FeatureCollection("TIGER/2018/States")
-country = ee.FeatureCollection("users/giswqs/public/countries")
-
-style_us = {"color": "yellow", "width": 2, "fillColor": "00000000"}
-style_world = {"color": "cyan", "width": 2, "fillColor": "00000000"}
-
 MapS = leafmap.Map()
 MapS.set_center(-95.13, 43.35, 4)
 MapS.add_basemap("SATELLITE")
 
-# Add EE layers
-MapS.add_ee_layer(ee_object=snowCover, vis_params=snowCoverVis, name="Snow Cover")
-MapS.add_ee_layer(ee_object=collection.style(**style_us), vis_params={}, name="US States")
-MapS.add_ee_layer(ee_object=country.style(**style_world), vis_params={}, name="World Countries")
+# Add EE layers (map IDs from the shared cache)
+MapS.add_tile_layer(tile_url(snow_cover(), SNOW_COVER_VIS), name="Snow Cover", attribution="Google Earth Engine")
+MapS.add_tile_layer(tile_url(us_states_outline()), name="US States", attribution="Google Earth Engine")
+MapS.add_tile_layer(tile_url(world_countries_outline()), name="World Countries", attribution="Google Earth Engine")
 
 
 MapS.add_layer_control()
-MapS.to_streamlit(height=700) 
\ No newline at end of file
+map_to_streamlit(MapS, height=700)
+tracing.perf_panel()
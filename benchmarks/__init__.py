@@ -0,0 +1 @@
+"""Benchmarks; run each module from the repository root with ``python -m benchmarks.<name>``."""
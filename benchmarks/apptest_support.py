@@ -0,0 +1,167 @@
+"""
+Helpers for driving the pages headlessly with Streamlit's ``AppTest`` against
+the fake Earth Engine backend (``benchmarks.fake_ee``).
+
+Import this module before anything imports ``ee``; it installs the fake.
+"""
+import json
+import logging
+import os
+import tempfile
+
+from benchmarks import fake_ee
+
+fake_ee.install()
+# Pages start the background layer warm-up; keep it out of per-run call counts
+# unless a benchmark asks for it.
+os.environ.setdefault("WARMUP_ENABLED", "0")
+# Local-engine stacks go to a private directory that clear_caches() empties.
+os.environ.setdefault("NLCD_LOCAL_CACHE_DIR", tempfile.mkdtemp(prefix="bench_nlcd_stacks_"))
+
+import streamlit as st  # noqa: E402
+import streamlit_folium  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {
+    "home": "Streamlit_Home.py",
+    "heatmap": "pages/1_🌡️_Heatmap2.py",
+    "lake_recession": "pages/2_🚤_Lake_Recession.py",
+    "land_use": "pages/3_📊_Land_Use_Change.py",
+    "basemaps": "pages/4_🗺️_Basemaps.py",
+}
+
+FAKE_SECRETS = {
+    "ee_private_key": json.dumps({
+        "client_id": "fake-client",
+        "client_secret": "fake-secret",
+        "refresh_token": "fake-token",
+        "scopes": ["https://www.googleapis.com/auth/earthengine"],
+    }),
+    "ee_project": "fake-project",
+}
+
+# Session-state key the patched st_folium reads a simulated drawing from.
+DRAWING_KEY = "_bench_drawing"
+
+# Land Use "Statistics engine" option for the local NumPy engine (ENGINE_LOCAL on the page).
+ENGINE_LOCAL = "Local NumPy (download pixels once)"
+
+LAKES = ("Lake Mead, NV", "Salton Sea, CA", "Great Salt Lake, UT", "Aral Sea, Kazakhstan/Uzebekistan")
+
+_real_st_folium = streamlit_folium.st_folium
+
+
+def _st_folium_with_drawing(*args, **kwargs):
+    """st_folium that reports the session's simulated drawing, like a browser would."""
+    result = _real_st_folium(*args, **kwargs)
+    geom = st.session_state.get(DRAWING_KEY)
+    if geom is None:
+        return result
+    result = dict(result or {})
+    result["all_drawings"] = [{"type": "Feature", "properties": {}, "geometry": geom}]
+    return result
+
+
+streamlit_folium.st_folium = _st_folium_with_drawing
+
+
+def quiet_streamlit_logs():
+    """Silence per-run deprecation/bare-mode warnings that drown benchmark output."""
+    for name in ("streamlit", "streamlit.runtime", "streamlit.elements"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+
+def clear_caches():
+    """Reset every in-process cache so the next run is a cold start."""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    from utils.map_cache import map_html_cache
+    from utils.nlcd_local import CACHE_DIR, evict_stacks
+    from utils.shared_cache import MemoryBackend, shared_cache
+
+    map_html_cache.clear()
+    evict_stacks(CACHE_DIR, max_bytes=0)
+    shared_cache.clear_local()
+    if isinstance(shared_cache.backend, MemoryBackend):
+        shared_cache.backend = MemoryBackend()
+
+
+def install_global_secrets():
+    """
+    Make the fake secrets the process-wide ``st.secrets``. Needed when several
+    AppTests run concurrently: per-test secrets are swapped in and out of the
+    global on every run, which races between threads.
+    """
+    from streamlit.runtime.secrets import Secrets
+
+    secrets = Secrets()
+    secrets._secrets = dict(FAKE_SECRETS)
+    st.secrets = secrets
+
+
+def new_app(page: str, timeout: float = 300, with_secrets: bool = True) -> AppTest:
+    path = os.path.join(REPO_ROOT, PAGES.get(page, page))
+    at = AppTest.from_file(path, default_timeout=timeout)
+    if with_secrets:
+        for k, v in FAKE_SECRETS.items():
+            at.secrets[k] = v
+    return at
+
+
+def square_roi(lon: float = -95.0, lat: float = 38.0, size_deg: float = 0.05) -> dict:
+    return {
+        "type": "Polygon",
+        "coordinates": [[
+            [lon, lat], [lon + size_deg, lat], [lon + size_deg, lat + size_deg], [lon, lat + size_deg], [lon, lat],
+        ]],
+    }
+
+
+def _by_label(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+def draw_roi(at: AppTest, geom: dict = None) -> AppTest:
+    """Simulate drawing ``geom`` on the Land Use map (takes effect on the next run)."""
+    at.session_state[DRAWING_KEY] = geom or square_roi()
+    return at
+
+
+def submit_stats(at: AppTest, histogram=True, pie_chart=True, scatter_plot=True, engine=None) -> AppTest:
+    """Tick the Land Use stats options and press Submit (takes effect on the next run)."""
+    _by_label(at.checkbox, "Histogram").set_value(histogram)
+    _by_label(at.checkbox, "Pie Chart").set_value(pie_chart)
+    _by_label(at.checkbox, "Scatter Plot").set_value(scatter_plot)
+    if engine is not None:
+        _by_label(at.radio, "Statistics engine").set_value(engine)
+    _by_label(at.button, "Submit").click()
+    return at
+
+
+def select_lake(at: AppTest, lake: str) -> AppTest:
+    """Pick a lake on the Lake Recession page (takes effect on the next run)."""
+    _by_label(at.selectbox, "Which lake would you like to view?").set_value(lake)
+    return at
+
+
+def select_year(at: AppTest, year: str, animate: bool = False) -> AppTest:
+    """Pick the NLCD year (and slider mode) on the Land Use map (takes effect on the next run)."""
+    _by_label(at.selectbox, "Select a Year to View").set_value(year)
+    _by_label(at.toggle, "Year slider / animation on the map").set_value(animate)
+    return at
+
+
+def select_region(at: AppTest, state_fips: str, county_fips: str = None) -> AppTest:
+    """Pick a state (and county) from the region index on the Land Use page; needs two runs for a county."""
+    _by_label(at.selectbox, "Or pick a state / county (precomputed stats)").set_value(state_fips)
+    if county_fips is not None:
+        _by_label(at.selectbox, "County").set_value(county_fips)
+    return at
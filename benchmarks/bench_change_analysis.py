@@ -0,0 +1,86 @@
+"""
+Micro-benchmark: vectorized change analysis vs. the old row-wise pandas path.
+
+    python -m benchmarks.bench_change_analysis --rois 5000
+
+The old path (``DataFrame.apply(axis=1)`` plus a per-class ``.loc`` lookup)
+is timed on a sample of ROIs and extrapolated, since running it on thousands
+of ROIs takes minutes.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.change_analysis import ChangeAnalysis
+from utils.nlcd import NLCD_CODES, YEARS
+
+
+def synthetic_areas(n_rois: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    areas = rng.gamma(1.0, 5.0, size=(n_rois, len(YEARS), len(NLCD_CODES)))
+    areas[rng.random(areas.shape) < 0.2] = 0.0  # classes absent from some ROIs/years
+    return areas
+
+
+def rowwise_pct_change(a1: np.ndarray, a2: np.ndarray) -> dict:
+    """Previous page logic for one ROI and one year pair."""
+    compare = pd.DataFrame({
+        "class_key": [f"Class_{c}" for c in NLCD_CODES],
+        "area_km2_y1": a1,
+        "area_km2_y2": a2,
+    })
+    compare["pct_change"] = compare.apply(
+        lambda r: ((r["area_km2_y2"] - r["area_km2_y1"]) / r["area_km2_y1"] * 100.0)
+        if r["area_km2_y1"] > 0 else None,
+        axis=1,
+    )
+    out = {}
+    for c in NLCD_CODES:
+        row = compare.loc[compare["class_key"] == f"Class_{c}"]
+        out[c] = row["pct_change"].values[0]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rois", type=int, default=5000)
+    parser.add_argument("--sample", type=int, default=50, help="ROIs timed on the row-wise path")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    areas = synthetic_areas(args.rois)
+    n_pairs = len(YEARS) * len(YEARS)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        result = ChangeAnalysis(areas, YEARS)
+        best = min(best, time.perf_counter() - t0)
+
+    sample = min(args.sample, args.rois)
+    t0 = time.perf_counter()
+    for r in range(sample):
+        rowwise_pct_change(areas[r, 0], areas[r, -1])
+    rowwise_per_pair = (time.perf_counter() - t0) / sample
+
+    # Same numbers either way.
+    check = rowwise_pct_change(areas[0, 0], areas[0, -1])
+    vec = result.pct_change[0, 0, -1]
+    for k, c in enumerate(NLCD_CODES):
+        expected = check[c]
+        assert (expected is None or np.isnan(expected)) == np.isnan(vec[k]) and (
+            np.isnan(vec[k]) or np.isclose(expected, vec[k])
+        )
+
+    vec_per_pair = best / (args.rois * n_pairs)
+    print(f"ROIs: {args.rois}  years: {len(YEARS)}  classes: {len(NLCD_CODES)}  year pairs: {n_pairs}")
+    print(f"vectorized, all ROIs x all pairs: {best * 1e3:9.2f} ms  ({vec_per_pair * 1e6:.3f} µs per ROI-pair)")
+    print(f"row-wise, per ROI-pair:           {rowwise_per_pair * 1e3:9.2f} ms  (sampled on {sample} ROIs)")
+    print(f"row-wise, extrapolated:           {rowwise_per_pair * args.rois * n_pairs:9.2f} s")
+    print(f"speed-up:                         {rowwise_per_pair / vec_per_pair:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
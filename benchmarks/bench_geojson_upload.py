@@ -0,0 +1,102 @@
+"""
+Peak RSS of GeoJSON upload parsing vs. file size.
+
+    python -m benchmarks.bench_geojson_upload --sizes 10 50 200
+
+For each target size (MB) a synthetic FeatureCollection of parcel-like
+polygons is written to a temp file, then each parser runs in a fresh
+subprocess that loads the file into a BytesIO first (as Streamlit's
+UploadedFile does). The reported peak RSS therefore includes the upload
+bytes themselves for both parsers.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def write_parcels(path: str, target_mb: float, seed: int = 0):
+    """Small star-shaped (valid) 12-vertex polygons spread over a county-sized box."""
+    rng = random.Random(seed)
+    target = int(target_mb * 1024 * 1024)
+    with open(path, "w") as f:
+        f.write('{"type": "FeatureCollection", "features": [')
+        first = True
+        while f.tell() < target:
+            x0 = -95 + rng.random()
+            y0 = 38 + rng.random()
+            ring = []
+            for k in range(11):
+                angle = 2 * math.pi * k / 11
+                r = 0.0002 + 0.0003 * rng.random()
+                ring.append([round(x0 + r * math.cos(angle), 7), round(y0 + r * math.sin(angle), 7)])
+            ring.append(ring[0])
+            feature = {
+                "type": "Feature",
+                "properties": {"parcel_id": rng.randrange(10**9), "owner": "x" * 24},
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            }
+            f.write(("" if first else ",") + json.dumps(feature))
+            first = False
+        f.write("]}")
+
+
+def _child(mode: str, path: str):
+    with open(path, "rb") as f:
+        upload = io.BytesIO(f.read())
+    t0 = time.perf_counter()
+    if mode == "json":
+        data = json.loads(upload.getvalue().decode("utf-8"))
+        n = sum(1 for feat in data["features"] if feat.get("geometry"))
+    else:
+        from utils.geojson_stream import iter_upload_geometries
+
+        n = sum(1 for _ in iter_upload_geometries(upload, max_features=10**9, max_memory_bytes=2**40))
+    elapsed = time.perf_counter() - t0
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    print(json.dumps({"features": n, "seconds": elapsed, "peak_rss_mb": peak_mb}))
+
+
+def _run(mode: str, path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_geojson_upload", "--child", mode, path],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[10, 50, 200], help="file sizes in MB")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    print(f"{'size MB':>8} {'features':>9} {'json.loads RSS MB':>18} {'stream RSS MB':>14} {'json s':>7} {'stream s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"parcels_{size:g}.geojson")
+            write_parcels(path, size)
+            actual = os.path.getsize(path) / 1024 / 1024
+            old = _run("json", path)
+            new = _run("stream", path)
+            print(
+                f"{actual:8.1f} {new['features']:9d} {old['peak_rss_mb']:18.1f} {new['peak_rss_mb']:14.1f} "
+                f"{old['seconds']:7.2f} {new['seconds']:9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Page-level latency benchmark against the offline Earth Engine stand-in.
+
+    python -m benchmarks.bench_pages                    # compare with baseline
+    python -m benchmarks.bench_pages --update-baseline  # record a new baseline
+    python -m benchmarks.bench_pages --warmup           # cold runs after the layer warm-up
+
+Every page is driven through Streamlit's ``AppTest``. For each scenario the
+suite first makes one unmeasured pass, so module imports are not billed to
+the first cold run, then records a cold run (all in-process caches cleared),
+a warm rerun, and for interactive scenarios one more run after the
+interaction, together with the number of EE calls each run made. With
+``--warmup`` every cold run is preceded by a synchronous ``utils.warmup``
+pass, as after a process start once the background warm-up has finished. The fake EE sleeps for a fixed latency
+per call (see ``--latency-ms``), so call counts dominate the timings.
+
+The exit status is 1 when any run makes more EE calls than the baseline or is
+slower than ``baseline * (1 + tolerance) + slack``.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks import apptest_support as support
+from benchmarks import fake_ee
+
+DEFAULT_LATENCY_MS = {"Initialize": 300, "getMapId": 200, "getInfo": 500, "computePixels": 1000, "getThumbURL": 200}
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "pages.json")
+
+
+def _interact_land_use(at):
+    support.draw_roi(at)
+    at.run()
+    support.submit_stats(at)
+
+
+def _interact_land_use_local(at):
+    support.draw_roi(at)
+    at.run()
+    support.submit_stats(at, engine=support.ENGINE_LOCAL)
+
+
+def _interact_land_use_year(at):
+    support.select_year(at, "2019")
+
+
+def _interact_land_use_slider(at):
+    support.select_year(at, "2011", animate=True)
+
+
+def _interact_lake(at):
+    support.select_lake(at, support.LAKES[1])
+
+
+# name -> (page, interaction applied before the "interaction" run, or None)
+SCENARIOS = {
+    "home": ("home", None),
+    "heatmap": ("heatmap", None),
+    "lake_recession": ("lake_recession", _interact_lake),
+    "land_use": ("land_use", _interact_land_use),
+    "land_use_local": ("land_use", _interact_land_use_local),
+    "land_use_year": ("land_use", _interact_land_use_year),
+    "land_use_slider": ("land_use", _interact_land_use_slider),
+    "basemaps": ("basemaps", None),
+}
+
+
+def _timed_run(at) -> dict:
+    fake_ee.reset_stats()
+    t0 = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(f"page raised: {[e.value for e in at.exception]}")
+    return {"seconds": elapsed, "ee_calls": fake_ee.stats()["total_calls"]}
+
+
+def _throwaway_pass(page: str, interact):
+    """Run the page (and its interaction) once unmeasured, so imports are not billed to the first cold run."""
+    support.clear_caches()
+    at = support.new_app(page)
+    at.run()
+    if interact is not None:
+        interact(at)
+        at.run()
+
+
+def run_scenario(name: str, repeat: int, warmup: bool = False) -> dict:
+    page, interact = SCENARIOS[name]
+    _throwaway_pass(page, interact)
+    samples = {"cold": [], "warm": [], "interaction": []}
+    for _ in range(repeat):
+        support.clear_caches()
+        if warmup:
+            from utils.warmup import Warmup
+
+            Warmup().run()
+        at = support.new_app(page)
+        samples["cold"].append(_timed_run(at))
+        samples["warm"].append(_timed_run(at))
+        if interact is not None:
+            interact(at)
+            samples["interaction"].append(_timed_run(at))
+    return {
+        phase: {
+            "seconds": statistics.median(s["seconds"] for s in runs),
+            "ee_calls": max(s["ee_calls"] for s in runs),
+        }
+        for phase, runs in samples.items()
+        if runs
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, slack: float) -> list:
+    failures = []
+    for name, phases in results.items():
+        for phase, r in phases.items():
+            b = baseline.get(name, {}).get(phase)
+            if b is None:
+                continue
+            if r["ee_calls"] > b["ee_calls"]:
+                failures.append(f"{name}/{phase}: {r['ee_calls']} EE calls > baseline {b['ee_calls']}")
+            limit = b["seconds"] * (1 + tolerance) + slack
+            if r["seconds"] > limit:
+                failures.append(f"{name}/{phase}: {r['seconds']:.3f}s > limit {limit:.3f}s (baseline {b['seconds']:.3f}s)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=json.loads, default=DEFAULT_LATENCY_MS,
+                        help="fake EE latency: a number or a JSON object by call type")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--warmup", action="store_true", help="run the layer warm-up before each cold run")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--slack", type=float, default=0.25, help="allowed absolute slowdown (s)")
+    args = parser.parse_args()
+    if args.warmup and args.update_baseline:
+        parser.error("the baseline is recorded without --warmup")
+
+    support.quiet_streamlit_logs()
+    fake_ee.configure(args.latency_ms)
+
+    results = {name: run_scenario(name, args.repeat, args.warmup) for name in args.scenarios}
+
+    print(f"{'scenario':<16} {'phase':<12} {'seconds':>8} {'EE calls':>9}")
+    for name, phases in results.items():
+        for phase, r in phases.items():
+            print(f"{name:<16} {phase:<12} {r['seconds']:8.3f} {r['ee_calls']:9d}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                existing = json.load(f)
+        existing.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(existing, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("no baseline recorded; run with --update-baseline first")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failures = compare(results, baseline, args.tolerance, args.slack)
+    for failure in failures:
+        print("REGRESSION", failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
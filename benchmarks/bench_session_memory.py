@@ -0,0 +1,102 @@
+"""
+Benchmark: memory held by many idle Land Use sessions, with and without budgets.
+
+    python -m benchmarks.bench_session_memory --sessions 100 --roi-vertices 20000
+
+Every simulated session stores what the Land Use page keeps between reruns: an
+uploaded ROI geometry, the per-year statistics frame and the two-year
+comparison array. They are stored once in plain dicts (what ``st.session_state``
+does) and once in ``utils.session_memory`` with the given budgets. The report
+gives the tracked bytes, the spilled bytes and the RSS growth for each run.
+"""
+import argparse
+import gc
+import math
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import fake_ee
+
+fake_ee.install()
+
+import ee  # noqa: E402
+
+from utils.nlcd import NLCD_CLASSES, NLCD_CODES  # noqa: E402
+from utils.session_memory import MB, SessionMemoryManager, approx_size, process_rss  # noqa: E402
+
+
+def session_objects(i: int, vertices: int) -> dict:
+    angles = np.linspace(0, 2 * math.pi, vertices)
+    ring = np.column_stack([-100 + i * 0.01 + np.cos(angles), 40 + np.sin(angles)]).round(6).tolist()
+    stats = pd.DataFrame({
+        "class_key": list(NLCD_CLASSES),
+        "class_label": list(NLCD_CLASSES.values()),
+        "area_km2": np.random.default_rng(i).random(len(NLCD_CLASSES)),
+    })
+    return {
+        "roi": ee.Geometry({"type": "Polygon", "coordinates": [ring]}),
+        "df_stats_year": stats,
+        "compare_areas": np.random.default_rng(i).random((2, len(NLCD_CODES))),
+        "compare_years": ("2001", "2019"),
+    }
+
+
+def run(label, sessions, vertices, make_store):
+    gc.collect()
+    rss0 = process_rss() or 0
+    t0 = time.perf_counter()
+    stores = []
+    for i in range(sessions):
+        store = make_store(i)
+        for key, value in session_objects(i, vertices).items():
+            store[key] = value
+        stores.append(store)
+    seconds = time.perf_counter() - t0
+    gc.collect()
+    rss = (process_rss() or 0) - rss0
+    return label, seconds, rss, stores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--roi-vertices", type=int, default=20000)
+    parser.add_argument("--session-mb", type=float, default=8)
+    parser.add_argument("--global-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    size = approx_size(session_objects(0, args.roi_vertices)["roi"])
+    print(f"{args.sessions} sessions, ROI of {args.roi_vertices} vertices (~{size / MB:.1f} MB each)")
+
+    print(f"{'store':<16}{'seconds':>9}{'tracked MB':>12}{'spilled MB':>12}{'RSS +MB':>9}")
+    # Bounded run first, so its RSS growth is not hidden by memory the plain run freed.
+    spill_dir = tempfile.mkdtemp(prefix="bench_session_spill_")
+    try:
+        manager = SessionMemoryManager(int(args.session_mb * MB), int(args.global_mb * MB), spill_dir=spill_dir)
+        _, t, rss, stores = run("session_memory", args.sessions, args.roi_vertices,
+                                lambda i: manager.session(f"s{i}"))
+        stats = manager.stats()
+        print(f"{'session_memory':<16}{t:9.2f}{stats['bytes'] / MB:12.1f}"
+              f"{stats['spilled_bytes'] / MB:12.1f}{rss / MB:9.1f}")
+
+        t0 = time.perf_counter()
+        assert stores[0].get("roi") is not None
+        reload_ms = (time.perf_counter() - t0) * 1000
+        del stores
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    _, t, rss, plain = run("session_state", args.sessions, args.roi_vertices, lambda i: {})
+    tracked = sum(approx_size(v) for store in plain for v in store.values())
+    print(f"{'session_state':<16}{t:9.2f}{tracked / MB:12.1f}{0:12.1f}{rss / MB:9.1f}")
+
+    print(f"budgets: {args.session_mb:.0f} MB per session, {args.global_mb:.0f} MB global; "
+          f"{stats['spills']} spills, {stats['drops']} drops")
+    print(f"reloading the oldest session's ROI from disk: {reload_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
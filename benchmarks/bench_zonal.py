@@ -0,0 +1,72 @@
+"""
+Benchmark: per-feature zonal statistics against the offline Earth Engine stand-in.
+
+    python -m benchmarks.bench_zonal --features 250 --years 2001 2019
+
+Compares, for an upload of N features, one grouped ``reduceRegion`` per
+feature per year (what comparing features one at a time costs) with the
+chunked ``reduceRegions`` path in ``utils.zonal``, cold and then from the
+per-feature cache. The fake EE sleeps per call (``--latency-ms``), so the
+number of calls dominates.
+"""
+import argparse
+import time
+
+from benchmarks import fake_ee
+
+fake_ee.install()
+
+import ee  # noqa: E402
+
+from benchmarks.apptest_support import clear_caches, square_roi  # noqa: E402
+from utils.layers import ee_landcover_for_year  # noqa: E402
+from utils.ee_cache import geometry_hash  # noqa: E402
+from utils.zonal import feature_class_areas  # noqa: E402
+
+
+def per_feature_reduce_region(features, years):
+    for _, geom in features:
+        for y in years:
+            lc = ee_landcover_for_year(y).rename("lc").toInt()
+            area = ee.Image.pixelArea().divide(1_000_000).addBands(lc)
+            area.reduceRegion(
+                reducer=ee.Reducer.sum().group(groupField=1, groupName="class"),
+                geometry=ee.Geometry(geom),
+                scale=30,
+            ).get("groups").getInfo()
+
+
+def timed(fn):
+    fake_ee.reset_stats()
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0, fake_ee.stats()["total_calls"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=int, default=250)
+    parser.add_argument("--years", nargs="+", default=["2001", "2019"])
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="fake getInfo latency")
+    parser.add_argument("--baseline-sample", type=int, default=20,
+                        help="features timed on the per-feature path (extrapolated to --features)")
+    args = parser.parse_args()
+
+    fake_ee.configure({"getInfo": args.latency_ms})
+    geoms = [square_roi(-120 + (i % 50) * 0.5, 30 + (i // 50) * 0.5, 0.05) for i in range(args.features)]
+    features = [(geometry_hash(g), g) for g in geoms]
+
+    sample = features[:args.baseline_sample]
+    t, calls = timed(lambda: per_feature_reduce_region(sample, args.years))
+    scale = len(features) / len(sample)
+    print(f"per-feature reduceRegion   {t * scale:8.2f}s {int(calls * scale):6d} calls  (extrapolated)")
+
+    clear_caches()
+    t, calls = timed(lambda: feature_class_areas(features, args.years, ee_landcover_for_year))
+    print(f"chunked reduceRegions      {t:8.2f}s {calls:6d} calls")
+    t, calls = timed(lambda: feature_class_areas(features, args.years, ee_landcover_for_year))
+    print(f"cached                     {t:8.2f}s {calls:6d} calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+Offline stand-in for the ``ee`` (Earth Engine) package.
+
+``install()`` puts a fake ``ee`` module into ``sys.modules`` so the pages (and
+leafmap/geemap) run without credentials or network. Objects are lazy
+expressions like the real client library; only the calls that hit the
+server in real EE do any "work":
+
+- ``Initialize``, ``getInfo``, ``getMapId``, ``getThumbURL`` and
+  ``data.computePixels`` sleep for a configurable latency and are counted.
+- Results are deterministic functions of the expression: map IDs and tile
+  URLs are stable across calls, grouped reducers return synthetic NLCD class
+  areas, and ``computePixels`` returns a synthetic uint8 NLCD stack.
+
+Latency comes from ``configure(latency_ms=...)`` or the ``FAKE_EE_LATENCY_MS``
+environment variable: either a single number for every call type or a JSON
+object such as ``{"getMapId": 300, "getInfo": 800}``.
+
+Install it before anything imports ``ee``:
+
+    from benchmarks import fake_ee
+    fake_ee.install()
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import types
+from collections import Counter
+
+import numpy as np
+
+CALL_TYPES = ("Initialize", "getInfo", "getMapId", "getThumbURL", "computePixels")
+
+DEFAULT_LATENCY_MS = {
+    "Initialize": 0,
+    "getInfo": 0,
+    "getMapId": 0,
+    "getThumbURL": 0,
+    "computePixels": 0,
+}
+
+_lock = threading.Lock()
+_latency_ms = dict(DEFAULT_LATENCY_MS)
+_calls = Counter()
+_wait_s = Counter()
+
+
+def _latency_from_env():
+    raw = os.environ.get("FAKE_EE_LATENCY_MS")
+    if not raw:
+        return {}
+    value = json.loads(raw)
+    if isinstance(value, (int, float)):
+        return {k: value for k in CALL_TYPES}
+    return dict(value)
+
+
+def configure(latency_ms=None):
+    """Set per-call latency (ms): a number for every call type or a dict by call type."""
+    with _lock:
+        if isinstance(latency_ms, (int, float)):
+            latency_ms = {k: latency_ms for k in CALL_TYPES}
+        _latency_ms.update(latency_ms or {})
+
+
+def stats() -> dict:
+    """Call counts and simulated wait (s) by call type since the last reset."""
+    with _lock:
+        return {
+            "calls": dict(_calls),
+            "total_calls": sum(_calls.values()),
+            "wait_s": {k: round(v, 6) for k, v in _wait_s.items()},
+        }
+
+
+def reset_stats():
+    with _lock:
+        _calls.clear()
+        _wait_s.clear()
+
+
+def _server_call(kind: str):
+    with _lock:
+        _calls[kind] += 1
+        delay = _latency_ms.get(kind, 0) / 1000.0
+        _wait_s[kind] += delay
+    if delay:
+        time.sleep(delay)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _seed(text: str) -> int:
+    return int(_digest(text)[:8], 16)
+
+
+def _repr_arg(value) -> str:
+    if isinstance(value, ComputedObject):
+        return value._expr
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{k!r}:{_repr_arg(v)}" for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_repr_arg(v) for v in value) + "]"
+    if callable(value):
+        return getattr(value, "__qualname__", type(value).__name__)
+    return repr(value)
+
+
+def _call_expr(target: str, name: str, args, kwargs) -> str:
+    parts = [_repr_arg(a) for a in args] + [f"{k}={_repr_arg(v)}" for k, v in sorted(kwargs.items())]
+    return f"{target}.{name}({','.join(parts)})"
+
+
+# =============================================================================
+# EXPRESSION OBJECTS
+# =============================================================================
+class _ExprMeta(type):
+    """Unknown class attributes (``ee.Image.pixelArea``, ``ee.Reducer.sum``) are static constructors."""
+
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def static(*args, **kwargs):
+            return cls(_expr=_call_expr(cls.__name__, name, args, kwargs))
+
+        return static
+
+
+class ComputedObject(metaclass=_ExprMeta):
+    # method name -> class name of the result; anything else keeps the caller's class
+    _RETURNS = {}
+
+    def __init__(self, *args, _expr=None, **kwargs):
+        if _expr is None:
+            if len(args) == 1 and not kwargs and isinstance(args[0], ComputedObject):
+                _expr = args[0]._expr
+            else:
+                _expr = _call_expr("ee", type(self).__name__, args, kwargs)
+        self._expr = _expr
+        if len(args) == 1 and isinstance(args[0], dict):
+            self._geojson = args[0]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        result_cls = _CLASSES.get(self._RETURNS.get(name), type(self))
+
+        def method(*args, **kwargs):
+            return result_cls(_expr=_call_expr(self._expr, name, args, kwargs))
+
+        return method
+
+    def __repr__(self):
+        return f"<fake ee.{type(self).__name__} {_digest(self._expr)[:10]}>"
+
+    def serialize(self, *args, **kwargs) -> str:
+        return self._expr
+
+    def getInfo(self):
+        _server_call("getInfo")
+        return _synthetic_info(self._expr)
+
+    def evaluate(self, callback):
+        callback(self.getInfo(), None)
+
+
+class Element(ComputedObject):
+    pass
+
+
+class Image(Element):
+    _RETURNS = {
+        "reduceRegion": "Dictionary",
+        "reduceRegions": "FeatureCollection",
+        "sample": "FeatureCollection",
+        "get": "ComputedObject",
+        "bandNames": "List",
+        "projection": "Projection",
+        "geometry": "Geometry",
+    }
+
+    def getMapId(self, vis_params=None):
+        _server_call("getMapId")
+        mapid = "projects/fake-ee/maps/" + _digest(_call_expr(self._expr, "getMapId", (vis_params or {},), {}))[:20]
+        url = f"https://fake-ee.invalid/v1/{mapid}/tiles/{{z}}/{{x}}/{{y}}"
+        return {"mapid": mapid, "token": "", "tile_fetcher": types.SimpleNamespace(url_format=url), "image": self}
+
+    def getThumbURL(self, params=None):
+        _server_call("getThumbURL")
+        return _synthetic_thumbnail(_call_expr(self._expr, "getThumbURL", (params or {},), {}), params or {})
+
+
+class ImageCollection(ComputedObject):
+    _RETURNS = {
+        "first": "Image",
+        "mosaic": "Image",
+        "mean": "Image",
+        "median": "Image",
+        "min": "Image",
+        "max": "Image",
+        "sum": "Image",
+        "reduce": "Image",
+        "qualityMosaic": "Image",
+        "size": "Number",
+        "toList": "List",
+        "aggregate_array": "List",
+    }
+
+
+class Feature(Element):
+    _RETURNS = {"geometry": "Geometry", "get": "ComputedObject"}
+
+
+class FeatureCollection(ComputedObject):
+    _RETURNS = {
+        "style": "Image",
+        "paint": "Image",
+        "draw": "Image",
+        "first": "Feature",
+        "geometry": "Geometry",
+        "size": "Number",
+        "aggregate_array": "List",
+        "toList": "List",
+    }
+
+
+class Geometry(ComputedObject):
+    _RETURNS = {
+        "coordinates": "List",
+        "area": "Number",
+        "projection": "Projection",
+    }
+
+
+class Dictionary(ComputedObject):
+    _RETURNS = {"get": "ComputedObject", "keys": "List", "values": "List"}
+
+
+class List(ComputedObject):
+    pass
+
+
+class Number(ComputedObject):
+    pass
+
+
+class String(ComputedObject):
+    pass
+
+
+class Reducer(ComputedObject):
+    pass
+
+
+class Filter(ComputedObject):
+    pass
+
+
+class Projection(ComputedObject):
+    pass
+
+
+class Date(ComputedObject):
+    pass
+
+
+class Algorithms(ComputedObject):
+    pass
+
+
+_CLASSES = {
+    cls.__name__: cls
+    for cls in (
+        ComputedObject, Element, Image, ImageCollection, Feature, FeatureCollection, Geometry,
+        Dictionary, List, Number, String, Reducer, Filter, Projection, Date, Algorithms,
+    )
+}
+
+
+# =============================================================================
+# SYNTHETIC RESULTS
+# =============================================================================
+NLCD_CODES = (11, 12, 21, 22, 23, 24, 31, 41, 42, 43, 51, 52, 71, 72, 73, 74, 81, 82, 90, 95)
+
+# Side length (m) of the synthetic bounds returned for ROI bounding boxes.
+SYNTHETIC_ROI_SIZE_M = 6000
+
+
+def _synthetic_groups(expr: str):
+    rng = np.random.default_rng(_seed(expr))
+    present = rng.random(len(NLCD_CODES)) < 0.6
+    areas = rng.gamma(1.0, 8.0, size=len(NLCD_CODES))
+    return [{"class": int(c), "sum": float(a)} for c, a, p in zip(NLCD_CODES, areas, present) if p]
+
+
+def _synthetic_bounds(expr: str):
+    rng = np.random.default_rng(_seed(expr))
+    x0 = -2_000_000 + 30 * int(rng.integers(0, 100_000))
+    y0 = 1_000_000 + 30 * int(rng.integers(0, 60_000))
+    s = SYNTHETIC_ROI_SIZE_M
+    return [[[x0, y0], [x0 + s, y0], [x0 + s, y0 + s], [x0, y0 + s], [x0, y0]]]
+
+
+# State FIPS codes of the synthetic TIGER/2018/States collection.
+SYNTHETIC_STATE_FIPS = (
+    "01", "02", "04", "05", "06", "08", "09", "10", "11", "12", "13", "15", "16", "17", "18", "19",
+    "20", "21", "22", "23", "24", "25", "26", "27", "28", "29", "30", "31", "32", "33", "34", "35",
+    "36", "37", "38", "39", "40", "41", "42", "44", "45", "46", "47", "48", "49", "50", "51", "53",
+    "54", "55", "56", "60", "66", "69", "72", "78",
+)
+
+
+def _synthetic_tiger_features(expr: str) -> list:
+    """Properties of the TIGER states/counties a collection expression selects."""
+    in_list = re.search(r"Filter\.inList\('STATEFP',\[([^\]]*)\]\)", expr)
+    states = re.findall(r"'(\d{2})'", in_list.group(1)) if in_list else SYNTHETIC_STATE_FIPS
+    if "TIGER/2018/Counties" in expr:
+        eq = re.search(r"Filter\.eq\('STATEFP','(\d{2})'\)", expr)
+        states = [eq.group(1)] if eq else states
+        geoids = re.search(r"Filter\.inList\('GEOID',\[([^\]]*)\]\)", expr)
+        if geoids:
+            wanted = set(re.findall(r"'(\d{5})'", geoids.group(1)))
+            states = sorted({g[:2] for g in wanted})
+        counties = [
+            {"GEOID": f"{fp}{n:03d}", "STATEFP": fp, "NAME": f"County {fp}-{n:03d}"}
+            for fp in states
+            for n in range(1, _seed("counties" + fp) % 12 + 3)
+        ]
+        return [c for c in counties if c["GEOID"] in wanted] if geoids else counties
+    return [{"GEOID": fp, "STATEFP": fp, "NAME": f"State {fp}"} for fp in states]
+
+
+def _synthetic_zonal(expr: str):
+    """reduceRegions(frequencyHistogram) over uploaded features ('fid') or TIGER regions."""
+    bands = re.findall(r"\.rename\('(y\d{4})'\)", expr)
+    if "TIGER/2018/" in expr:
+        base = _synthetic_tiger_features(expr)
+        scale = 5e6 if "TIGER/2018/States" in expr else 2e5
+    else:
+        base = [{"fid": fid} for fid in dict.fromkeys(re.findall(r"'fid':'([0-9a-f]+)'", expr))]
+        scale = 5000.0
+    features = []
+    for props in base:
+        props = dict(props)
+        ident = props.get("fid") or props["GEOID"]
+        for band in bands:
+            rng = np.random.default_rng(_seed(ident + band))
+            present = rng.random(len(NLCD_CODES)) < 0.6
+            counts = rng.gamma(1.0, scale, size=len(NLCD_CODES))
+            props[band] = {str(c): float(n) for c, n, p in zip(NLCD_CODES, counts, present) if p}
+        features.append({"type": "Feature", "geometry": None, "properties": props})
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _synthetic_info(expr: str):
+    if ".reduceRegions(" in expr and "frequencyHistogram" in expr:
+        return _synthetic_zonal(expr)
+    if "TIGER/2018/" in expr:
+        features = [{"type": "Feature", "geometry": None, "properties": p} for p in _synthetic_tiger_features(expr)]
+        return {"type": "FeatureCollection", "features": features}
+    if "reduceRegion" in expr and ".group(" in expr:
+        return _synthetic_groups(expr)
+    if expr.endswith(".coordinates()"):
+        return _synthetic_bounds(expr)
+    if expr.endswith(".size()"):
+        return int(_seed(expr) % 50) + 1
+    return {"expression": _digest(expr)}
+
+
+def _synthetic_thumbnail(expr: str, params: dict) -> str:
+    """A small noisy PNG as a ``data:`` URL, so callers can download it like a real thumbnail."""
+    from PIL import Image as PILImage
+
+    dims = params.get("dimensions", 256)
+    width = int(dims) if not isinstance(dims, str) or "x" not in dims else int(dims.split("x")[0])
+    height = max(1, width * 3 // 4)
+    rng = np.random.default_rng(_seed(expr))
+    # Coarse noise scaled up: compresses roughly like real imagery.
+    coarse = (rng.random((max(1, height // 16), max(1, width // 16), 3)) * 64 + rng.integers(0, 192, size=3))
+    buf = io.BytesIO()
+    PILImage.fromarray(coarse.astype(np.uint8)).resize((width, height), PILImage.BILINEAR).save(buf, format="PNG", compress_level=1)
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _compute_pixels(params: dict):
+    _server_call("computePixels")
+    grid = params.get("grid", {}).get("dimensions", {"width": 256, "height": 256})
+    width, height = int(grid["width"]), int(grid["height"])
+    band_ids = params.get("bandIds") or ["b0"]
+    expr = _repr_arg(params.get("expression"))
+    rng = np.random.default_rng(_seed(expr))
+    base = rng.choice(np.array(NLCD_CODES, dtype=np.uint8), size=(height, width))
+    out = np.zeros((height, width), dtype=[(b, np.uint8) for b in band_ids])
+    for b in band_ids:
+        changed = rng.random((height, width)) < 0.02
+        base = np.where(changed, rng.choice(np.array(NLCD_CODES, dtype=np.uint8), size=(height, width)), base)
+        out[b] = base
+    return out
+
+
+# =============================================================================
+# MODULE
+# =============================================================================
+class EEException(Exception):
+    pass
+
+
+_initialized = False
+
+
+def _initialize(*args, **kwargs):
+    global _initialized
+    _server_call("Initialize")
+    _initialized = True
+
+
+def _authenticate(*args, **kwargs):
+    return True
+
+
+def build_module() -> types.ModuleType:
+    ee = types.ModuleType("ee")
+    ee.__file__ = __file__
+    ee.__version__ = "0.0.0+fake"
+    ee.IS_FAKE = True
+    for name, cls in _CLASSES.items():
+        setattr(ee, name, cls)
+    ee.EEException = EEException
+    ee.Initialize = _initialize
+    ee.Authenticate = _authenticate
+    ee.Reset = lambda: None
+
+    data = types.ModuleType("ee.data")
+    data.computePixels = _compute_pixels
+    data.is_initialized = lambda: _initialized
+    data.getAsset = lambda asset_id: {"type": "IMAGE", "id": asset_id}
+    data.setWorkloadTag = lambda tag: None
+    data.getWorkloadTag = lambda: ""
+    ee.data = data
+
+    oauth = types.ModuleType("ee.oauth")
+    oauth.get_credentials_path = lambda: os.path.join(os.path.expanduser("~"), ".config", "earthengine", "credentials")
+    ee.oauth = oauth
+    return ee
+
+
+def install(latency_ms=None) -> types.ModuleType:
+    """Replace ``ee`` in ``sys.modules`` with the fake; returns the fake module."""
+    env = _latency_from_env()
+    if env:
+        configure(env)
+    if latency_ms is not None:
+        configure(latency_ms)
+    module = sys.modules.get("ee")
+    if getattr(module, "IS_FAKE", False):
+        return module
+    module = build_module()
+    sys.modules["ee"] = module
+    sys.modules["ee.data"] = module.data
+    sys.modules["ee.oauth"] = module.oauth
+    return module
@@ -0,0 +1,49 @@
+"""
+``streamlit run`` of the app against the offline Earth Engine stand-in.
+
+    FAKE_EE_LATENCY_MS='{"getInfo": 500}' python -m benchmarks.fake_server --server.port 8599
+
+Installs ``benchmarks.fake_ee`` and the fake secrets, then starts the regular
+Streamlit server for ``Streamlit_Home.py`` in this process; any further
+arguments are passed to ``streamlit run``. The fake's latency comes from
+``FAKE_EE_LATENCY_MS`` (see ``benchmarks.fake_ee``).
+
+With ``FAKE_EE_STATS=/path/stats.json`` the fake's call counters are written
+to that file every ``STATS_INTERVAL`` seconds, so a client driving the server
+(``benchmarks.load_test``) can read how many EE calls its sessions caused.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from benchmarks import apptest_support as support
+from benchmarks import fake_ee
+
+STATS_INTERVAL = 0.25
+
+
+def _write_stats_forever(path: str):
+    while True:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(fake_ee.stats(), f)
+        os.replace(tmp, path)
+        threading.Event().wait(STATS_INTERVAL)
+
+
+def main():
+    support.install_global_secrets()
+    stats_path = os.environ.get("FAKE_EE_STATS")
+    if stats_path:
+        threading.Thread(target=_write_stats_forever, args=(stats_path,), name="fake-ee-stats", daemon=True).start()
+
+    from streamlit.web import cli
+
+    script = os.path.join(support.REPO_ROOT, support.PAGES["home"])
+    sys.exit(cli.main(["run", script, "--server.headless", "true", *sys.argv[1:]]))
+
+
+if __name__ == "__main__":
+    main()
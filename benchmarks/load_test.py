@@ -0,0 +1,367 @@
+"""
+Concurrent-session load test of a real Streamlit server on the offline Earth
+Engine stand-in.
+
+    python -m benchmarks.load_test --sessions 1 5 10 20 --duration 30
+
+For each concurrency level N a fresh ``benchmarks.fake_server`` (the regular
+``streamlit run`` server with the fake EE, see ``--latency-ms``) is started,
+and N simulated users drive it over its WebSocket the way browsers do: every
+script run is a ``rerun_script`` message carrying the session's widget values,
+answered by the page's deltas and a ``script_finished`` message. Each user
+repeatedly picks a flow and runs it in a new session (new connection):
+
+- home:       open Home, then rerun it once
+- lakes:      open Lake Recession, then switch to two other lakes
+- land_use:   open Land Use Change, draw a random ROI, submit stats
+
+Every script run is one "rerun"; its latency is the time from sending the
+message to ``script_finished``, as a browser sees it. The report gives
+throughput (reruns/s), p50/p95/p99 rerun latency overall and per flow step,
+and the EE calls the server made. "err" counts runs that rendered an app
+exception; "fail" counts flows that broke off (timeouts, dropped connections,
+runs that did not finish), broken down by type below the level.
+
+Memory is read from the server process: "RSS MB" at the end of the level, and
+"RSS+/N", the RSS growth over the level divided by N. The latter is only a
+rough estimate of the cost of a session: it also contains cache growth and
+allocator slack, and sessions of finished flows may not have been collected.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from benchmarks import fake_server
+from benchmarks.apptest_support import LAKES, REPO_ROOT, square_roi
+
+DEFAULT_LATENCY_MS = {"Initialize": 300, "getMapId": 200, "getInfo": 500, "computePixels": 1000, "getThumbURL": 200}
+
+FLOW_WEIGHTS = {"home": 0.4, "lakes": 0.3, "land_use": 0.3}
+
+# URL path names of the pages (``st.navigation`` url_pathname); "" is the main script.
+PAGE_NAMES = {"home": "", "lakes": "Lake_Recession", "land_use": "Land_Use_Change"}
+
+RUN_TIMEOUT = 300.0
+SERVER_START_TIMEOUT = 60.0
+
+
+# =============================================================================
+# CLIENT
+# =============================================================================
+class Session:
+    """
+    One browser session: a WebSocket to the server, the widgets of the last
+    run, and the widget values a browser would send with the next one.
+    """
+
+    def __init__(self, ws, page_name: str):
+        self.ws = ws
+        self.page_name = page_name
+        self.widgets = {}
+        self._states = {}
+
+    @classmethod
+    async def open(cls, url: str, page_name: str) -> "Session":
+        ws = await websockets.connect(url, max_size=None, subprotocols=["streamlit"])
+        return cls(ws, page_name)
+
+    async def close(self):
+        await self.ws.close()
+
+    async def run(self) -> bool:
+        """Run the page once; True if it rendered an app exception."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_name = self.page_name
+        msg.rerun_script.widget_states.widgets.extend(self._states.values())
+        await self.ws.send(msg.SerializeToString())
+        # Buttons only fire for the run they were clicked for.
+        self._states = {k: s for k, s in self._states.items() if s.WhichOneof("value") != "trigger_value"}
+
+        widgets = {}
+        app_error = False
+        while True:
+            fm = ForwardMsg()
+            fm.ParseFromString(await self.ws.recv())
+            kind = fm.WhichOneof("type")
+            if kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                element = fm.delta.new_element
+                etype = element.WhichOneof("type")
+                if etype == "exception":
+                    app_error = True
+                proto = getattr(element, etype)
+                label = getattr(proto, "label", "") or getattr(proto, "component_name", "")
+                if getattr(proto, "id", "") and label:
+                    widgets.setdefault((etype, label), proto)
+            elif kind == "page_not_found":
+                raise RuntimeError(f"page not found: {self.page_name!r}")
+            elif kind == "script_finished":
+                if fm.script_finished != ForwardMsg.FINISHED_SUCCESSFULLY:
+                    raise RuntimeError(f"script run ended with status {fm.script_finished}")
+                break
+        self.widgets = widgets
+        return app_error
+
+    def _state(self, etype: str, label: str) -> WidgetState:
+        proto = self.widgets.get((etype, label))
+        if proto is None:
+            raise LookupError(f"no {etype} {label!r} in the last run")
+        state = WidgetState(id=proto.id)
+        self._states[proto.id] = state
+        return state
+
+    def select(self, label: str, option: str, etype: str = "selectbox"):
+        self._state(etype, label).string_value = option
+
+    def check(self, label: str, value: bool = True):
+        self._state("checkbox", label).bool_value = value
+
+    def click(self, label: str):
+        self._state("button", label).trigger_value = True
+
+    def set_component(self, name: str, value):
+        self._state("component_instance", name).json_value = json.dumps(value)
+
+
+async def _run(session: Session, step: str, record):
+    t0 = time.perf_counter()
+    app_error = await asyncio.wait_for(session.run(), RUN_TIMEOUT)
+    record(step, time.perf_counter() - t0, app_error)
+
+
+async def flow_home(url, rng, record):
+    session = await Session.open(url, PAGE_NAMES["home"])
+    try:
+        await _run(session, "home:open", record)
+        await _run(session, "home:rerun", record)
+    finally:
+        await session.close()
+
+
+async def flow_lakes(url, rng, record):
+    session = await Session.open(url, PAGE_NAMES["lakes"])
+    try:
+        await _run(session, "lakes:open", record)
+        for lake in rng.sample(LAKES[1:], 2):
+            session.select("Which lake would you like to view?", lake)
+            await _run(session, "lakes:switch", record)
+    finally:
+        await session.close()
+
+
+async def flow_land_use(url, rng, record):
+    session = await Session.open(url, PAGE_NAMES["land_use"])
+    try:
+        await _run(session, "land_use:open", record)
+        roi = square_roi(lon=rng.uniform(-120, -75), lat=rng.uniform(30, 47), size_deg=rng.uniform(0.02, 0.1))
+        feature = {"type": "Feature", "properties": {}, "geometry": roi}
+        session.set_component("streamlit_folium.st_folium", {"all_drawings": [feature], "last_active_drawing": feature})
+        await _run(session, "land_use:draw", record)
+        for label in ("Histogram", "Pie Chart", "Scatter Plot"):
+            session.check(label)
+        session.click("Submit")
+        await _run(session, "land_use:submit", record)
+    finally:
+        await session.close()
+
+
+FLOWS = {"home": flow_home, "lakes": flow_lakes, "land_use": flow_land_use}
+
+
+# =============================================================================
+# SERVER
+# =============================================================================
+class Server:
+    """A ``benchmarks.fake_server`` subprocess on a free port."""
+
+    def __init__(self, latency_ms):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self._dir = tempfile.mkdtemp(prefix="load_test_")
+        self.stats_path = os.path.join(self._dir, "ee_stats.json")
+        self.log_path = os.path.join(self._dir, "server.log")
+        env = dict(os.environ, FAKE_EE_LATENCY_MS=json.dumps(latency_ms), FAKE_EE_STATS=self.stats_path)
+        with open(self.log_path, "w") as log:
+            self.proc = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.fake_server", "--server.port", str(self.port),
+                 "--server.address", "127.0.0.1", "--server.fileWatcherType", "none",
+                 "--browser.gatherUsageStats", "false"],
+                cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+            )
+        self.url = f"ws://127.0.0.1:{self.port}/_stcore/stream"
+        self._wait_healthy()
+
+    def _wait_healthy(self):
+        deadline = time.time() + SERVER_START_TIMEOUT
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                break
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        with open(self.log_path) as f:
+            raise RuntimeError(f"fake server did not start:\n{f.read()[-2000:]}")
+
+    def ee_calls(self) -> int:
+        # Let the server write its latest counters first.
+        time.sleep(2 * fake_server.STATS_INTERVAL)
+        try:
+            with open(self.stats_path) as f:
+                return json.load(f)["total_calls"]
+        except (OSError, ValueError):
+            return 0
+
+    def rss_mb(self) -> float:
+        try:
+            with open(f"/proc/{self.proc.pid}/statm") as f:
+                return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+        except OSError:
+            return float("nan")
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+# =============================================================================
+# LOAD LEVELS
+# =============================================================================
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, math.ceil(q / 100.0 * len(values)) - 1)  # nearest rank
+    return values[k]
+
+
+async def _drive(url, n_sessions: int, duration: float, think_ms: float, seed: int, record, record_failure) -> float:
+    stop_at = time.perf_counter() + duration
+
+    async def user(i):
+        rng = random.Random(seed * 1000 + i)
+        names, weights = zip(*FLOW_WEIGHTS.items())
+        while time.perf_counter() < stop_at:
+            flow = rng.choices(names, weights)[0]
+            try:
+                await FLOWS[flow](url, rng, record)
+            except Exception as exc:
+                record_failure(flow, exc)
+            if think_ms:
+                await asyncio.sleep(rng.expovariate(1000.0 / think_ms))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(n_sessions)))
+    return time.perf_counter() - t0
+
+
+def run_level(n_sessions: int, duration: float, think_ms: float, seed: int, latency_ms) -> dict:
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    failures = defaultdict(int)
+
+    def record(step, seconds, failed):
+        samples[step].append(seconds)
+        if failed:
+            errors[step] += 1
+
+    def record_failure(what, exc):
+        failures[f"{what}:{type(exc).__name__}"] += 1
+
+    server = Server(latency_ms)
+    try:
+        # One throwaway flow so page imports are not billed to the level.
+        asyncio.run(flow_home(server.url, random.Random(0), lambda *a: None))
+        ee_before = server.ee_calls()
+        rss_before = server.rss_mb()
+        elapsed = asyncio.run(_drive(server.url, n_sessions, duration, think_ms, seed, record, record_failure))
+        ee_calls = server.ee_calls() - ee_before
+        rss_after = server.rss_mb()
+    finally:
+        server.stop()
+
+    all_runs = [s for runs in samples.values() for s in runs]
+    return {
+        "sessions": n_sessions,
+        "elapsed_s": elapsed,
+        "reruns": len(all_runs),
+        "errors": sum(errors.values()),
+        "failures": sum(failures.values()),
+        "failure_types": dict(sorted(failures.items())),
+        "throughput_rps": len(all_runs) / elapsed if elapsed else 0.0,
+        "p50_s": _percentile(all_runs, 50),
+        "p95_s": _percentile(all_runs, 95),
+        "p99_s": _percentile(all_runs, 99),
+        "ee_calls": ee_calls,
+        "rss_mb": rss_after,
+        "rss_growth_per_session_mb": max(0.0, rss_after - rss_before) / n_sessions,
+        "steps": {
+            step: {
+                "n": len(runs),
+                "p50_s": _percentile(runs, 50),
+                "p95_s": _percentile(runs, 95),
+                "p99_s": _percentile(runs, 99),
+                "errors": errors[step],
+            }
+            for step, runs in sorted(samples.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per concurrency level")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="mean pause between flows")
+    parser.add_argument("--latency-ms", type=json.loads, default=DEFAULT_LATENCY_MS,
+                        help="fake EE latency: a number or a JSON object by call type")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the full report as JSON")
+    args = parser.parse_args()
+
+    report = []
+    print(f"{'sessions':>8} {'reruns':>7} {'err':>4} {'fail':>4} {'rerun/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'EE calls':>9} {'RSS MB':>7} {'RSS+/N':>7}")
+    for n in args.sessions:
+        r = run_level(n, args.duration, args.think_ms, args.seed, args.latency_ms)
+        report.append(r)
+        print(f"{r['sessions']:8d} {r['reruns']:7d} {r['errors']:4d} {r['failures']:4d} {r['throughput_rps']:8.2f} {r['p50_s']:7.3f} "
+              f"{r['p95_s']:7.3f} {r['p99_s']:7.3f} {r['ee_calls']:9d} {r['rss_mb']:7.0f} {r['rss_growth_per_session_mb']:7.1f}")
+        for step, s in r["steps"].items():
+            print(f"{'':8} {step:<18} n={s['n']:<5d} p50={s['p50_s']:.3f} p95={s['p95_s']:.3f} "
+                  f"p99={s['p99_s']:.3f} errors={s['errors']}")
+        for what, n in r["failure_types"].items():
+            print(f"{'':8} failed: {what} x{n}")
+    print("RSS+/N: server RSS growth over the level / N, a rough estimate only (see --help)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
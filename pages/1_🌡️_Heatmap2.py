@@ -3,6 +3,15 @@ import ee
 import leafmap.foliumap as leafmap
 import folium
 
+from utils import ee_auth, tracing
+from utils.ee_cache import ee_tile_layer
+from utils.layers import ERA5_PERIODS, ERA5_VIS, era5_land_mean_celsius
+from utils.map_cache import map_to_streamlit
+from utils.warmup import readiness_indicator, start_warmup
+
+tracing.instrument_ee()
+tracing.set_page("Heatmap")
+
 # ---------------- EE AUTH ----------------
 import json, os
 from google.oauth2.credentials import Credentials as UserCredentials
@@ -32,13 +41,15 @@ def init_ee():
         scopes=info["scopes"],
     )
 
-    ee.Initialize(credentials=creds, project=project)
+    ee_auth.initialize(credentials=creds, project=project)
     return True
 
 init_ee()
 # ---------------- EE AUTH END ----------------
 
 st.set_page_config(layout="wide")
+start_warmup()
+readiness_indicator("heatmap")
 st.header("Global Land Temperatures")
 
 st.markdown(
@@ -51,40 +62,14 @@ st.markdown(
 
 # ---------------- Helper: EE -> Folium TileLayer ----------------
 def ee_to_folium_tilelayer(ee_image: ee.Image, vis_params: dict, name: str) -> folium.TileLayer:
-    """Create a folium.TileLayer from an ee.Image."""
-    map_id_dict = ee.Image(ee_image).getMapId(vis_params)
-    return folium.TileLayer(
-        tiles=map_id_dict["tile_fetcher"].url_format,
-        attr="Google Earth Engine",
-        name=name,
-        overlay=True,
-        control=True,
-    )
+    """Create a folium.TileLayer from an ee.Image (map ID from the shared cache)."""
+    return ee_tile_layer(ee_image, vis_params, name)
 
 # ---------------- Build ee.Image layers (NOT ImageCollections) ----------------
-def era5_land_mean_celsius(start_date: str, end_date: str) -> ee.Image:
-    # ERA5-Land monthly band is Kelvin; convert to Celsius after mean.
-    col = (
-        ee.ImageCollection("ECMWF/ERA5_LAND/MONTHLY")
-        .filterDate(start_date, end_date)
-        .select("skin_temperature")
-    )
-    return col.mean().subtract(273.15).rename("skin_temperature")
-
-land_9099 = era5_land_mean_celsius("1990-05-01", "1999-05-01")
-land_1019 = era5_land_mean_celsius("2010-05-01", "2019-05-01")
-
-vis = {
-    "min": -15,
-    "max": 38,
-    "bands": ["skin_temperature"],
-    "palette": [
-        "000080","0000D9","4000FF","8000FF","0080FF","00FFFF",
-        "00FF80","80FF00","DAFF00","FFFF00","FFF500","FFDA00",
-        "FFB000","FFA400","FF4F00","FF2500","FF0A00","FF00FF",
-    ],
-}
+land_9099 = era5_land_mean_celsius(*ERA5_PERIODS["1990–1999"])
+land_1019 = era5_land_mean_celsius(*ERA5_PERIODS["2010–2019"])
 
+vis = ERA5_VIS
 
 left_layer = ee_to_folium_tilelayer(land_9099, vis, "Land Temps 1990–1999")
 right_layer = ee_to_folium_tilelayer(land_1019, vis, "Land Temps 2010–2019")
@@ -128,7 +113,7 @@ params2 = {
 
 m.add_text(date1, **params1)
 m.add_text(date2, **params2)
-m.to_streamlit(height=600)
+map_to_streamlit(m, height=600)
 
 st.markdown(
     """
@@ -136,3 +121,5 @@ st.markdown(
     Temperature data was recorded by Copernicus Climate Data.
     """
 )
+
+tracing.perf_panel()
@@ -4,6 +4,17 @@ import leafmap.foliumap as leafmap
 import folium
 from folium.plugins import SideBySideLayers
 
+from utils import ee_auth, tracing
+from utils.ee_cache import ee_tile_layer
+from utils.layers import LAKES, LANDSAT_VIS, landsat_composite
+from utils.map_cache import map_to_streamlit
+from utils.shared_cache import FillTimeout
+from utils.timelapse import TIMELAPSE_YEARS, cached_timelapse_path, lake_timelapse, static_url
+from utils.warmup import readiness_indicator, start_warmup
+
+tracing.instrument_ee()
+tracing.set_page("Lake Recession")
+
 # ---------------- EE AUTH ----------------
 import json, os
 from google.oauth2.credentials import Credentials as UserCredentials
@@ -31,13 +42,15 @@ def init_ee():
         client_secret=info["client_secret"],
         scopes=info["scopes"],
     )
-    ee.Initialize(credentials=creds, project=project)
+    ee_auth.initialize(credentials=creds, project=project)
     return True
 
 init_ee()
 # ---------------- EE AUTH END ----------------
 
 st.set_page_config(layout="wide")
+start_warmup()
+readiness_indicator("lakes")
 
 st.header("Lake Recession")
 st.markdown(
@@ -73,46 +86,21 @@ params2 = {
 }
 
 # ---------------- Helpers ----------------
-def landsat7_sr_scaled(img: ee.Image) -> ee.Image:
-    """
-    Landsat Collection 2 Level-2 SR scaling:
-      reflectance = SR * 0.0000275 + (-0.2)
-    Applies to SR_B1..SR_B7.
-    """
-    sr = img.select(["SR_B1", "SR_B2", "SR_B3", "SR_B4", "SR_B5", "SR_B7"]) \
-            .multiply(0.0000275).add(-0.2)
-    return img.addBands(sr, overwrite=True)
-
 @st.cache_resource
 def get_landsat_composites():
-    ic = ee.ImageCollection("LANDSAT/LE07/C02/T1_L2").map(landsat7_sr_scaled)
-    img_2001 = ic.filterDate("2001-01-01", "2002-01-01").median()
-    img_2020 = ic.filterDate("2020-01-01", "2021-01-01").median()
-    return img_2001, img_2020
+    return landsat_composite(2001), landsat_composite(2020)
 
 img_2001, img_2020 = get_landsat_composites()
 
-# Use a sane natural-color stretch (scaled reflectance)
-vis = {
-    "bands": ["SR_B7", "SR_B5", "SR_B3"],  # SWIR2, SWIR1, Red
-    "min": 0.02,
-    "max": 0.40,
-    "gamma": 1.1,
-}
+vis = LANDSAT_VIS
 
 def ee_to_tilelayer(ee_image: ee.Image, vis_params: dict, name: str) -> folium.TileLayer:
     """
-    IMPORTANT: do NOT cache this. getMapId() returns a tokenized tile URL.
+    Fresh TileLayer each call (SideBySideLayers needs its own layer objects).
+    getMapId() returns a tokenized tile URL, so only the URL is cached, with a
+    TTL shorter than the token lifetime (see utils.ee_cache).
     """
-    map_id = ee.Image(ee_image).getMapId(vis_params)
-    return folium.TileLayer(
-        tiles=map_id["tile_fetcher"].url_format,
-        attr="Google Earth Engine",
-        name=name,
-        overlay=True,
-        control=True,
-        opacity=1.0,
-    )
+    return ee_tile_layer(ee_image, vis_params, name, opacity=1.0)
 
 def make_split_map(center_lat: float, center_lon: float, zoom: int) -> leafmap.Map:
     # Set center/zoom in constructor (no lon/lat ambiguity)
@@ -127,7 +115,7 @@ def make_split_map(center_lat: float, center_lon: float, zoom: int) -> leafmap.M
     # Give the user something even if EE tiles are slow
     m.add_basemap("HYBRID")
 
-    # Create fresh EE tile layers each run (tokenized URLs)
+    # Fresh layer objects each run; tile URLs come from the shared map-ID cache
     left = ee_to_tilelayer(img_2001, vis, "Year of 2001")
     right = ee_to_tilelayer(img_2020, vis, "Year of 2020")
 
@@ -142,22 +130,30 @@ def make_split_map(center_lat: float, center_lon: float, zoom: int) -> leafmap.M
 
     return m
 
-# Prebuild maps (lat, lon)
-Map1 = make_split_map(36.20, -114.41, 10)                      # Lake Mead
-Map2 = make_split_map(33.31321356759435, -115.85446197484563, 10)  # Salton Sea
-Map3 = make_split_map(41.08008337991904, -112.43915367456692, 9)   # Great Salt Lake
-Map4 = make_split_map(45.25402686187612, 59.013008598795004, 8)    # Aral Sea
-
-option = st.selectbox(
-    "Which lake would you like to view?",
-    ("Lake Mead, NV", "Salton Sea, CA", "Great Salt Lake, UT", "Aral Sea, Kazakhstan/Uzebekistan"),
-)
-
-if option == "Lake Mead, NV":
-    Map1.to_streamlit(height=600)
-elif option == "Salton Sea, CA":
-    Map2.to_streamlit(height=600)
-elif option == "Great Salt Lake, UT":
-    Map3.to_streamlit(height=600)
-elif option == "Aral Sea, Kazakhstan/Uzebekistan":
-    Map4.to_streamlit(height=600)
+option = st.selectbox("Which lake would you like to view?", tuple(LAKES))
+
+map_to_streamlit(make_split_map(*LAKES[option]), height=600)
+
+# ---------------- Timelapse ----------------
+st.subheader(f"Timelapse {TIMELAPSE_YEARS[0]}–{TIMELAPSE_YEARS[-1]}")
+gif_path = cached_timelapse_path(option)
+if gif_path is None and st.button("🎞️ Build yearly timelapse", help="One Landsat composite per year; built once per lake."):
+    with st.spinner(f"Fetching {len(TIMELAPSE_YEARS)} yearly composites..."):
+        try:
+            gif_path = lake_timelapse(option)
+        except FillTimeout:
+            st.info("Another session is still building this timelapse; try again in a minute.")
+
+if gif_path is not None:
+    url = static_url(gif_path)
+    file_name = f"{option.split(',')[0].replace(' ', '_')}_timelapse.gif"
+    if url:
+        # Served by the static file handler: the GIF never enters the session's media storage.
+        st.markdown(f'<img src="{url}" alt="{option} timelapse" style="max-width:100%;">', unsafe_allow_html=True)
+        st.markdown(f'<a href="{url}" download="{file_name}">⬇️ Download GIF</a>', unsafe_allow_html=True)
+    else:
+        st.image(gif_path, caption=option)
+        with open(gif_path, "rb") as f:
+            st.download_button("⬇️ Download GIF", f.read(), file_name=file_name, mime="image/gif")
+
+tracing.perf_panel()
@@ -4,7 +4,10 @@ import leafmap
 import leafmap.foliumap as foliumap
 import folium
 from folium.plugins import Draw
+from streamlit_folium import st_folium
 
+import functools
+import numpy as np
 import pandas as pd
 import json
 import os
@@ -12,6 +15,19 @@ import tempfile
 import plotly.express as px
 from google.oauth2.credentials import Credentials as UserCredentials
 
+from utils import ee_auth, tracing
+from utils.change_analysis import ChangeAnalysis, areas_from_frames
+from utils.ee_cache import expr_key, geometry_hash, get_info, prefetch_tile_url, tile_url
+from utils.geojson_stream import GeoJSONLimitError, GeoJSONParseError, read_upload_features
+from utils.layers import ee_landcover_for_year, nlcd_display_layer_for_year
+from utils.map_controls import TileLayerTimeSlider
+from utils.nlcd import YEARS, NLCD_CLASSES, NLCD_CODES, NLCD_COLORS
+from utils.nlcd_local import load_or_fetch_stack, stack_cache_key
+from utils.region_index import NO_NLCD_STATES, RegionIndex, region_geometry, region_outline
+from utils.session_memory import session_memory
+from utils.warmup import readiness_indicator, start_warmup
+from utils.zonal import areas_long_frame, areas_wide_frame, feature_class_areas, feature_labels
+
 # =============================================================================
 # EE AUTH
 # =============================================================================
@@ -38,143 +54,116 @@ def init_ee():
         client_secret=info["client_secret"],
         scopes=info["scopes"],
     )
-    ee.Initialize(credentials=creds, project=project)
+    ee_auth.initialize(credentials=creds, project=project)
     return True
 
 
+tracing.instrument_ee()
+tracing.set_page("Land Use Change")
 init_ee()
 st.set_page_config(layout="wide")
+start_warmup()
+readiness_indicator("nlcd")
 
 # =============================================================================
 # CONSTANTS
 # =============================================================================
-YEARS = ("2001", "2004", "2006", "2008", "2011", "2013", "2016", "2019")
-
-NLCD_CLASSES = {
-    "Class_11": "11 - Open Water",
-    "Class_12": "12 - Perennial Ice/Snow",
-    "Class_21": "21 - Developed, Open Space",
-    "Class_22": "22 - Developed, Low Intensity",
-    "Class_23": "23 - Developed, Medium Intensity",
-    "Class_24": "24 - Developed, High Intensity",
-    "Class_31": "31 - Barren Land (Rock/Sand/Clay)",
-    "Class_41": "41 - Deciduous Forest",
-    "Class_42": "42 - Evergreen Forest",
-    "Class_43": "43 - Mixed Forest",
-    "Class_51": "51 - Dwarf Scrub",
-    "Class_52": "52 - Shrub/Scrub",
-    "Class_71": "71 - Grassland/Herbaceous",
-    "Class_72": "72 - Sedge/Herbaceous",
-    "Class_73": "73 - Lichens",
-    "Class_74": "74 - Moss",
-    "Class_81": "81 - Pasture/Hay",
-    "Class_82": "82 - Cultivated Crops",
-    "Class_90": "90 - Woody Wetlands",
-    "Class_95": "95 - Emergent Herbaceous Wetlands",
-}
-
-# Hex colors (no '#') used for discrete palette + compact legend
-NLCD_COLORS = {
-    11: ("Open Water", "466B9F"),
-    12: ("Perennial Ice/Snow", "D1DEF8"),
-    21: ("Developed, Open Space", "DEC5C5"),
-    22: ("Developed, Low Intensity", "D99282"),
-    23: ("Developed, Medium Intensity", "EB0000"),
-    24: ("Developed, High Intensity", "AB0000"),
-    31: ("Barren Land", "B3AC9F"),
-    41: ("Deciduous Forest", "68AB5F"),
-    42: ("Evergreen Forest", "1C5F2C"),
-    43: ("Mixed Forest", "B5C58F"),
-    51: ("Dwarf Scrub", "AF963C"),
-    52: ("Shrub/Scrub", "CCB879"),
-    71: ("Grassland/Herbaceous", "DFDFC2"),
-    72: ("Sedge/Herbaceous", "D1D182"),
-    73: ("Lichens", "A3CC51"),
-    74: ("Moss", "82BA9E"),
-    81: ("Pasture/Hay", "DCD939"),
-    82: ("Cultivated Crops", "AB6C28"),
-    90: ("Woody Wetlands", "B8D9EB"),
-    95: ("Emergent Herbaceous Wetlands", "6C9FB8"),
-}
+# Only drawing events are sent back from the map; pan/zoom/click state is not,
+# so browsing the map never triggers a rerun.
+DRAW_RETURNED_OBJECTS = ["all_drawings"]
 
-# =============================================================================
-# EE DATA
-# =============================================================================
-dataset = ee.ImageCollection("USGS/NLCD_RELEASES/2019_REL/NLCD")
+# Features shown as small multiples in the multi-ROI comparison (largest first).
+MAX_SMALL_MULTIPLES = 12
 
-def ee_landcover_for_year(y: str) -> ee.Image:
-    img = dataset.filter(ee.Filter.eq("system:index", y)).first()
-    return ee.Image(img).select("landcover")
-
-def nlcd_display_layer_for_year(y: str):
-    """
-    Discrete-color NLCD display guaranteed in Folium:
-    remap original class values -> 0..N-1 + palette
-    """
-    landcover = ee_landcover_for_year(y)
-    class_values = list(NLCD_COLORS.keys())
-    palette = [NLCD_COLORS[v][1] for v in class_values]
-    remapped = landcover.remap(class_values, list(range(len(class_values)))).rename("nlcd")
-    vis = {"min": 0, "max": len(class_values) - 1, "palette": palette}
-    return remapped, vis, landcover
+ENGINE_EE = "Earth Engine (per-year reducers)"
+ENGINE_LOCAL = "Local NumPy (download pixels once)"
+ENGINES = (ENGINE_EE, ENGINE_LOCAL)
 
 # =============================================================================
 # HELPERS
 # =============================================================================
-def add_compact_legend_bottom_right(m: foliumap.Map, year: str):
-    class_values = list(NLCD_COLORS.keys())
+@functools.lru_cache(maxsize=None)
+def compact_legend_html(title: str) -> str:
+    """
+    Legend markup, built once per title. Styles are shared classes rather than
+    inline per row: st_folium sends this HTML with the map on every rerun.
+    """
     rows = "".join(
-        f"""
-        <div style="display:flex; align-items:center; gap:6px; margin:2px 0;">
-          <span style="width:12px; height:12px; background:#{NLCD_COLORS[v][1]}; display:inline-block; border:1px solid #333;"></span>
-          <span>{v} — {NLCD_COLORS[v][0]}</span>
-        </div>
-        """
-        for v in class_values
+        f'<div class="nlcd-row"><span class="nlcd-swatch" style="background:#{color}"></span>'
+        f"<span>{v} — {label}</span></div>"
+        for v, (label, color) in NLCD_COLORS.items()
     )
-    html = f"""
-    <div style="
-      position: fixed;
-      bottom: 18px; right: 18px;
-      z-index: 9999;
-      background: rgba(255,255,255,0.92);
-      padding: 8px 10px;
-      border-radius: 8px;
-      font-size: 12px;
-      line-height: 1.1;
-      max-height: 220px;
-      overflow-y: auto;
-      box-shadow: 0 2px 8px rgba(0,0,0,0.25);
-    ">
-      <div style="font-weight:700; margin-bottom:6px;">NLCD {year}</div>
-      {rows}
-    </div>
+    return f"""
+    <style>
+      .nlcd-legend {{
+        position: fixed; bottom: 18px; right: 18px; z-index: 9999;
+        background: rgba(255,255,255,0.92); padding: 8px 10px; border-radius: 8px;
+        font-size: 12px; line-height: 1.1; max-height: 220px; overflow-y: auto;
+        box-shadow: 0 2px 8px rgba(0,0,0,0.25);
+      }}
+      .nlcd-legend-title {{ font-weight: 700; margin-bottom: 6px; }}
+      .nlcd-row {{ display: flex; align-items: center; gap: 6px; margin: 2px 0; }}
+      .nlcd-swatch {{ width: 12px; height: 12px; display: inline-block; border: 1px solid #333; }}
+    </style>
+    <div class="nlcd-legend"><div class="nlcd-legend-title">{title}</div>{rows}</div>
+    """
+
+def add_compact_legend_bottom_right(m: foliumap.Map, title: str):
+    m.get_root().html.add_child(folium.Element(compact_legend_html(title)))
+
+@st.cache_resource(show_spinner=False)
+def nlcd_tile_layers() -> dict:
+    """
+    {year: (image, vis_params, cache key)} of the NLCD display layers. The
+    expressions never change, so they are built and serialized once per
+    process rather than on every rerun.
+    """
+    layers = {}
+    for y in YEARS:
+        image, vis = nlcd_display_layer_for_year(y)[:2]
+        image = ee.Image(image)
+        layers[y] = (image, vis, expr_key(image, vis))
+    return layers
+
+def nlcd_tile_urls() -> dict:
+    """
+    Map-ID futures for every NLCD year. Cached years are already resolved;
+    only the missing ones are requested, together, so changing the year only
+    swaps a tile URL.
     """
-    m.get_root().html.add_child(folium.Element(html))
+    return {y: prefetch_tile_url(image, vis, key=key) for y, (image, vis, key) in nlcd_tile_layers().items()}
+
+@st.cache_data(max_entries=8, ttl=3600, show_spinner="Reading the uploaded GeoJSON...")
+def _parse_upload(file_id: str, _uploaded_file):
+    """(features, error) of an upload, parsed once per file rather than on every rerun."""
+    _uploaded_file.seek(0)
+    try:
+        return read_upload_features(_uploaded_file), None
+    except (GeoJSONLimitError, GeoJSONParseError) as e:
+        return [], e
+
+def uploaded_features(uploaded_file) -> list:
+    """
+    Cleaned (geometry, properties) of every feature in an uploaded GeoJSON
+    (Geometry, Feature or FeatureCollection); raises GeoJSONLimitError /
+    GeoJSONParseError for uploads over the limits or malformed files.
+    """
+    features, error = _parse_upload(uploaded_file.file_id, uploaded_file)
+    if error is not None:
+        raise error
+    return features
 
 def geojson_upload_to_ee_geometry(uploaded_file):
-    data = json.loads(uploaded_file.getvalue().decode("utf-8"))
-
-    if isinstance(data, dict) and "type" in data:
-        if data["type"] in ("Polygon", "MultiPolygon", "Point", "MultiPoint", "LineString", "MultiLineString"):
-            return ee.Geometry(data)
-
-        if data["type"] == "Feature":
-            geom = data.get("geometry")
-            return ee.Geometry(geom) if geom else None
-
-        if data["type"] == "FeatureCollection":
-            feats = data.get("features", [])
-            geoms = [f.get("geometry") for f in feats if f.get("geometry")]
-            if not geoms:
-                return None
-            ee_geoms = [ee.Geometry(g) for g in geoms]
-            merged = ee.Geometry(ee_geoms[0])
-            for g in ee_geoms[1:]:
-                merged = merged.union(g, maxError=1)
-            return merged
+    """Union of all geometries in an uploaded GeoJSON (see ``uploaded_features``)."""
+    geoms = [geom for geom, _ in uploaded_features(uploaded_file)]
+    if not geoms:
+        return None
 
-    return None
+    ee_geoms = [ee.Geometry(g) for g in geoms]
+    merged = ee_geoms[0]
+    for g in ee_geoms[1:]:
+        merged = merged.union(g, maxError=1)
+    return merged
 
 def extract_latest_drawn_geometry(st_map_result):
     """
@@ -232,7 +221,7 @@ def ee_landcover_group_area_km2(landcover_img: ee.Image, roi: ee.Geometry, scale
     )
 
     groups = ee.List(grouped.get("groups"))
-    groups_info = groups.getInfo() if groups is not None else []
+    groups_info = get_info(groups) if groups is not None else []
 
     # Build DataFrame
     rows = []
@@ -248,6 +237,36 @@ def ee_landcover_group_area_km2(landcover_img: ee.Image, roi: ee.Geometry, scale
     df = df.sort_values("area_km2", ascending=False).reset_index(drop=True)
     return df
 
+@st.cache_resource(max_entries=16, show_spinner="Downloading NLCD pixels for the ROI...")
+def get_local_stack(roi_key: str, _roi: ee.Geometry):
+    """All-years NLCD stack for the ROI, memory-mapped from the on-disk cache."""
+    return load_or_fetch_stack(_roi, YEARS, ee_landcover_for_year)
+
+def local_stack_for_roi(roi: ee.Geometry):
+    """Local stack for the ROI, or None when it is too large for the local engine."""
+    try:
+        return get_local_stack(stack_cache_key(roi, YEARS), roi)
+    except ValueError as e:
+        st.info(f"{e}; using Earth Engine reducers instead.")
+        return None
+
+@st.cache_resource(show_spinner=False)
+def get_region_index():
+    """State/county statistics index (utils.region_index), or None if it has not been built."""
+    return RegionIndex.load()
+
+def landcover_area_df(y: str, roi: ee.Geometry, engine: str, region_fips: str = None) -> pd.DataFrame:
+    """NLCD class areas for one year: from the region index for a state/county, else from the selected engine."""
+    if region_fips is not None and get_region_index() is not None:
+        df = get_region_index().areas_frame(region_fips, y)
+        if df is not None:
+            return df
+    if engine == ENGINE_LOCAL:
+        stack = local_stack_for_roi(roi)
+        if stack is not None:
+            return stack.areas_frame(y)
+    return ee_landcover_group_area_km2(ee_landcover_for_year(y), roi, scale=30)
+
 # =============================================================================
 # UI LAYOUT
 # =============================================================================
@@ -260,7 +279,39 @@ with row1_col1:
     st.write("- Use the **map toolbar Export** OR the **button below** to download ROI GeoJSON.")
 
     year = st.selectbox("Select a Year to View", YEARS, index=0)
+    animate = st.toggle(
+        "Year slider / animation on the map",
+        value=False,
+        help="Loads every year's layer once; the slider and ▶ button switch years in the browser.",
+    )
     data = st.file_uploader("Upload a .geojson ROI (optional)", type=["geojson"])
+    compare_mode = st.toggle(
+        "Compare uploaded features separately",
+        value=False,
+        disabled=data is None,
+        help="Keeps every feature of the upload as its own ROI instead of merging them into one.",
+    )
+
+    # ---- Standard regions answered from the precomputed index ----
+    region_index = get_region_index()
+    region_fips = None
+    if region_index is not None:
+        state_fips = st.selectbox(
+            "Or pick a state / county (precomputed stats)",
+            [None] + [fp for fp, _ in region_index.states()],
+            format_func=lambda fp: "Custom ROI (draw/upload)" if fp is None else region_index.name(fp),
+        )
+        if state_fips is not None:
+            region_fips = st.selectbox(
+                "County",
+                [state_fips] + [fp for fp, _ in region_index.counties(state_fips)],
+                format_func=lambda fp: "Whole state" if fp == state_fips else region_index.name(fp),
+            )
+        st.caption(
+            "NLCD covers the conterminous US only: "
+            + ", ".join(NO_NLCD_STATES.values())
+            + " are not in the list."
+        )
 
     # ---- Map ----
     m = foliumap.Map(
@@ -273,8 +324,28 @@ with row1_col1:
         fullscreen_control=False,
     )
 
-    nlcd_img, nlcd_vis, landcover_raw = nlcd_display_layer_for_year(year)
-    m.add_ee_layer(ee_object=nlcd_img, vis_params=nlcd_vis, name=f"NLCD {year}")
+    if region_fips is not None:
+        m.add_tile_layer(tile_url(region_outline(region_fips)), name=region_index.name(region_fips),
+                         attribution="US Census TIGER")
+
+    # The NLCD layer is not part of `m`: st_folium swaps it in as a dynamic
+    # feature group, so a year change does not re-render the map (or drop
+    # drawings). In animation mode the slider control owns all the layers.
+    nlcd_urls = nlcd_tile_urls()
+    nlcd_layer = None
+    if animate:
+        TileLayerTimeSlider(
+            [(y, nlcd_urls[y].result()) for y in YEARS],
+            start=YEARS.index(year),
+        ).add_to(m)
+    else:
+        nlcd_layer = folium.FeatureGroup(name=f"NLCD {year}")
+        folium.TileLayer(
+            tiles=nlcd_urls[year].result(),
+            attr="Google Earth Engine",
+            name=f"NLCD {year}",
+            overlay=True,
+        ).add_to(nlcd_layer)
 
     # ---- ONE draw toolbar + EXPORT BUTTON ----
     Draw(
@@ -292,22 +363,57 @@ with row1_col1:
         edit_options={"edit": True, "remove": True},
     ).add_to(m)
 
-    add_compact_legend_bottom_right(m, year)
-    folium.LayerControl(collapsed=True).add_to(m)
-
-    st_map = m.to_streamlit(width=850, height=600)
+    add_compact_legend_bottom_right(m, "NLCD Land Cover")
+
+    with tracing.span("map.render", cache="none"):
+        st_map = st_folium(
+            m,
+            key="landuse_map",
+            width=850,
+            height=600,
+            returned_objects=DRAW_RETURNED_OBJECTS,
+            feature_group_to_add=nlcd_layer,
+            layer_control=folium.LayerControl(collapsed=True),
+        )
 
-    # ---- ROI priority: upload > drawn ----
+    # ---- ROI priority: standard region > upload > drawn ----
     roi = None
     roi_source = None
-
-    if data is not None:
-        roi = geojson_upload_to_ee_geometry(data)
+    compare_features = []
+
+    if region_fips is not None:
+        # Stats come from the index; the geometry is only used if it lacks a year.
+        roi = region_geometry(region_fips)
+        roi_source = f"{region_index.name(region_fips)}, precomputed statistics"
+        st.session_state.pop("roi_hash", None)
+    elif data is not None and compare_mode:
+        # No union: each feature is reduced on its own in the comparison below.
+        try:
+            uploaded = uploaded_features(data)
+        except (GeoJSONLimitError, GeoJSONParseError) as e:
+            st.error(f"Could not use the uploaded GeoJSON: {e}")
+            uploaded = []
+        labels = feature_labels([props for _, props in uploaded])
+        compare_features = [(label, geom) for label, (geom, _) in zip(labels, uploaded)]
+        st.session_state.pop("roi_hash", None)
+    elif data is not None:
+        try:
+            roi = geojson_upload_to_ee_geometry(data)
+        except (GeoJSONLimitError, GeoJSONParseError) as e:
+            st.error(f"Could not use the uploaded GeoJSON: {e}")
         roi_source = "uploaded GeoJSON"
+        st.session_state.pop("roi_hash", None)
     else:
         drawn_geom = extract_latest_drawn_geometry(st_map)
         if drawn_geom:
-            roi = ee.Geometry(drawn_geom)
+            # Reruns caused by other widgets (or repeated draw events) report the
+            # same drawing again; reuse the ROI built for it instead of rebuilding.
+            drawn_hash = geometry_hash(drawn_geom)
+            if st.session_state.get("roi_hash") == drawn_hash:
+                roi = session_memory().get("roi")
+            if roi is None:
+                roi = ee.Geometry(drawn_geom)
+                st.session_state["roi_hash"] = drawn_hash
             roi_source = "drawn geometry"
 
             # Guaranteed Streamlit export button (works even if in-map export is finicky)
@@ -319,12 +425,17 @@ with row1_col1:
                 use_container_width=True,
             )
 
-    if roi:
+    st.session_state["region_fips"] = region_fips
+    if compare_features:
+        st.success(f"{len(compare_features)} features ready for the multi-ROI comparison.")
+        session_memory().discard("roi")
+    elif roi:
         st.success(f"ROI ready ({roi_source}).")
-        st.session_state["roi"] = roi
+        session_memory()["roi"] = roi
     else:
         st.info("Draw a polygon/rectangle on the map OR upload a GeoJSON ROI to enable stats.")
-        st.session_state.pop("roi", None)
+        session_memory().discard("roi")
+        st.session_state.pop("roi_hash", None)
 
 # ---------------- Stats selection ----------------
 with row1_col2:
@@ -337,23 +448,30 @@ with row1_col2:
         st.markdown("---")
         year1 = st.selectbox("Year 1", YEARS, index=0)
         year2 = st.selectbox("Year 2", YEARS, index=len(YEARS) - 1)
+        st.markdown("---")
+        engine = st.radio(
+            "Statistics engine",
+            ENGINES,
+            index=0,
+            help="The local engine downloads the ROI's pixels for all years once; "
+                 "every chart after that is computed in memory. Best for small/medium ROIs.",
+        )
         submit_button = st.form_submit_button("Submit")
 
 # =============================================================================
 # STATS
 # =============================================================================
 if submit_button:
-    if "roi" not in st.session_state:
+    roi = session_memory().get("roi")
+    if roi is None:
         st.warning("No ROI selected yet. Draw/upload an ROI first.")
     else:
-        roi = st.session_state["roi"]
+        region_fips = st.session_state.get("region_fips")
 
         # Histogram + Pie use the main selected year
-        landcover = ee_landcover_for_year(year)
-
         if histogram:
-            df_stats = ee_landcover_group_area_km2(landcover, roi, scale=30)
-            st.session_state["df_stats_year"] = df_stats
+            df_stats = landcover_area_df(year, roi, engine, region_fips)
+            session_memory()["df_stats_year"] = df_stats
 
             fig = px.bar(
                 df_stats.head(15),
@@ -367,10 +485,10 @@ if submit_button:
                 st.plotly_chart(fig, use_container_width=True)
 
         if pie_chart:
-            df_stats = st.session_state.get("df_stats_year")
+            df_stats = session_memory().get("df_stats_year")
             if df_stats is None:
-                df_stats = ee_landcover_group_area_km2(landcover, roi, scale=30)
-                st.session_state["df_stats_year"] = df_stats
+                df_stats = landcover_area_df(year, roi, engine, region_fips)
+                session_memory()["df_stats_year"] = df_stats
 
             fig = px.pie(
                 df_stats,
@@ -383,26 +501,26 @@ if submit_button:
                 st.plotly_chart(fig, use_container_width=True)
 
         if scatter_plot:
-            lc1 = ee_landcover_for_year(year1)
-            lc2 = ee_landcover_for_year(year2)
-
-            df1 = ee_landcover_group_area_km2(lc1, roi, scale=30).rename(columns={"area_km2": "area_km2_y1"})
-            df2 = ee_landcover_group_area_km2(lc2, roi, scale=30).rename(columns={"area_km2": "area_km2_y2"})
-
-            compare = pd.merge(df1, df2, on=["class_key", "class_label"], how="outer").fillna(0.0)
-            st.session_state["compare_df"] = compare
-            st.session_state["compare_years"] = (year1, year2)
-
-            melted = compare.melt(
-                id_vars=["class_label", "class_key"],
-                value_vars=["area_km2_y1", "area_km2_y2"],
-                var_name="Year",
-                value_name="Coverage (km²)",
-            )
-            melted["Year"] = melted["Year"].map({"area_km2_y1": year1, "area_km2_y2": year2})
+            df1 = landcover_area_df(year1, roi, engine, region_fips)
+            df2 = landcover_area_df(year2, roi, engine, region_fips)
+
+            # (2, n_classes) array on the NLCD_CODES axis
+            compare_areas = areas_from_frames([df1, df2])
+            session_memory()["compare_areas"] = compare_areas
+            session_memory()["compare_years"] = (year1, year2)
+
+            present = compare_areas.any(axis=0)
+            n_present = int(present.sum())
+            keys = np.array([f"Class_{c}" for c in NLCD_CODES])[present]
+            points = pd.DataFrame({
+                "class_label": np.tile([NLCD_CLASSES[k] for k in keys], 2),
+                "class_key": np.tile(keys, 2),
+                "Year": np.repeat([year1, year2], n_present),
+                "Coverage (km²)": compare_areas[:, present].ravel(),
+            })
 
             fig = px.scatter(
-                melted,
+                points,
                 x="class_label",
                 y="Coverage (km²)",
                 color="Year",
@@ -413,6 +531,20 @@ if submit_button:
             with row1_col1:
                 st.plotly_chart(fig, use_container_width=True)
 
+            # Transitions and trends are cheap once the pixels are local.
+            stack = local_stack_for_roi(roi) if engine == ENGINE_LOCAL and region_fips is None else None
+            if stack is not None:
+                with row1_col1:
+                    with st.expander(f"Class transitions {year1} → {year2} (km²)"):
+                        st.dataframe(
+                            stack.transition_frame(year1, year2)
+                            .pivot(index="from_class", columns="to_class", values="area_km2")
+                            .fillna(0.0),
+                            use_container_width=True,
+                        )
+                    with st.expander(f"Multi-year trend ({YEARS[0]}–{YEARS[-1]})"):
+                        st.dataframe(stack.trend_frame(), use_container_width=True)
+
 
 # =============================================================================
 # PERCENT GAIN/LOSS
@@ -425,43 +557,97 @@ with row1_col2:
         submit_button2 = st.form_submit_button("Submit Selection")
 
 if submit_button2:
-    compare = st.session_state.get("compare_df")
-    years_pair = st.session_state.get("compare_years")
+    compare_areas = session_memory().get("compare_areas")
+    years_pair = session_memory().get("compare_years")
 
-    if compare is None or years_pair is None:
+    if compare_areas is None or years_pair is None:
         st.warning("Run the Scatter Plot comparison first.")
     else:
         y1, y2 = years_pair
-        compare = compare.copy()
-
-        compare["pct_change"] = compare.apply(
-            lambda r: ((r["area_km2_y2"] - r["area_km2_y1"]) / r["area_km2_y1"] * 100.0)
-            if r["area_km2_y1"] > 0 else None,
-            axis=1,
-        )
+        # Both years sit on their own axis position even when y1 == y2.
+        change = ChangeAnalysis(compare_areas, ("y1", "y2")).frame("y1", "y2")
+        pct = change["pct_change"].to_numpy()
+        icons = np.select([pct > 0, pct < 0], ["🔺 ", "🔻 "], default="")
+        by_class = {
+            key: f"{label}: baseline is 0 km² in {y1} (cannot compute %). ({a1:.3f} → {a2:.3f} km²)"
+            if np.isnan(p) else f"{icon}{label}: {p:.2f}% ({a1:.3f} → {a2:.3f} km²)"
+            for key, icon, label, p, a1, a2 in zip(
+                change["class_key"], icons, change["class_label"], pct, change["area_km2_y1"], change["area_km2_y2"]
+            )
+        }
+        # Listed in NLCD class order, like the checkboxes.
+        lines = [by_class.get(k, f"{NLCD_CLASSES[k]}: No data") for k, enabled in checks.items() if enabled]
 
         with row1_col1:
             st.subheader(f"Percent Gain/Loss ({y1} → {y2})")
-            for class_key, enabled in checks.items():
-                if not enabled:
-                    continue
-
-                row = compare.loc[compare["class_key"] == class_key]
-                label = NLCD_CLASSES.get(class_key, class_key)
-
-                if row.empty:
-                    st.write(f"{label}: No data")
-                    continue
-
-                pct = row["pct_change"].values[0]
-                a1 = row["area_km2_y1"].values[0]
-                a2 = row["area_km2_y2"].values[0]
-
-                if pct is None:
-                    st.write(f"{label}: baseline is 0 km² in {y1} (cannot compute %). ({a1:.3f} → {a2:.3f} km²)")
-                elif pct > 0:
-                    st.write(f"🔺 {label}: {pct:.2f}% ({a1:.3f} → {a2:.3f} km²)")
-                elif pct < 0:
-                    st.write(f"🔻 {label}: {pct:.2f}% ({a1:.3f} → {a2:.3f} km²)")
-                else:
-                    st.write(f"{label}: {pct:.2f}% ({a1:.3f} → {a2:.3f} km²)")
+            st.markdown("  \n".join(lines))
+
+# =============================================================================
+# MULTI-ROI COMPARISON
+# =============================================================================
+if compare_features:
+    with row1_col2:
+        with st.form("multi_roi"):
+            st.header("Compare Features")
+            compare_years = st.multiselect("Years", YEARS, default=[YEARS[0], YEARS[-1]])
+            submit_button3 = st.form_submit_button("Compare")
+
+    if submit_button3 and not compare_years:
+        st.warning("Select at least one year.")
+    elif submit_button3:
+        compare_years = sorted(compare_years)
+        labels = [label for label, _ in compare_features]
+        with st.spinner(f"Computing class areas for {len(labels)} features..."):
+            areas = feature_class_areas(
+                [(geometry_hash(geom), geom) for _, geom in compare_features],
+                compare_years,
+                ee_landcover_for_year,
+            )
+
+        with row1_col1:
+            st.subheader("Multi-ROI Comparison")
+            st.caption("Click a column header to sort.")
+            st.dataframe(
+                areas_wide_frame(areas, labels, compare_years).round(3),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+            if len(compare_years) > 1:
+                y1, y2 = compare_years[0], compare_years[-1]
+                change = ChangeAnalysis(areas, compare_years).summary(y1, y2)
+                st.markdown(f"**Net change {y1} → {y2}**")
+                st.dataframe(
+                    pd.DataFrame({
+                        "Feature": labels,
+                        "Gain (km²)": change["gain_km2"],
+                        "Loss (km²)": change["loss_km2"],
+                        "Net (km²)": change["net_km2"],
+                    }).round(3),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+            totals = areas.sum(axis=(1, 2))
+            shown = [labels[i] for i in np.argsort(-totals, kind="stable")[:MAX_SMALL_MULTIPLES]]
+            long_df = areas_long_frame(areas, labels, compare_years)
+            fig = px.bar(
+                long_df[long_df["feature"].isin(shown)],
+                x="class_label",
+                y="area_km2",
+                color="year",
+                barmode="group",
+                facet_col="feature",
+                facet_col_wrap=3,
+                category_orders={"feature": shown},
+                labels={"class_label": "Landcover", "area_km2": "Area (km²)", "year": "Year"},
+                height=300 * -(-len(shown) // 3),
+            )
+            fig.for_each_annotation(lambda a: a.update(text=a.text.split("=", 1)[-1]))
+            fig.update_yaxes(matches=None)
+            fig.update_xaxes(showticklabels=False)
+            st.plotly_chart(fig, use_container_width=True)
+            if len(labels) > len(shown):
+                st.caption(f"Charts show the {len(shown)} largest of {len(labels)} features.")
+
+tracing.perf_panel()
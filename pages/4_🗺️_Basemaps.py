@@ -3,6 +3,13 @@ import streamlit as st
 import leafmap.foliumap as leafmap
 import ee
 
+from utils import ee_auth, tracing
+from utils.map_cache import map_to_streamlit
+from utils.warmup import start_warmup
+
+tracing.instrument_ee()
+tracing.set_page("Basemaps")
+
 # AUTHENTICATE AND INITIALIZE EARTH ENGINE-----------------------------------------------------------------------
 import json, os
 from google.oauth2.credentials import Credentials as UserCredentials
@@ -31,18 +38,19 @@ project = st.secrets.get("ee_project") or os.environ.get("EE_PROJECT")
 creds = _get_oauth_credentials()
 
 if creds and project:
-    ee.Initialize(credentials=creds, project=project)
+    ee_auth.initialize(credentials=creds, project=project)
 else:
     # Local interactive fallback only (won't work on Streamlit Cloud)
     try:
-        ee.Initialize(project=project)
+        ee_auth.initialize(project=project)
     except Exception:
         ee.Authenticate()
-        ee.Initialize(project=project)
+        ee_auth.initialize(project=project)
 
 # AUTHENTICATE AND INITIALIZE EARTH ENGINE (end)-------------------------------------------------------------------
 
 st.set_page_config(layout="wide")
+start_warmup()
 
 st.sidebar.info('Credits:')
 st.sidebar.markdown('leafmap foliumap module')
@@ -66,5 +74,7 @@ if url:
     m.add_tile_layer(url, name='Tile Layer', attribution=' ')
 
 with col1:
-    m.to_streamlit()
+    map_to_streamlit(m)
+
+tracing.perf_panel()
 
@@ -0,0 +1,26 @@
+"""
+Run the app with the featured-layer warm-up started at process start.
+
+    python serve.py [streamlit run options]     e.g. python serve.py --server.port 8501
+
+Same as ``streamlit run Streamlit_Home.py`` except that ``utils.warmup``
+starts building the featured layers' map IDs in a background thread before
+the server starts, instead of with the first script run, so even the first
+visitors find the layers warm. Optional: the Procfile keeps ``streamlit run``.
+See ``utils/warmup.py`` for the WARMUP_* settings.
+"""
+import logging
+import os
+import sys
+
+from streamlit.web import cli
+
+from utils.warmup import start_warmup
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Streamlit_Home.py")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    start_warmup()
+    sys.argv = ["streamlit", "run", MAIN_SCRIPT, *sys.argv[1:]]
+    sys.exit(cli.main())
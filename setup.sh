@@ -14,5 +14,6 @@ echo "\
 headless = true\n\
 port = $PORT\n\
 enableCORS = false\n\
+enableStaticServing = true\n\
 \n\
 " > ~/.streamlit/config.toml
\ No newline at end of file
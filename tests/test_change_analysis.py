@@ -0,0 +1,98 @@
+"""
+Checks of the vectorized change analysis (utils.change_analysis) against a
+plain per-class loop on a small fixture.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_change_analysis import rowwise_pct_change, synthetic_areas
+from utils.change_analysis import ChangeAnalysis, areas_from_frames
+from utils.nlcd import NLCD_CODES
+
+YEARS = ("2001", "2011", "2019")
+
+
+@pytest.fixture
+def areas():
+    a = synthetic_areas(3, seed=1)[:, : len(YEARS)]
+    a[0, :, 0] = [0.0, 2.0, 0.0]  # baseline 0, then back to 0
+    a[1, :, 1] = 4.0  # unchanged class (ties in the ranking)
+    a[1, :, 2] = 4.0
+    return a
+
+
+def per_class_loop(a1, a2) -> dict:
+    """Reference: one year pair of one ROI, class by class."""
+    deltas = [float(y2 - y1) for y1, y2 in zip(a1, a2)]
+    gain = sum(d for d in deltas if d > 0)
+    loss = sum(d for d in deltas if d < 0)
+    # Largest gain first; equal changes keep NLCD class order.
+    order = sorted(range(len(deltas)), key=lambda k: -deltas[k])
+    rank = [0] * len(deltas)
+    for r, k in enumerate(order, start=1):
+        rank[k] = r
+    return {"delta": deltas, "gain": gain, "loss": loss, "net": gain + loss, "rank": rank}
+
+
+def test_matches_per_class_loop(areas):
+    result = ChangeAnalysis(areas, YEARS)
+    assert result.delta.shape == (3, 3, 3, len(NLCD_CODES))
+    assert result.gain.shape == result.loss.shape == result.net.shape == (3, 3, 3)
+    for b in range(areas.shape[0]):
+        for i in range(len(YEARS)):
+            for j in range(len(YEARS)):
+                expected = per_class_loop(areas[b, i], areas[b, j])
+                np.testing.assert_allclose(result.delta[b, i, j], expected["delta"])
+                assert result.gain[b, i, j] == pytest.approx(expected["gain"])
+                assert result.loss[b, i, j] == pytest.approx(expected["loss"])
+                assert result.net[b, i, j] == pytest.approx(expected["net"])
+                assert result.rank[b, i, j].tolist() == expected["rank"]
+
+
+def test_pct_change_matches_rowwise_apply(areas):
+    result = ChangeAnalysis(areas, YEARS)
+    for b in range(areas.shape[0]):
+        expected = rowwise_pct_change(areas[b, 0], areas[b, -1])
+        # The old apply() turns its None (0 km² baseline) into NaN, as here.
+        expected = [expected[c] for c in NLCD_CODES]
+        assert result.pct_change[b, 0, -1].tolist() == pytest.approx(expected, nan_ok=True)
+
+
+def test_same_year_pair_is_zero(areas):
+    result = ChangeAnalysis(areas, YEARS)
+    diagonal = result.delta[:, range(3), range(3)]
+    assert not diagonal.any()
+    assert not result.net[:, range(3), range(3)].any()
+
+
+def test_summary_and_frame(areas):
+    result = ChangeAnalysis(areas, YEARS)
+    summary = result.summary("2001", "2019")
+    np.testing.assert_allclose(summary["net_km2"], areas[:, 2].sum(axis=-1) - areas[:, 0].sum(axis=-1))
+
+    frame = result.frame("2001", "2019", batch_index=0)
+    assert frame["rank"].is_monotonic_increasing
+    assert ((frame["area_km2_y1"] > 0) | (frame["area_km2_y2"] > 0)).all()
+    assert "Class_11" not in set(frame["class_key"])  # 0 km² in both years
+
+
+def test_shape_checks():
+    with pytest.raises(ValueError):
+        ChangeAnalysis(np.zeros((2, len(NLCD_CODES))), YEARS)
+    with pytest.raises(ValueError):
+        ChangeAnalysis(np.zeros((3, 5)), YEARS)
+
+
+def test_areas_from_frames():
+    frames = [
+        pd.DataFrame({"class_key": ["Class_11", "Class_41", "Class_41", "Class_99"], "area_km2": [1.0, 2.0, 0.5, 7.0]}),
+        None,
+    ]
+    out = areas_from_frames(frames)
+    assert out.shape == (2, len(NLCD_CODES))
+    assert out[0, NLCD_CODES.index(11)] == 1.0
+    assert out[0, NLCD_CODES.index(41)] == 2.5
+    assert out[0].sum() == 3.5 and not out[1].any()
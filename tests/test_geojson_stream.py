@@ -0,0 +1,168 @@
+"""
+Checks of streaming GeoJSON upload parsing (utils.geojson_stream): accepted
+layouts, malformed input, the feature and memory limits, and geometry
+cleaning.
+
+    python -m pytest tests
+"""
+import io
+import json
+import math
+
+import pytest
+import shapely
+from shapely.geometry import shape
+
+from utils.geojson_stream import (
+    GeoJSONLimitError, GeoJSONParseError, read_upload_features, read_upload_geometries,
+)
+
+SQUARE = {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]}
+# Self-intersecting "bowtie": invalid, two triangles once repaired.
+BOWTIE = {"type": "Polygon", "coordinates": [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]}
+
+
+def _upload(obj) -> io.BytesIO:
+    raw = obj if isinstance(obj, bytes) else json.dumps(obj).encode("utf-8")
+    return io.BytesIO(raw)
+
+
+def _feature(geom, **properties) -> dict:
+    return {"type": "Feature", "geometry": geom, "properties": properties}
+
+
+def _collection(*features) -> dict:
+    return {"type": "FeatureCollection", "features": list(features)}
+
+
+def _circle(n: int, radius: float = 0.01) -> dict:
+    ring = [[radius * math.cos(2 * math.pi * i / n), radius * math.sin(2 * math.pi * i / n)] for i in range(n)]
+    return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+
+
+def _n_coords(geom: dict) -> int:
+    return int(shapely.get_num_coordinates(shape(geom)))
+
+
+# =============================================================================
+# LAYOUTS
+# =============================================================================
+def test_feature_collection_keeps_scalar_properties():
+    fc = _collection(_feature(SQUARE, name="a", area=1.5, nested={"x": 1}), _feature(SQUARE, name="b"))
+    features = read_upload_features(_upload(fc))
+    assert [props for _, props in features] == [{"name": "a", "area": 1.5}, {"name": "b"}]
+    assert shape(features[0][0]).equals(shape(SQUARE))
+
+
+def test_type_key_after_features():
+    raw = json.dumps({"features": [_feature(SQUARE, name="a")], "type": "FeatureCollection"}).encode("utf-8")
+    assert [props for _, props in read_upload_features(_upload(raw))] == [{"name": "a"}]
+
+
+def test_single_feature():
+    assert read_upload_features(_upload(_feature(SQUARE, name="a")))[0][1] == {"name": "a"}
+
+
+def test_bare_geometry():
+    (geom, props), = read_upload_features(_upload(SQUARE))
+    assert shape(geom).equals(shape(SQUARE)) and props == {}
+
+
+def test_bare_point():
+    assert read_upload_geometries(_upload({"type": "Point", "coordinates": [-95.5, 38.25]})) == [
+        {"type": "Point", "coordinates": (-95.5, 38.25)},
+    ]
+
+
+def test_unusable_features_are_skipped():
+    fc = _collection(
+        _feature(None),
+        _feature({"type": "Polygon", "coordinates": []}),
+        _feature({"type": "GeometryCollection", "geometries": []}),
+        "not a feature",
+        _feature(SQUARE, name="kept"),
+    )
+    assert [props for _, props in read_upload_features(_upload(fc))] == [{"name": "kept"}]
+
+
+def test_unknown_top_level_type_yields_nothing():
+    assert read_upload_features(_upload({"type": "Topology", "objects": {}})) == []
+    assert read_upload_features(_upload([SQUARE])) == []
+
+
+# =============================================================================
+# MALFORMED INPUT
+# =============================================================================
+def test_truncated_json():
+    raw = json.dumps(_collection(_feature(SQUARE), _feature(SQUARE))).encode("utf-8")
+    with pytest.raises(GeoJSONParseError):
+        read_upload_features(_upload(raw[: len(raw) // 2]))
+
+
+def test_not_json():
+    with pytest.raises(GeoJSONParseError):
+        read_upload_features(_upload(b"type,features\nPolygon,1\n"))
+
+
+def test_non_utf8_input():
+    raw = json.dumps(_collection(_feature(SQUARE, name="é")), ensure_ascii=False).encode("latin-1")
+    with pytest.raises(GeoJSONParseError):
+        read_upload_features(_upload(raw))
+    with pytest.raises(GeoJSONParseError):
+        read_upload_features(_upload(json.dumps(_feature(SQUARE)).encode("utf-16")))
+
+
+# =============================================================================
+# LIMITS
+# =============================================================================
+def test_max_features():
+    fc = _collection(*[_feature(SQUARE, i=i) for i in range(5)])
+    assert len(read_upload_features(_upload(fc), max_features=5)) == 5
+    with pytest.raises(GeoJSONLimitError, match="more than 4 features"):
+        read_upload_features(_upload(fc), max_features=4)
+
+
+def test_single_feature_over_the_memory_cap_is_rejected_while_parsing():
+    big = _circle(5000)
+    with pytest.raises(GeoJSONLimitError, match="single feature"):
+        read_upload_features(_upload(_collection(_feature(big))), max_memory_bytes=50_000, simplify_tolerance=0)
+
+
+def test_kept_geometries_over_the_memory_cap():
+    fc = _collection(*[_feature(_circle(200)) for _ in range(20)])
+    # Each feature fits on its own; together they do not.
+    with pytest.raises(GeoJSONLimitError, match="after simplification"):
+        read_upload_features(_upload(fc), max_memory_bytes=200_000, simplify_tolerance=0)
+
+
+def test_simplification_counts_toward_the_cap():
+    fc = _collection(*[_feature(_circle(200)) for _ in range(20)])
+    assert len(read_upload_features(_upload(fc), max_memory_bytes=200_000, simplify_tolerance=0.001)) == 20
+
+
+# =============================================================================
+# GEOMETRY CLEANING
+# =============================================================================
+def test_make_valid_self_intersecting_polygon():
+    assert not shape(BOWTIE).is_valid
+    (geom,) = read_upload_geometries(_upload(_feature(BOWTIE)), simplify_tolerance=0)
+    repaired = shape(geom)
+    assert repaired.is_valid
+    assert repaired.geom_type == "MultiPolygon" and len(repaired.geoms) == 2
+    assert repaired.area == pytest.approx(0.5)
+
+
+def test_simplify_tolerance():
+    circle = _circle(1000)
+    (exact,) = read_upload_geometries(_upload(circle), simplify_tolerance=0)
+    (simplified,) = read_upload_geometries(_upload(circle), simplify_tolerance=0.0001)
+    assert _n_coords(exact) == 1001
+    assert _n_coords(simplified) < _n_coords(exact) // 4
+    assert shape(simplified).is_valid
+    assert shape(simplified).area == pytest.approx(shape(exact).area, rel=0.01)
+
+
+def test_points_are_not_simplified():
+    points = {"type": "MultiPoint", "coordinates": [[0, 0], [0.00001, 0], [0.00002, 0]]}
+    (geom,) = read_upload_geometries(_upload(points), simplify_tolerance=1.0)
+    assert _n_coords(geom) == 3
@@ -0,0 +1,126 @@
+"""
+Checks of the local NLCD statistics engine (utils.nlcd_local) against
+``synthetic_stack``, with the expected values recomputed independently here.
+
+    python -m pytest tests
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from utils.nlcd import NLCD_CLASSES
+from utils.nlcd_local import NODATA, PIXEL_AREA_KM2, NlcdStack, evict_stacks, synthetic_stack
+
+YEARS = ("2001", "2006", "2011", "2019")
+
+
+@pytest.fixture(scope="module")
+def stack():
+    return synthetic_stack(shape=(64, 96), years=YEARS, seed=3, change_rate=0.1)
+
+
+def _expected_areas(data):
+    codes, counts = np.unique(data[data != NODATA], return_counts=True)
+    return {f"Class_{c}": n * PIXEL_AREA_KM2 for c, n in zip(codes, counts)}
+
+
+def test_synthetic_stack_layout(stack):
+    assert stack.data.shape == (len(YEARS), 64, 96)
+    assert stack.years == YEARS
+    border = 64 // 16
+    assert (stack.data[:, :border, :] == NODATA).all()
+    assert (stack.data[:, :, :border] == NODATA).all()
+    valid = {int(k.split("_")[1]) for k in NLCD_CLASSES}
+    assert set(np.unique(stack.data[:, border:, border:])) <= valid
+
+
+def test_synthetic_stack_is_deterministic():
+    a = synthetic_stack(shape=(32, 32), seed=7)
+    b = synthetic_stack(shape=(32, 32), seed=7)
+    assert np.array_equal(a.data, b.data)
+
+
+@pytest.mark.parametrize("year", YEARS)
+def test_areas_frame(stack, year):
+    df = stack.areas_frame(year)
+    expected = _expected_areas(stack.data[YEARS.index(year)])
+    assert dict(zip(df["class_key"], df["area_km2"])) == pytest.approx(expected)
+    assert list(df["area_km2"]) == sorted(df["area_km2"], reverse=True)
+    assert list(df["class_label"]) == [NLCD_CLASSES[k] for k in df["class_key"]]
+    assert "Class_0" not in set(df["class_key"])
+
+
+def test_total_area_excludes_nodata(stack):
+    valid_pixels = (stack.data[0] != NODATA).sum()
+    for areas in stack.class_areas_km2():
+        assert areas.sum() == pytest.approx(valid_pixels * PIXEL_AREA_KM2)
+
+
+def test_transition_matrix(stack):
+    y1, y2 = YEARS[0], YEARS[-1]
+    m = stack.transition_matrix(y1, y2)
+    a, b = stack.data[0].ravel(), stack.data[-1].ravel()
+    expected = np.zeros((256, 256))
+    for i, j in zip(a, b):
+        if i != NODATA and j != NODATA:
+            expected[i, j] += PIXEL_AREA_KM2
+    assert m == pytest.approx(expected)
+
+    # Rows and columns sum to the class areas of the two years.
+    areas = stack.class_areas_km2()
+    assert m.sum(axis=1) == pytest.approx(areas[0])
+    assert m.sum(axis=0) == pytest.approx(areas[-1])
+
+
+def test_transition_frame(stack):
+    m = stack.transition_matrix(YEARS[0], YEARS[1])
+    df = stack.transition_frame(YEARS[0], YEARS[1])
+    assert len(df) == np.count_nonzero(m)
+    assert df["area_km2"].sum() == pytest.approx(m.sum())
+    # Only ~10% of pixels change per step, so most of the area stays in its class.
+    same = df.loc[df["from_class"] == df["to_class"], "area_km2"].sum()
+    assert same / df["area_km2"].sum() > 0.85
+
+
+def test_trend_frame(stack):
+    df = stack.trend_frame().set_index("class_key")
+    t = np.array([int(y) for y in YEARS], dtype=float)
+    per_year = [_expected_areas(stack.data[i]) for i in range(len(YEARS))]
+    for key, row in df.iterrows():
+        a = np.array([areas.get(key, 0.0) for areas in per_year])
+        assert row["area_first_km2"] == pytest.approx(a[0])
+        assert row["area_last_km2"] == pytest.approx(a[-1])
+        assert row["net_change_km2"] == pytest.approx(a[-1] - a[0])
+        assert row["slope_km2_per_year"] == pytest.approx(np.polyfit(t, a, 1)[0], abs=1e-9)
+
+
+def test_unknown_year(stack):
+    with pytest.raises(KeyError):
+        stack.areas_frame("1999")
+
+
+def test_save_load_roundtrip(stack, tmp_path):
+    path = str(tmp_path / "stack.npy")
+    stack.save(path)
+    loaded = NlcdStack.load(path, YEARS)
+    assert not loaded.data.flags.writeable  # memory-mapped read-only
+    assert np.array_equal(loaded.data, stack.data)
+    assert loaded.areas_frame(YEARS[-1]).equals(stack.areas_frame(YEARS[-1]))
+
+
+def test_evict_stacks_removes_least_recently_used(tmp_path):
+    small = synthetic_stack(shape=(32, 32))
+    paths = [str(tmp_path / f"{i}.npy") for i in range(4)]
+    now = time.time()
+    for i, path in enumerate(paths):
+        small.save(path)
+        os.utime(path, (now + i, now + i))
+    # Touch the oldest, as a cache hit does.
+    os.utime(paths[0], (now + 10, now + 10))
+    size = os.path.getsize(paths[0])
+
+    freed = evict_stacks(str(tmp_path), max_bytes=2 * size, keep=paths[1])
+    assert freed == 2 * size
+    assert sorted(os.listdir(tmp_path)) == ["0.npy", "1.npy"]
@@ -0,0 +1,121 @@
+"""
+Checks of the bounded per-session store (utils.session_memory): both
+budgets, LRU spill and reload, dropping, and spill-file cleanup.
+
+    python -m pytest tests
+"""
+import gc
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.session_memory import SessionMemoryManager, approx_size
+
+KB = 1024
+
+
+def _blob(n_kb: int, fill: int = 0) -> np.ndarray:
+    return np.full(n_kb * KB, fill, dtype=np.uint8)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return SessionMemoryManager(session_budget=10 * KB, global_budget=25 * KB, spill_dir=str(tmp_path))
+
+
+def test_approx_size():
+    assert approx_size(_blob(4)) == 4 * KB
+    df = pd.DataFrame({"a": np.arange(1000, dtype=np.int64)})
+    assert approx_size(df) == df.memory_usage(deep=True).sum()
+    nested = [[float(i), float(i)] for i in range(1000)]
+    exact = sys.getsizeof(nested) + sum(sys.getsizeof(p) + 2 * sys.getsizeof(1.0) for p in nested)
+    assert approx_size(nested) == pytest.approx(exact, rel=0.05)
+
+
+def test_session_budget_spills_least_recently_used(manager, tmp_path):
+    mem = manager.session("a")
+    mem["x"] = _blob(4, 1)
+    mem["y"] = _blob(4, 2)
+    mem.get("x")  # y is now the least recently used
+    mem["z"] = _blob(4, 3)
+
+    stats = mem.stats()
+    assert stats["spilled_entries"] == 1
+    assert stats["bytes"] <= manager.session_budget
+    assert manager.spills == 1 and manager.loads == 0
+    assert len(os.listdir(tmp_path)) == 1
+
+    # Reading the spilled entry loads it back, and spills the next LRU entry.
+    assert (mem["y"] == 2).all()
+    assert manager.loads == 1 and manager.spills == 2
+    assert mem.stats()["spilled_entries"] == 1
+    assert "x" in mem and "y" in mem and "z" in mem
+
+
+def test_global_budget_spills_idle_sessions_first(tmp_path):
+    manager = SessionMemoryManager(session_budget=20 * KB, global_budget=20 * KB, spill_dir=str(tmp_path))
+    idle, active = manager.session("idle"), manager.session("active")
+    idle["a"] = _blob(8)
+    active["b"] = _blob(8)
+    active["c"] = _blob(8)  # within the session budget, over the global one
+
+    assert manager.bytes <= manager.global_budget
+    assert idle.stats()["spilled_entries"] == 1
+    assert active.stats()["spilled_entries"] == 0
+    assert (idle["a"] == 0).all()
+
+
+def test_value_larger_than_budget_stays(manager):
+    mem = manager.session("a")
+    mem["big"] = _blob(20)
+    assert (mem["big"] == 0).all()
+    assert manager.spills == 0
+
+
+def test_drop_when_spill_disabled(tmp_path):
+    manager = SessionMemoryManager(session_budget=10 * KB, global_budget=100 * KB, spill=False, spill_dir=str(tmp_path))
+    mem = manager.session("a")
+    mem["x"] = _blob(6)
+    mem["y"] = _blob(6)
+    assert "x" not in mem
+    assert mem.get("x") is None
+    assert manager.drops == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_discard_spilled_entry_without_loading(manager, tmp_path):
+    mem = manager.session("a")
+    mem["x"] = _blob(6)
+    mem["y"] = _blob(6)
+    assert len(os.listdir(tmp_path)) == 1
+
+    mem.discard("x")
+    assert "x" not in mem
+    assert os.listdir(tmp_path) == []
+    assert manager.loads == 0 and manager.spills == 1
+    assert manager.spilled_bytes == 0 and mem.spilled_bytes == 0
+    mem.discard("missing")
+
+
+def test_overwrite_replaces_accounting(manager):
+    mem = manager.session("a")
+    mem["x"] = _blob(2)
+    before = manager.bytes
+    mem["x"] = _blob(2)
+    assert manager.bytes == before
+
+
+def test_session_end_removes_spill_files_and_budget(manager, tmp_path):
+    mem = manager.session("a")
+    mem["x"] = _blob(6)
+    mem["y"] = _blob(6)
+    assert len(os.listdir(tmp_path)) == 1 and manager.bytes > 0
+
+    del mem
+    gc.collect()
+    assert os.listdir(tmp_path) == []
+    assert manager.bytes == 0 and manager.spilled_bytes == 0
+    assert manager.stats()["sessions"] == 0
@@ -0,0 +1,185 @@
+"""
+Checks of the tiered cache (utils.shared_cache) against every backend:
+TTL expiry, set-if-absent, fill locking and the per-tier counters.
+
+    python -m pytest tests
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from utils import shared_cache as sc
+from utils.shared_cache import FillTimeout, LocalRedis, MemoryBackend, RedisBackend, SharedCache, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.db"))
+    return RedisBackend(LocalRedis())
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(sc, "LOCK_POLL", 0.01)
+
+
+def _lock_key(cache, namespace, key):
+    return cache._key(namespace, key) + ":lock"
+
+
+def test_set_get_roundtrip(backend):
+    cache = SharedCache(backend)
+    cache.set("ns", "k", {"a": [1, 2.5, "x"]}, ttl=60)
+    assert cache.get("ns", "k") == {"a": [1, 2.5, "x"]}
+    # A second process sees it through the shared tier.
+    assert SharedCache(backend).get("ns", "k") == {"a": [1, 2.5, "x"]}
+    assert SharedCache(backend).get("ns", "missing", "dflt") == "dflt"
+
+
+def test_entries_are_json(backend):
+    cache = SharedCache(backend)
+    cache.set("ns", "k", "url", ttl=60)
+    value, expires = json.loads(backend.get(cache._key("ns", "k")))
+    assert value == "url" and expires > time.time()
+
+
+def test_ttl_expiry_in_both_tiers(backend):
+    writer = SharedCache(backend)
+    writer.set("ns", "k", 1, ttl=0.2)
+    reader = SharedCache(backend)
+    assert reader.get("ns", "k") == 1  # now also in the reader's local tier
+    time.sleep(0.3)
+    assert writer.get("ns", "k") is None
+    assert reader.get("ns", "k") is None
+
+
+def test_add_is_set_if_absent(backend):
+    assert backend.add("lock", b"a", 0.2) is True
+    assert backend.add("lock", b"b", 0.2) is False
+    time.sleep(0.3)
+    assert backend.add("lock", b"b", 0.2) is True
+
+
+def test_delete_if_and_renew_check_the_token(backend):
+    backend.add("lock", b"mine", 0.3)
+    assert backend.renew("lock", b"other", 10) is False
+    assert backend.delete_if("lock", b"other") is False
+    assert backend.renew("lock", b"mine", 10) is True
+    time.sleep(0.4)
+    assert backend.get("lock") == b"mine"
+    assert backend.delete_if("lock", b"mine") is True
+    assert backend.get("lock") is None
+
+
+def test_counters_per_tier(backend):
+    cache = SharedCache(backend)
+    assert cache.get_or_compute("ns", "k", lambda: 42, ttl=60) == 42
+    assert cache.get_or_compute("ns", "k", lambda: 0, ttl=60) == 42
+    other = SharedCache(backend)
+    assert other.get_or_compute("ns", "k", lambda: 0, ttl=60) == 42
+
+    stats = cache.stats()
+    assert stats["local"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert stats["shared"]["misses"] == 1 and stats["fills"] == 1
+    stats = other.stats()
+    assert stats["local"]["misses"] == 1 and stats["shared"]["hits"] == 1 and stats["fills"] == 0
+
+
+def test_concurrent_callers_compute_once(backend):
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.3)
+        return "value"
+
+    def caller():
+        # Separate SharedCache objects: two processes sharing the backend.
+        results.append(SharedCache(backend).get_or_compute("ns", "k", compute, ttl=60))
+
+    threads = [threading.Thread(target=caller) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == ["value", "value"]
+
+
+def test_waiter_takes_over_after_failed_fill(backend):
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("boom")
+
+    def filler():
+        try:
+            SharedCache(backend).get_or_compute("ns", "k", failing, ttl=60)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    t = threading.Thread(target=filler)
+    t.start()
+    started.wait()
+    waiter = SharedCache(backend)
+    t0 = time.time()
+    assert waiter.get_or_compute("ns", "k", lambda: "recovered", ttl=60) == "recovered"
+    t.join()
+    assert time.time() - t0 < 2
+    assert len(errors) == 1
+    assert waiter.stats()["lock_waits"] >= 1 and waiter.stats()["fills"] == 1
+
+
+def test_waiter_times_out_instead_of_computing(backend):
+    cache = SharedCache(backend)
+    backend.add(_lock_key(cache, "ns", "k"), b"someone-else", 10)
+    calls = []
+    with pytest.raises(FillTimeout):
+        cache.get_or_compute("ns", "k", lambda: calls.append(1), ttl=60, wait=0.2)
+    assert calls == []
+
+
+def test_lock_renewed_during_long_fill(backend, monkeypatch):
+    monkeypatch.setattr(sc, "LOCK_TTL", 0.3)
+    cache = SharedCache(backend)
+    lock_key = _lock_key(cache, "ns", "k")
+    seen = []
+
+    def slow():
+        time.sleep(0.8)
+        seen.append(backend.get(lock_key))
+        return 1
+
+    cache.get_or_compute("ns", "k", slow, ttl=60)
+    assert seen[0] is not None
+    assert backend.get(lock_key) is None
+
+
+def test_release_keeps_a_lock_taken_over_by_another_filler(backend):
+    cache = SharedCache(backend)
+    lock_key = _lock_key(cache, "ns", "k")
+
+    def compute():
+        # Our lock expired and another process took it.
+        backend.delete(lock_key)
+        backend.add(lock_key, b"other", 10)
+        return 1
+
+    cache.get_or_compute("ns", "k", compute, ttl=60)
+    assert backend.get(lock_key) == b"other"
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(max_entries=3)
+    for i in range(5):
+        backend.set(f"k{i}", b"v")
+    assert [backend.get(f"k{i}") for i in range(5)] == [None, None, b"v", b"v", b"v"]
@@ -0,0 +1,54 @@
+"""
+Checks of span tagging in utils.tracing: one trace ID per script run and
+cache-key tags from ``expr_scope``.
+
+    python -m pytest tests
+"""
+import contextvars
+import json
+
+import pytest
+
+from utils import tracing
+
+
+@pytest.fixture(autouse=True)
+def empty_tracer():
+    tracing.tracer.reset()
+    yield
+    tracing.tracer.reset()
+
+
+def _script_run(page: str, n_spans: int):
+    tracing.set_page(page)
+    for _ in range(n_spans):
+        with tracing.span("op"):
+            pass
+
+
+def test_one_trace_id_per_script_run():
+    contextvars.copy_context().run(_script_run, "A", 2)
+    contextvars.copy_context().run(_script_run, "A", 1)
+
+    spans = tracing.tracer.spans()
+    assert [s["page"] for s in spans] == ["A", "A", "A"]
+    assert spans[0]["trace_id"] == spans[1]["trace_id"] != spans[2]["trace_id"]
+
+    otlp = json.loads(tracing.tracer.export_otlp_json())
+    otlp_spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [s["traceId"] for s in otlp_spans] == [s["trace_id"] for s in spans]
+    assert len({s["spanId"] for s in otlp_spans}) == 3
+
+
+def test_expr_scope_tags_spans_with_the_cache_key():
+    traced = tracing._traced_function(lambda: 1, "ee.getInfo")
+    with tracing.expr_scope("0123456789abcdef0123"):
+        traced()
+    traced()
+
+    first, second = tracing.tracer.spans()
+    assert first["attrs"]["expr"] == "0123456789ab"
+    assert second["attrs"]["expr"] is None
+    otlp = json.loads(tracing.tracer.export_otlp_json())
+    keys = [[a["key"] for a in s["attributes"]] for s in otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    assert "expr" in keys[0] and "expr" not in keys[1]
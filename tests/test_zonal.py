@@ -0,0 +1,119 @@
+"""
+Checks of per-feature zonal statistics (utils.zonal) against the offline
+Earth Engine stand-in: chunking at ``ZONAL_CHUNK_SIZE`` and the
+per-(geometry, year) cache.
+
+    python -m pytest tests
+"""
+from benchmarks import fake_ee
+
+fake_ee.install()
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+from benchmarks.apptest_support import square_roi  # noqa: E402
+from utils import zonal  # noqa: E402
+from utils.ee_cache import geometry_hash  # noqa: E402
+from utils.layers import ee_landcover_for_year  # noqa: E402
+from utils.nlcd import NLCD_CODES  # noqa: E402
+from utils.shared_cache import MemoryBackend, SharedCache  # noqa: E402
+
+CHUNK = 3
+
+
+def _features(n: int, offset: int = 0) -> list:
+    geoms = [square_roi(-120 + (offset + i) * 0.5, 35.0) for i in range(n)]
+    return [(geometry_hash(g), g) for g in geoms]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(zonal, "shared_cache", SharedCache(MemoryBackend()))
+    monkeypatch.setattr(zonal, "ZONAL_CHUNK_SIZE", CHUNK)
+    fake_ee.reset_stats()
+
+
+@pytest.fixture
+def chunks(monkeypatch):
+    """(number of features, years) of every reduceRegions chunk."""
+    seen = []
+    reduce_chunk = zonal._reduce_chunk
+
+    def recording(chunk, years, landcover_for_year):
+        seen.append((len(chunk), tuple(years)))
+        return reduce_chunk(chunk, years, landcover_for_year)
+
+    monkeypatch.setattr(zonal, "_reduce_chunk", recording)
+    return seen
+
+
+def test_geometry_hash_ignores_key_order():
+    geom = square_roi()
+    reordered = {"coordinates": geom["coordinates"], "type": geom["type"]}
+    assert geometry_hash(geom) == geometry_hash(reordered)
+    assert geometry_hash(geom) != geometry_hash(square_roi(lon=-94.0))
+
+
+@pytest.mark.parametrize("n, sizes", [
+    (1, [1]),
+    (CHUNK - 1, [CHUNK - 1]),
+    (CHUNK, [CHUNK]),
+    (CHUNK + 1, [CHUNK, 1]),
+    (2 * CHUNK, [CHUNK, CHUNK]),
+    (2 * CHUNK + 1, [CHUNK, CHUNK, 1]),
+])
+def test_chunk_boundaries(chunks, n, sizes):
+    areas = zonal.feature_class_areas(_features(n), ["2001", "2019"], ee_landcover_for_year)
+    assert areas.shape == (n, 2, len(NLCD_CODES))
+    assert sorted(size for size, _ in chunks) == sorted(sizes)
+    assert fake_ee.stats()["calls"]["getInfo"] == len(sizes)
+
+
+def test_results_do_not_depend_on_chunking(monkeypatch):
+    features = _features(2 * CHUNK + 1)
+    chunked = zonal.feature_class_areas(features, ["2001", "2019"], ee_landcover_for_year)
+    monkeypatch.setattr(zonal, "shared_cache", SharedCache(MemoryBackend()))
+    monkeypatch.setattr(zonal, "ZONAL_CHUNK_SIZE", 100)
+    whole = zonal.feature_class_areas(features, ["2001", "2019"], ee_landcover_for_year)
+    np.testing.assert_allclose(chunked, whole)
+    assert (whole > 0).any()
+
+
+def test_repeat_is_served_from_cache(chunks):
+    features = _features(4)
+    first = zonal.feature_class_areas(features, ["2001"], ee_landcover_for_year)
+    fake_ee.reset_stats()
+    chunks.clear()
+    again = zonal.feature_class_areas(features, ["2001"], ee_landcover_for_year)
+    np.testing.assert_array_equal(first, again)
+    assert chunks == [] and fake_ee.stats()["total_calls"] == 0
+
+
+def test_shared_tier_hit_from_another_process(monkeypatch, chunks):
+    features = _features(2)
+    first = zonal.feature_class_areas(features, ["2001"], ee_landcover_for_year)
+    # A second process: same backend, empty local tier (JSON entries, str keys).
+    monkeypatch.setattr(zonal, "shared_cache", SharedCache(zonal.shared_cache.backend))
+    chunks.clear()
+    again = zonal.feature_class_areas(features, ["2001"], ee_landcover_for_year)
+    np.testing.assert_array_equal(first, again)
+    assert chunks == []
+
+
+def test_new_year_reduces_only_that_year(chunks):
+    features = _features(4)
+    zonal.feature_class_areas(features, ["2001"], ee_landcover_for_year)
+    chunks.clear()
+    areas = zonal.feature_class_areas(features, ["2001", "2019"], ee_landcover_for_year)
+    assert sorted(chunks) == [(1, ("2019",)), (CHUNK, ("2019",))]
+    assert areas[:, 1].any()
+
+
+def test_new_feature_reduces_only_that_feature(chunks):
+    old = _features(2)
+    before = zonal.feature_class_areas(old, ["2001"], ee_landcover_for_year)
+    chunks.clear()
+    areas = zonal.feature_class_areas(old + _features(1, offset=10), ["2001"], ee_landcover_for_year)
+    assert chunks == [(1, ("2001",))]
+    np.testing.assert_array_equal(areas[:2], before)
@@ -0,0 +1,109 @@
+"""
+Vectorized land-cover change analysis.
+
+Everything works on a class-area array of shape (..., n_years, n_classes),
+where the class axis follows ``NLCD_CODES`` and any leading axes are a batch
+(e.g. one row per ROI). A single call computes absolute and percent change,
+net gain/loss and class ranking for every class and every ordered year pair,
+so batch jobs over thousands of ROIs never fall back to per-row Python.
+
+Pair axes are (from_year, to_year): ``delta[..., i, j, c]`` is the change of
+class ``c`` from year ``i`` to year ``j``.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.nlcd import NLCD_CLASSES, NLCD_CODES
+
+_CODE_INDEX = np.full(256, -1, dtype=np.int64)
+_CODE_INDEX[list(NLCD_CODES)] = np.arange(len(NLCD_CODES))
+
+
+def class_axis_from_codes(areas_by_code: np.ndarray) -> np.ndarray:
+    """Compact a 256-wide array indexed by raw class code onto the ``NLCD_CODES`` axis."""
+    return np.asarray(areas_by_code)[..., list(NLCD_CODES)]
+
+
+def areas_from_frames(frames) -> np.ndarray:
+    """
+    Stack per-year class-area frames (``class_key`` / ``area_km2`` columns, as
+    returned by the stats helpers) into an array of shape (n_years, n_classes).
+    Classes missing from a frame get 0 km².
+    """
+    out = np.zeros((len(frames), len(NLCD_CODES)), dtype=float)
+    for i, df in enumerate(frames):
+        if df is None or df.empty:
+            continue
+        codes = df["class_key"].str.slice(6).astype(int).to_numpy()
+        idx = _CODE_INDEX[codes]
+        keep = idx >= 0
+        np.add.at(out[i], idx[keep], df["area_km2"].to_numpy(dtype=float)[keep])
+    return out
+
+
+class ChangeAnalysis:
+    """
+    Change tables for all classes and all year pairs, computed in one pass.
+
+    Attributes (shapes for areas of shape (..., Y, C)):
+      delta        (..., Y, Y, C)  absolute change, km²
+      pct_change   (..., Y, Y, C)  percent change; NaN where the baseline is 0
+      gain, loss   (..., Y, Y)     total km² gained / lost across classes
+      net          (..., Y, Y)     gain + loss
+      rank         (..., Y, Y, C)  1 = largest gain ... C = largest loss
+    """
+
+    def __init__(self, areas, years):
+        a = np.asarray(areas, dtype=float)
+        if a.shape[-2] != len(years):
+            raise ValueError(f"expected {len(years)} years on axis -2, got shape {a.shape}")
+        if a.shape[-1] != len(NLCD_CODES):
+            raise ValueError(f"expected {len(NLCD_CODES)} classes on axis -1, got shape {a.shape}")
+        self.areas = a
+        self.years = tuple(str(y) for y in years)
+
+        base = a[..., :, None, :]
+        self.delta = a[..., None, :, :] - base
+        self.pct_change = np.divide(
+            self.delta * 100.0,
+            base,
+            out=np.full(self.delta.shape, np.nan),
+            where=base > 0,
+        )
+        self.gain = np.where(self.delta > 0, self.delta, 0.0).sum(axis=-1)
+        self.loss = np.where(self.delta < 0, self.delta, 0.0).sum(axis=-1)
+        self.net = self.gain + self.loss
+        order = np.argsort(-self.delta, axis=-1, kind="stable")
+        self.rank = np.empty_like(order)
+        np.put_along_axis(self.rank, order, np.arange(1, a.shape[-1] + 1), axis=-1)
+
+    def _pair(self, year1, year2):
+        return self.years.index(str(year1)), self.years.index(str(year2))
+
+    def frame(self, year1, year2, batch_index=()) -> pd.DataFrame:
+        """
+        One year pair as a table (for the UI), sorted by rank. Classes with no
+        area in either year are dropped.
+        """
+        i, j = self._pair(year1, year2)
+        a = self.areas[batch_index]
+        df = pd.DataFrame({
+            "class_key": [f"Class_{c}" for c in NLCD_CODES],
+            "class_label": [NLCD_CLASSES[f"Class_{c}"] for c in NLCD_CODES],
+            "area_km2_y1": a[i],
+            "area_km2_y2": a[j],
+            "change_km2": self.delta[batch_index][i, j],
+            "pct_change": self.pct_change[batch_index][i, j],
+            "rank": self.rank[batch_index][i, j],
+        })
+        df = df[(df["area_km2_y1"] > 0) | (df["area_km2_y2"] > 0)]
+        return df.sort_values("rank").reset_index(drop=True)
+
+    def summary(self, year1, year2) -> dict:
+        """Batch-shaped gain/loss/net arrays for one year pair."""
+        i, j = self._pair(year1, year2)
+        return {
+            "gain_km2": self.gain[..., i, j],
+            "loss_km2": self.loss[..., i, j],
+            "net_km2": self.net[..., i, j],
+        }
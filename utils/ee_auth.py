@@ -0,0 +1,77 @@
+"""
+Non-interactive Earth Engine initialization for code running outside a page.
+
+Pages initialize EE themselves (and may fall back to ``ee.Authenticate()``);
+background work such as ``utils.warmup`` cannot prompt, so it uses the same
+credentials the pages read (Streamlit secrets ``ee_private_key`` /
+``ee_project``, or the ``EE_OAUTH_JSON`` / ``EE_PROJECT`` environment
+variables) and otherwise whatever default credentials are on the machine.
+
+``initialize()`` is ``ee.Initialize`` under one process-wide lock. Pages and
+the warm-up thread both go through it, so the two never initialize the
+client library concurrently.
+"""
+import json
+import os
+import threading
+
+import ee
+
+_init_lock = threading.Lock()
+
+
+def _secret(name: str):
+    try:
+        import streamlit as st
+
+        return st.secrets.get(name)
+    except Exception:
+        # No secrets.toml (or not running under Streamlit).
+        return None
+
+
+def oauth_credentials():
+    """User OAuth credentials from secrets/env, or None if not configured."""
+    from google.oauth2.credentials import Credentials as UserCredentials
+
+    data = _secret("ee_private_key") or os.environ.get("EE_OAUTH_JSON")
+    if not data:
+        return None
+    info = json.loads(data) if isinstance(data, str) else dict(data)
+
+    needed = {"client_id", "client_secret", "refresh_token", "scopes"}
+    if not needed.issubset(info.keys()):
+        return None
+
+    return UserCredentials(
+        token=None,
+        refresh_token=info["refresh_token"],
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=info["client_id"],
+        client_secret=info["client_secret"],
+        scopes=info["scopes"],
+    )
+
+
+def is_initialized() -> bool:
+    check = getattr(ee.data, "is_initialized", None)
+    return bool(check()) if check else False
+
+
+def initialize(**kwargs):
+    """``ee.Initialize(**kwargs)``, serialized with every other initialization in the process."""
+    with _init_lock:
+        ee.Initialize(**kwargs)
+
+
+def ensure_initialized():
+    """Initialize EE once per process; raises if no usable credentials exist."""
+    with _init_lock:
+        if is_initialized():
+            return
+        project = _secret("ee_project") or os.environ.get("EE_PROJECT")
+        creds = oauth_credentials()
+        if creds is not None:
+            ee.Initialize(credentials=creds, project=project)
+        else:
+            ee.Initialize(project=project)
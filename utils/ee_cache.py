@@ -0,0 +1,117 @@
+"""
+Earth Engine results cached in the shared cache tier (``utils.shared_cache``).
+
+Keys are hashes of the serialized EE expression, so the same layer or
+statistic requested by any session on any replica is computed once per TTL.
+Tile URLs from ``getMapId()`` carry a token that eventually expires, hence
+the much shorter TTL for map IDs than for (static) NLCD statistics.
+
+``prefetch_tile_url()`` fills the same cache from a small thread pool so a
+page can request several layers at once and only wait for the one it shows.
+Layers already in the cache are answered in the calling thread, so a warm
+rerun never queues behind other sessions' cold ``getMapId()`` calls.
+
+Fills run inside ``tracing.expr_scope(key)``, so their EE spans are tagged
+with the cache key instead of serializing the expression a second time.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import ee
+import folium
+
+from utils import tracing
+from utils.shared_cache import shared_cache
+
+MAP_ID_TTL = float(os.environ.get("MAP_ID_TTL_S", str(3 * 3600)))
+STATS_TTL = float(os.environ.get("STATS_TTL_S", str(7 * 24 * 3600)))
+PREFETCH_WORKERS = int(os.environ.get("EE_PREFETCH_WORKERS", "8"))
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="ee-prefetch")
+_prefetch_lock = threading.Lock()
+_in_flight = {}
+
+
+def expr_key(*parts) -> str:
+    """Hash of EE objects (by serialized expression) and plain JSON-able values."""
+    h = hashlib.sha1()
+    for p in parts:
+        text = p.serialize() if isinstance(p, ee.ComputedObject) else json.dumps(p, sort_keys=True, default=str)
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def geometry_hash(geom: dict) -> str:
+    """Stable hash of a GeoJSON geometry dict (key order independent)."""
+    payload = json.dumps(geom, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def tile_url(ee_image, vis_params=None) -> str:
+    """Tile URL template for an image rendered with ``vis_params`` (cached map ID)."""
+    image = ee.Image(ee_image)
+    vis_params = vis_params or {}
+    return _tile_url(image, vis_params, expr_key(image, vis_params))
+
+
+def _tile_url(image, vis_params, key) -> str:
+    def compute():
+        with tracing.expr_scope(key):
+            return image.getMapId(vis_params)["tile_fetcher"].url_format
+
+    return shared_cache.get_or_compute("tile_url", key, compute, MAP_ID_TTL)
+
+
+def prefetch_tile_url(ee_image, vis_params=None, key: str = None):
+    """
+    Start ``tile_url()`` in the background; returns a Future for the URL.
+    A cached URL comes back as an already completed Future, and concurrent
+    requests for the same missing layer share one Future. Callers that reuse
+    a layer can pass its ``expr_key(image, vis_params)`` as ``key`` to skip
+    serializing the expression again.
+    """
+    image = ee.Image(ee_image)
+    vis_params = vis_params or {}
+    key = key or expr_key(image, vis_params)
+    cached = shared_cache.get("tile_url", key)
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+    with _prefetch_lock:
+        future = _in_flight.get(key)
+        if future is not None:
+            return future
+        # Run under the caller's context so spans keep the page tag.
+        future = _prefetch_pool.submit(contextvars.copy_context().run, _tile_url, image, vis_params, key)
+        _in_flight[key] = future
+
+    def done(_):
+        with _prefetch_lock:
+            _in_flight.pop(key, None)
+
+    future.add_done_callback(done)
+    return future
+
+
+def ee_tile_layer(ee_image, vis_params: dict, name: str, **kwargs) -> folium.TileLayer:
+    """folium.TileLayer for an EE image, using a cached map ID."""
+    options = {"attr": "Google Earth Engine", "overlay": True, "control": True}
+    options.update(kwargs)
+    return folium.TileLayer(tiles=tile_url(ee_image, vis_params), name=name, **options)
+
+
+def get_info(ee_object, ttl: float = STATS_TTL):
+    """``ee_object.getInfo()``, cached by expression."""
+    key = expr_key(ee_object)
+
+    def compute():
+        with tracing.expr_scope(key):
+            return ee_object.getInfo()
+
+    return shared_cache.get_or_compute("info", key, compute, ttl)
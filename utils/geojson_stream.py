@@ -0,0 +1,176 @@
+"""
+Streaming, memory-bounded parsing of uploaded GeoJSON.
+
+``json.loads(uploaded_file.getvalue().decode())`` keeps the raw bytes, the
+decoded string and the whole Python object tree alive at once. Here features
+are pulled from the file one at a time with ijson, each geometry is validated
+and simplified as soon as it is read, and only the simplified result is kept.
+A feature limit and an approximate memory cap bound what a single upload can
+hold on to. The cap also applies while one feature is being built, so a
+single huge geometry is rejected before it is fully in memory. Malformed
+files raise ``GeoJSONParseError``.
+"""
+import os
+
+import ijson
+from ijson.common import ObjectBuilder
+import shapely
+from shapely.geometry import mapping, shape
+
+GEOMETRY_TYPES = ("Polygon", "MultiPolygon", "Point", "MultiPoint", "LineString", "MultiLineString")
+
+MAX_FEATURES = int(os.environ.get("GEOJSON_MAX_FEATURES", "5000"))
+MAX_MEMORY_BYTES = int(float(os.environ.get("GEOJSON_MAX_MEMORY_MB", "64")) * 1024 * 1024)
+# Degrees; ~10 m at mid latitudes, well below the 30 m NLCD pixel. 0 disables.
+SIMPLIFY_TOLERANCE = float(os.environ.get("GEOJSON_SIMPLIFY_TOLERANCE", "0.0001"))
+
+# Rough cost of one kept coordinate pair (two floats in nested lists).
+_BYTES_PER_COORD = 2 * 24 + 56 + 8
+
+
+class GeoJSONLimitError(ValueError):
+    """The upload exceeds the feature limit or the memory cap."""
+
+
+class GeoJSONParseError(ValueError):
+    """The upload is not well-formed JSON."""
+
+
+_STARTS = ("start_map", "start_array", "string", "number", "boolean", "null")
+_DEPTH = {"start_map": 1, "start_array": 1, "end_map": -1, "end_array": -1}
+
+
+def _bounded_items(fileobj, prefix: str, max_bytes: int):
+    """
+    Like ``ijson.items(fileobj, prefix)``, but raises GeoJSONLimitError as
+    soon as the item being built holds more numbers than ``max_bytes`` allows.
+    """
+    max_numbers = max(1, max_bytes // (_BYTES_PER_COORD // 2))
+    builder = None
+    for path, event, value in ijson.parse(fileobj, use_float=True):
+        if builder is None:
+            if path != prefix or event not in _STARTS:
+                continue
+            builder, depth, numbers = ObjectBuilder(), 0, 0
+            add = builder.event
+        add(event, value)
+        step = _DEPTH.get(event)
+        if step is None:
+            if event == "number":
+                numbers += 1
+                if numbers > max_numbers:
+                    raise GeoJSONLimitError(
+                        f"A single feature exceeds the {max_bytes / 1e6:.0f} MB limit before simplification."
+                    )
+            continue
+        depth += step
+        if depth == 0:
+            yield builder.value
+            builder = None
+
+
+def _top_level_type(fileobj):
+    fileobj.seek(0)
+    try:
+        return next(ijson.items(fileobj, "type"), None)
+    finally:
+        fileobj.seek(0)
+
+
+def _clean_geometry(geom, simplify_tolerance):
+    """(validated, simplified GeoJSON geometry dict, coordinate count), or None if unusable."""
+    if not isinstance(geom, dict) or geom.get("type") not in GEOMETRY_TYPES:
+        return None
+    try:
+        g = shape(geom)
+    except (ValueError, TypeError, AttributeError, IndexError):
+        return None
+    if g.is_empty:
+        return None
+    if not g.is_valid and g.geom_type in ("Polygon", "MultiPolygon"):
+        g = shapely.make_valid(g)
+        if g.geom_type == "GeometryCollection":
+            g = shapely.union_all([p for p in g.geoms if p.geom_type in ("Polygon", "MultiPolygon")])
+    if simplify_tolerance > 0 and g.geom_type not in ("Point", "MultiPoint"):
+        g = g.simplify(simplify_tolerance, preserve_topology=True)
+    if g.is_empty:
+        return None
+    return mapping(g), int(shapely.get_num_coordinates(g))
+
+
+def _scalar_properties(properties) -> dict:
+    """Only the scalar properties of a feature (nested values can be large)."""
+    if not isinstance(properties, dict):
+        return {}
+    return {k: v for k, v in properties.items() if isinstance(v, (str, int, float, bool))}
+
+
+def iter_upload_features(
+    fileobj,
+    max_features: int = MAX_FEATURES,
+    max_memory_bytes: int = MAX_MEMORY_BYTES,
+    simplify_tolerance: float = SIMPLIFY_TOLERANCE,
+):
+    """
+    Yield (cleaned GeoJSON geometry dict, scalar properties) for every usable
+    feature of a binary file-like object holding a Geometry, Feature or
+    FeatureCollection.
+
+    Raises GeoJSONLimitError once more than ``max_features`` features are read,
+    a single feature or the kept geometries exceed ``max_memory_bytes``
+    (approximate), and GeoJSONParseError for malformed JSON.
+    """
+    try:
+        yield from _iter_upload_features(fileobj, max_features, max_memory_bytes, simplify_tolerance)
+    except ijson.JSONError as e:
+        detail = e.args[0] if e.args else e
+        if isinstance(detail, bytes):
+            detail = detail.decode("utf-8", "replace")
+        raise GeoJSONParseError(f"Not a valid GeoJSON file ({str(detail).strip().splitlines()[0]}).") from e
+    except UnicodeDecodeError as e:
+        raise GeoJSONParseError("Not a valid GeoJSON file: it is not UTF-8 text.") from e
+
+
+def _iter_upload_features(fileobj, max_features, max_memory_bytes, simplify_tolerance):
+    kind = _top_level_type(fileobj)
+
+    if kind == "FeatureCollection":
+        features = _bounded_items(fileobj, "features.item", max_memory_bytes)
+    elif kind in ("Feature",) + GEOMETRY_TYPES:
+        obj = next(_bounded_items(fileobj, "", max_memory_bytes), None)
+        features = [obj if kind == "Feature" else {"type": "Feature", "geometry": obj}]
+    else:
+        return
+
+    kept_bytes = 0
+    for n, feature in enumerate(features, start=1):
+        if n > max_features:
+            raise GeoJSONLimitError(f"Upload has more than {max_features} features.")
+        if not isinstance(feature, dict):
+            continue
+        cleaned = _clean_geometry(feature.get("geometry"), simplify_tolerance)
+        if cleaned is None:
+            continue
+        geom, n_coords = cleaned
+        kept_bytes += n_coords * _BYTES_PER_COORD
+        if kept_bytes > max_memory_bytes:
+            raise GeoJSONLimitError(
+                f"Upload geometries exceed the {max_memory_bytes / 1e6:.0f} MB limit after simplification."
+            )
+        yield geom, _scalar_properties(feature.get("properties"))
+
+
+def iter_upload_geometries(fileobj, **limits):
+    """Cleaned geometries only (see ``iter_upload_features``)."""
+    for geom, _ in iter_upload_features(fileobj, **limits):
+        yield geom
+
+
+def read_upload_geometries(fileobj, **limits) -> list:
+    """All cleaned geometries of an upload (see ``iter_upload_features``)."""
+    return list(iter_upload_geometries(fileobj, **limits))
+
+
+def read_upload_features(fileobj, **limits) -> list:
+    """All (geometry, properties) pairs of an upload (see ``iter_upload_features``)."""
+    return list(iter_upload_features(fileobj, **limits))
@@ -0,0 +1,160 @@
+"""
+Featured Earth Engine layers, shared by the pages and the process-start warm-up.
+
+Pages and ``utils.warmup`` build these through the same functions so the
+serialized expressions (and therefore the cached map IDs) are identical. All
+builders are lazy: EE objects can only be created after ``ee.Initialize``.
+"""
+import ee
+
+from utils.nlcd import NLCD_COLORS, YEARS
+
+# =============================================================================
+# HOME: snow cover + boundaries
+# =============================================================================
+SNOW_COVER_VIS = {
+    "min": 0,
+    "max": 100,
+    "palette": ["000000", "0dffff", "0524ff", "ffffff"],
+}
+STYLE_US = {"color": "yellow", "width": 2, "fillColor": "00000000"}
+STYLE_WORLD = {"color": "cyan", "width": 2, "fillColor": "00000000"}
+
+
+def snow_cover() -> ee.Image:
+    """MODIS snow cover mosaic (an ee.Image, not an ImageCollection)."""
+    return (
+        ee.ImageCollection("MODIS/061/MOD10A1")
+        .filterDate("2025-12-28", "2026-01-05")
+        .select("NDSI_Snow_Cover")
+        .mosaic()
+    )
+
+
+def us_states_outline() -> ee.Image:
+    return ee.FeatureCollection("TIGER/2018/States").style(**STYLE_US)
+
+
+def world_countries_outline() -> ee.Image:
+    return ee.FeatureCollection("users/giswqs/public/countries").style(**STYLE_WORLD)
+
+
+# =============================================================================
+# HEATMAP: ERA5-Land decadal means
+# =============================================================================
+ERA5_PERIODS = {
+    "1990–1999": ("1990-05-01", "1999-05-01"),
+    "2010–2019": ("2010-05-01", "2019-05-01"),
+}
+
+ERA5_VIS = {
+    "min": -15,
+    "max": 38,
+    "bands": ["skin_temperature"],
+    "palette": [
+        "000080","0000D9","4000FF","8000FF","0080FF","00FFFF",
+        "00FF80","80FF00","DAFF00","FFFF00","FFF500","FFDA00",
+        "FFB000","FFA400","FF4F00","FF2500","FF0A00","FF00FF",
+    ],
+}
+
+
+def era5_land_mean_celsius(start_date: str, end_date: str) -> ee.Image:
+    # ERA5-Land monthly band is Kelvin; convert to Celsius after mean.
+    col = (
+        ee.ImageCollection("ECMWF/ERA5_LAND/MONTHLY")
+        .filterDate(start_date, end_date)
+        .select("skin_temperature")
+    )
+    return col.mean().subtract(273.15).rename("skin_temperature")
+
+
+# =============================================================================
+# LAKE RECESSION: Landsat 7 composites
+# =============================================================================
+# name -> (lat, lon, zoom) of the lake's map view
+LAKES = {
+    "Lake Mead, NV": (36.20, -114.41, 10),
+    "Salton Sea, CA": (33.31321356759435, -115.85446197484563, 10),
+    "Great Salt Lake, UT": (41.08008337991904, -112.43915367456692, 9),
+    "Aral Sea, Kazakhstan/Uzebekistan": (45.25402686187612, 59.013008598795004, 8),
+}
+
+# Use a sane natural-color stretch (scaled reflectance)
+LANDSAT_VIS = {
+    "bands": ["SR_B7", "SR_B5", "SR_B3"],  # SWIR2, SWIR1, Red
+    "min": 0.02,
+    "max": 0.40,
+    "gamma": 1.1,
+}
+
+
+def landsat7_sr_scaled(img: ee.Image) -> ee.Image:
+    """
+    Landsat Collection 2 Level-2 SR scaling:
+      reflectance = SR * 0.0000275 + (-0.2)
+    Applies to SR_B1..SR_B7.
+    """
+    sr = img.select(["SR_B1", "SR_B2", "SR_B3", "SR_B4", "SR_B5", "SR_B7"]) \
+            .multiply(0.0000275).add(-0.2)
+    return img.addBands(sr, overwrite=True)
+
+
+def landsat_composite(year: int) -> ee.Image:
+    """Median scaled Landsat 7 SR composite for one calendar year."""
+    ic = ee.ImageCollection("LANDSAT/LE07/C02/T1_L2").map(landsat7_sr_scaled)
+    return ic.filterDate(f"{year}-01-01", f"{year + 1}-01-01").median()
+
+
+# =============================================================================
+# LAND USE: NLCD
+# =============================================================================
+def nlcd_dataset() -> ee.ImageCollection:
+    return ee.ImageCollection("USGS/NLCD_RELEASES/2019_REL/NLCD")
+
+
+def ee_landcover_for_year(y: str) -> ee.Image:
+    img = nlcd_dataset().filter(ee.Filter.eq("system:index", y)).first()
+    return ee.Image(img).select("landcover")
+
+
+def nlcd_display_layer_for_year(y: str):
+    """
+    Discrete-color NLCD display guaranteed in Folium:
+    remap original class values -> 0..N-1 + palette
+    """
+    landcover = ee_landcover_for_year(y)
+    class_values = list(NLCD_COLORS.keys())
+    palette = [NLCD_COLORS[v][1] for v in class_values]
+    remapped = landcover.remap(class_values, list(range(len(class_values)))).rename("nlcd")
+    vis = {"min": 0, "max": len(class_values) - 1, "palette": palette}
+    return remapped, vis, landcover
+
+
+# =============================================================================
+# FEATURED LAYERS
+# =============================================================================
+def featured_layers() -> dict:
+    """
+    Every layer a page shows on first load, by group:
+    {group: [(layer name, builder returning (ee.Image, vis_params)), ...]}.
+    """
+    return {
+        "home": [
+            ("Snow Cover", lambda: (snow_cover(), SNOW_COVER_VIS)),
+            ("US States", lambda: (us_states_outline(), {})),
+            ("World Countries", lambda: (world_countries_outline(), {})),
+        ],
+        "heatmap": [
+            (f"Land Temps {label}", lambda s=start, e=end: (era5_land_mean_celsius(s, e), ERA5_VIS))
+            for label, (start, end) in ERA5_PERIODS.items()
+        ],
+        "lakes": [
+            (f"Landsat {year}", lambda y=year: (landsat_composite(y), LANDSAT_VIS))
+            for year in (2001, 2020)
+        ],
+        "nlcd": [
+            (f"NLCD {year}", lambda y=year: nlcd_display_layer_for_year(y)[:2])
+            for year in YEARS
+        ],
+    }
@@ -0,0 +1,203 @@
+"""
+Process-wide cache of serialized folium map HTML.
+
+Pages rebuild their folium/leafmap maps on every rerun, and rendering the map
+to HTML (legend, plugins, split controls, text overlays) is a noticeable part
+of each rerun. When a rerun produces a map with the same layers, tile URLs and
+options as an earlier one (in this session or any other), the HTML from that
+earlier render is reused instead.
+
+The cache key is a fingerprint of the map's element tree: element types, tile
+URLs, locations and options, including the figure's header/html/script
+sections. Elements built from raw HTML (``folium.Element(html)``) contribute
+their template source, and elements whose template was assigned per instance
+(e.g. a ``MacroElement`` legend) contribute a hash of the rendered template.
+Anything else the HTML depends on can be passed through ``key_extra``.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit.components.v1 as components
+from branca.element import Element, MacroElement
+
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = int(os.environ.get("MAP_HTML_CACHE_MAX_ENTRIES", "64"))
+MAX_BYTES = int(os.environ.get("MAP_HTML_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Per-element attributes that never affect the rendered output (or hold
+# references back into the tree).
+_SKIP_ATTRS = {"_id", "_parent", "_children", "_template", "_env"}
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _plain(value):
+    """Reduce a value to something JSON-serializable and stable across reruns."""
+    if isinstance(value, _SCALARS):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    # Unknown objects (JsCode, Templates, ...) contribute their type only.
+    return f"<{type(value).__module__}.{type(value).__qualname__}>"
+
+
+def _template_digest(element):
+    """
+    Hash of a template assigned to this element instance. Class-level
+    templates are covered by the element type, and templates built from a
+    string keep their source in ``_template_str``; anything else is rendered.
+    """
+    template = vars(element).get("_template")
+    if template is None or getattr(element, "_template_str", None) or getattr(element, "_template_name", None):
+        return None
+    try:
+        if isinstance(element, MacroElement):
+            module = template.module
+            text = "".join(
+                str(getattr(module, name)(element, {})) for name in ("header", "html", "script") if hasattr(module, name)
+            )
+        elif not element._children:
+            text = template.render(this=element, kwargs={})
+        else:
+            return None
+    except Exception as exc:
+        logger.debug("map cache: cannot render %s template for its fingerprint: %s", type(element).__name__, exc)
+        # Unique per element: never share a render we could not fingerprint.
+        return f"<unrendered {element._id}>"
+    # Element ids are random per rerun; leave them out so identical maps match.
+    text = text.replace(element.get_name(), "")
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _walk(element, out: list, _seen=None):
+    seen = set() if _seen is None else _seen
+    seen.add(id(element))
+    cls = type(element)
+    attrs = {}
+    for k, v in sorted(vars(element).items()):
+        if k in _SKIP_ATTRS:
+            continue
+        if isinstance(v, Element):
+            # Figure.header/html/script (and some plugins) keep subtrees in attributes.
+            sub = []
+            if id(v) not in seen:
+                _walk(v, sub, seen)
+            attrs[k] = sub or _plain(v)
+        else:
+            attrs[k] = _plain(v)
+    digest = _template_digest(element)
+    if digest is not None:
+        attrs["_template"] = digest
+    out.append([f"{cls.__module__}.{cls.__qualname__}", attrs])
+    for child in getattr(element, "_children", {}).values():
+        _walk(child, out, seen)
+
+
+def map_fingerprint(m, key_extra=()) -> str:
+    """Hash of everything in the map's element tree that shapes its HTML."""
+    parts = []
+    _walk(m.get_root(), parts)
+    payload = json.dumps([parts, _plain(key_extra)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MapHtmlCache:
+    """Thread-safe LRU of rendered map HTML, bounded by entry count and bytes."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            html = self._items.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: str, html: str):
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = html
+            self._bytes += size
+            while self._items and (
+                len(self._items) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+map_html_cache = MapHtmlCache()
+
+
+def render_map_html(m, key_extra=()) -> str:
+    """Return the map's HTML, reusing a cached render for an identical map."""
+    with span("map.render") as s:
+        key = map_fingerprint(m, key_extra)
+        html = map_html_cache.get(key)
+        s.attrs["cache"] = "miss" if html is None else "hit"
+        if html is None:
+            html = m.to_html()
+            map_html_cache.put(key, html)
+    stats = map_html_cache.stats()
+    logger.debug(
+        "map html cache: hit_rate=%.2f hits=%d misses=%d entries=%d bytes=%d",
+        stats["hit_rate"], stats["hits"], stats["misses"], stats["entries"], stats["bytes"],
+    )
+    return html
+
+
+def map_to_streamlit(m, width=None, height=600, scrolling=False, add_layer_control=True, key_extra=()):
+    """
+    Drop-in replacement for leafmap's ``Map.to_streamlit()`` (static component)
+    that serves the HTML from ``map_html_cache`` when possible.
+    """
+    if add_layer_control:
+        m.add_layer_control()
+    return components.html(
+        render_map_html(m, key_extra),
+        width=width,
+        height=height,
+        scrolling=scrolling,
+    )
@@ -0,0 +1,96 @@
+"""
+Custom Leaflet controls for the folium maps.
+"""
+from branca.element import MacroElement
+from jinja2 import Template
+
+
+class TileLayerTimeSlider(MacroElement):
+    """
+    Year slider with a play button that swaps between pre-built tile layers
+    entirely in the browser (no Streamlit rerun). Every layer is added to the
+    map up front at opacity 0 so its tiles are already loaded when the slider
+    reaches it; only the current one is made visible.
+
+    ``frames`` is a list of ``(label, tile_url)`` in display order.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var labels = {{ this.labels|tojson }};
+            var urls = {{ this.urls|tojson }};
+            var opacity = {{ this.opacity }};
+            var layers = urls.map(function(url, i) {
+                return L.tileLayer(url, {
+                    opacity: i === {{ this.start }} ? opacity : 0,
+                    attribution: {{ this.attribution|tojson }},
+                    maxZoom: 20
+                }).addTo(map);
+            });
+            var current = {{ this.start }};
+            var timer = null;
+
+            var control = L.control({position: {{ this.position|tojson }}});
+            control.onAdd = function() {
+                var div = L.DomUtil.create("div", "leaflet-bar");
+                div.style.cssText = "background:white;padding:6px 8px;font:12px sans-serif;"
+                    + "display:flex;align-items:center;gap:6px;";
+                div.innerHTML = '<button type="button" style="cursor:pointer;width:28px;">&#9654;</button>'
+                    + '<input type="range" min="0" max="' + (urls.length - 1) + '" step="1" value="'
+                    + current + '" style="width:140px;">'
+                    + '<b style="min-width:36px;">' + labels[current] + '</b>';
+                L.DomEvent.disableClickPropagation(div);
+                L.DomEvent.disableScrollPropagation(div);
+
+                var button = div.querySelector("button");
+                var slider = div.querySelector("input");
+                var label = div.querySelector("b");
+
+                function show(i) {
+                    layers[current].setOpacity(0);
+                    layers[i].setOpacity(opacity);
+                    current = i;
+                    slider.value = i;
+                    label.textContent = labels[i];
+                }
+                slider.addEventListener("input", function() { show(parseInt(slider.value, 10)); });
+                button.addEventListener("click", function() {
+                    if (timer) {
+                        clearInterval(timer);
+                        timer = null;
+                        button.innerHTML = "&#9654;";
+                    } else {
+                        timer = setInterval(function() { show((current + 1) % urls.length); },
+                                            {{ this.interval_ms }});
+                        button.innerHTML = "&#10074;&#10074;";
+                    }
+                });
+                return div;
+            };
+            control.addTo(map);
+        })();
+        {% endmacro %}
+        """
+    )
+
+    def __init__(
+        self,
+        frames,
+        start: int = 0,
+        interval_ms: int = 1200,
+        opacity: float = 1.0,
+        position: str = "bottomleft",
+        attribution: str = "Google Earth Engine",
+    ):
+        super().__init__()
+        self._name = "TileLayerTimeSlider"
+        self.labels = [str(label) for label, _ in frames]
+        self.urls = [url for _, url in frames]
+        self.start = start
+        self.interval_ms = int(interval_ms)
+        self.opacity = float(opacity)
+        self.position = position
+        self.attribution = attribution
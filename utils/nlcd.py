@@ -0,0 +1,55 @@
+"""
+NLCD constants shared by the Land Use Change page and the statistics helpers.
+"""
+
+YEARS = ("2001", "2004", "2006", "2008", "2011", "2013", "2016", "2019")
+
+NLCD_CLASSES = {
+    "Class_11": "11 - Open Water",
+    "Class_12": "12 - Perennial Ice/Snow",
+    "Class_21": "21 - Developed, Open Space",
+    "Class_22": "22 - Developed, Low Intensity",
+    "Class_23": "23 - Developed, Medium Intensity",
+    "Class_24": "24 - Developed, High Intensity",
+    "Class_31": "31 - Barren Land (Rock/Sand/Clay)",
+    "Class_41": "41 - Deciduous Forest",
+    "Class_42": "42 - Evergreen Forest",
+    "Class_43": "43 - Mixed Forest",
+    "Class_51": "51 - Dwarf Scrub",
+    "Class_52": "52 - Shrub/Scrub",
+    "Class_71": "71 - Grassland/Herbaceous",
+    "Class_72": "72 - Sedge/Herbaceous",
+    "Class_73": "73 - Lichens",
+    "Class_74": "74 - Moss",
+    "Class_81": "81 - Pasture/Hay",
+    "Class_82": "82 - Cultivated Crops",
+    "Class_90": "90 - Woody Wetlands",
+    "Class_95": "95 - Emergent Herbaceous Wetlands",
+}
+
+# Hex colors (no '#') used for discrete palette + compact legend
+NLCD_COLORS = {
+    11: ("Open Water", "466B9F"),
+    12: ("Perennial Ice/Snow", "D1DEF8"),
+    21: ("Developed, Open Space", "DEC5C5"),
+    22: ("Developed, Low Intensity", "D99282"),
+    23: ("Developed, Medium Intensity", "EB0000"),
+    24: ("Developed, High Intensity", "AB0000"),
+    31: ("Barren Land", "B3AC9F"),
+    41: ("Deciduous Forest", "68AB5F"),
+    42: ("Evergreen Forest", "1C5F2C"),
+    43: ("Mixed Forest", "B5C58F"),
+    51: ("Dwarf Scrub", "AF963C"),
+    52: ("Shrub/Scrub", "CCB879"),
+    71: ("Grassland/Herbaceous", "DFDFC2"),
+    72: ("Sedge/Herbaceous", "D1D182"),
+    73: ("Lichens", "A3CC51"),
+    74: ("Moss", "82BA9E"),
+    81: ("Pasture/Hay", "DCD939"),
+    82: ("Cultivated Crops", "AB6C28"),
+    90: ("Woody Wetlands", "B8D9EB"),
+    95: ("Emergent Herbaceous Wetlands", "6C9FB8"),
+}
+
+# Class codes in display order; the class axis of the statistics arrays.
+NLCD_CODES = tuple(NLCD_COLORS)
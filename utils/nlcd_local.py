@@ -0,0 +1,290 @@
+"""
+Local (NumPy) NLCD statistics engine.
+
+Instead of running one grouped ``reduceRegion`` per year on Earth Engine, the
+clipped NLCD stack for all years is downloaded once as a ``uint8`` array with
+``ee.data.computePixels``, cached on disk and memory-mapped, and every class
+area / trend / transition table is then computed locally.
+
+Pixels are fetched on a 30 m grid in CONUS Albers (EPSG:5070), which is
+equal-area, so every pixel covers exactly ``PIXEL_AREA_KM2``. Class value 0
+marks pixels outside the ROI (NLCD itself has no class 0).
+
+Only meant for small/medium ROIs: ``fetch_nlcd_stack`` raises ``ValueError``
+when the ROI needs more than ``MAX_PIXELS`` pixels per year, and the caller
+falls back to the server-side reducers.
+"""
+import hashlib
+import math
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from utils import tracing
+from utils.nlcd import NLCD_CLASSES
+
+ALBERS = "EPSG:5070"
+SCALE = 30
+PIXEL_AREA_KM2 = SCALE * SCALE / 1_000_000
+NODATA = 0
+
+# Origin of the native NLCD grid, so fetched pixels line up with source pixels.
+GRID_ORIGIN = (-2493045.0, 3310005.0)
+
+# computePixels returns at most ~48 MB per request; one byte per year per pixel.
+MAX_PIXELS = int(os.environ.get("NLCD_LOCAL_MAX_PIXELS", "6000000"))
+CACHE_DIR = os.environ.get("NLCD_LOCAL_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "nlcd_stacks")
+# Total size of the on-disk stacks; least recently used ones are removed beyond it.
+CACHE_MAX_BYTES = int(float(os.environ.get("NLCD_LOCAL_CACHE_MB", "1024")) * 1024 * 1024)
+
+N_CODES = 256
+
+
+class NlcdStack:
+    """
+    NLCD class codes for several years over one ROI.
+
+    ``data`` has shape (n_years, height, width) and dtype uint8. Per-year
+    class counts are computed once and reused by every table below.
+    """
+
+    def __init__(self, data: np.ndarray, years, pixel_area_km2: float = PIXEL_AREA_KM2):
+        data = np.asarray(data)
+        if data.ndim != 3 or data.shape[0] != len(years):
+            raise ValueError(f"expected array of shape ({len(years)}, H, W), got {data.shape}")
+        if data.dtype != np.uint8:
+            raise ValueError(f"expected uint8 class codes, got {data.dtype}")
+        self.data = data
+        self.years = tuple(str(y) for y in years)
+        self.pixel_area_km2 = pixel_area_km2
+        self._counts = None
+
+    # ---------------- persistence ----------------
+    def save(self, path: str):
+        """Write the stack atomically as .npy (the years are part of the cache key)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".npy.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(self.data))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str, years, pixel_area_km2: float = PIXEL_AREA_KM2):
+        """Open a saved stack memory-mapped (read-only)."""
+        return cls(np.load(path, mmap_mode="r"), years, pixel_area_km2)
+
+    # ---------------- statistics ----------------
+    def _year_index(self, year) -> int:
+        try:
+            return self.years.index(str(year))
+        except ValueError:
+            raise KeyError(f"year {year} not in stack {self.years}") from None
+
+    def class_counts(self) -> np.ndarray:
+        """Pixel counts, shape (n_years, 256), indexed by class code."""
+        if self._counts is None:
+            n = len(self.years)
+            counts = np.empty((n, N_CODES), dtype=np.int64)
+            for i in range(n):
+                counts[i] = np.bincount(self.data[i].ravel(), minlength=N_CODES)
+            counts[:, NODATA] = 0
+            self._counts = counts
+        return self._counts
+
+    def class_areas_km2(self) -> np.ndarray:
+        """Class areas (km²), shape (n_years, 256), indexed by class code."""
+        return self.class_counts() * self.pixel_area_km2
+
+    def areas_frame(self, year) -> pd.DataFrame:
+        """Same layout as the server-side grouped reducer: class_key, class_label, area_km2."""
+        areas = self.class_areas_km2()[self._year_index(year)]
+        codes = np.flatnonzero(areas)
+        keys = [f"Class_{c}" for c in codes]
+        df = pd.DataFrame({
+            "class_key": keys,
+            "class_label": [NLCD_CLASSES.get(k, str(c)) for k, c in zip(keys, codes)],
+            "area_km2": areas[codes],
+        })
+        return df.sort_values("area_km2", ascending=False).reset_index(drop=True)
+
+    def trend_frame(self) -> pd.DataFrame:
+        """
+        Per-class multi-year trend: first/last area, net change and the
+        least-squares slope (km² per year) across all years in the stack.
+        """
+        areas = self.class_areas_km2()
+        codes = np.flatnonzero(areas.any(axis=0))
+        a = areas[:, codes]
+        t = np.array([int(y) for y in self.years], dtype=float)
+        tc = t - t.mean()
+        denom = (tc ** 2).sum()
+        slope = (tc @ (a - a.mean(axis=0))) / denom if denom else np.zeros(len(codes))
+        keys = [f"Class_{c}" for c in codes]
+        return pd.DataFrame({
+            "class_key": keys,
+            "class_label": [NLCD_CLASSES.get(k, str(c)) for k, c in zip(keys, codes)],
+            "area_first_km2": a[0],
+            "area_last_km2": a[-1],
+            "net_change_km2": a[-1] - a[0],
+            "slope_km2_per_year": slope,
+        })
+
+    def transition_matrix(self, year1, year2) -> np.ndarray:
+        """Area (km²) moving from class i in year1 to class j in year2, shape (256, 256)."""
+        a = self.data[self._year_index(year1)].ravel().astype(np.uint16)
+        b = self.data[self._year_index(year2)].ravel()
+        counts = np.bincount(a * N_CODES + b, minlength=N_CODES * N_CODES).reshape(N_CODES, N_CODES)
+        counts[NODATA, :] = 0
+        counts[:, NODATA] = 0
+        return counts * self.pixel_area_km2
+
+    def transition_frame(self, year1, year2) -> pd.DataFrame:
+        """Non-zero entries of ``transition_matrix`` as a long table."""
+        m = self.transition_matrix(year1, year2)
+        src, dst = np.nonzero(m)
+        return pd.DataFrame({
+            "from_class": [NLCD_CLASSES.get(f"Class_{c}", str(c)) for c in src],
+            "to_class": [NLCD_CLASSES.get(f"Class_{c}", str(c)) for c in dst],
+            "area_km2": m[src, dst],
+        })
+
+
+# =============================================================================
+# FETCH + DISK CACHE
+# =============================================================================
+def stack_cache_key(roi, years, scale: int = SCALE) -> str:
+    """Hash of the serialized ROI expression, the years and the scale."""
+    payload = "|".join([roi.serialize(), ",".join(str(y) for y in years), str(scale)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _snapped_grid(bounds_coords, scale: int):
+    """Pixel grid covering the given EPSG:5070 bounds, aligned to the NLCD grid."""
+    xs = [c[0] for c in bounds_coords]
+    ys = [c[1] for c in bounds_coords]
+    ox, oy = GRID_ORIGIN
+    x0 = ox + math.floor((min(xs) - ox) / scale) * scale
+    y0 = oy + math.ceil((max(ys) - oy) / scale) * scale
+    width = max(1, math.ceil((max(xs) - x0) / scale))
+    height = max(1, math.ceil((y0 - min(ys)) / scale))
+    return x0, y0, width, height
+
+
+def fetch_nlcd_stack(roi, years, landcover_for_year, scale: int = SCALE, max_pixels: int = MAX_PIXELS) -> NlcdStack:
+    """
+    Download the NLCD stack for ``years`` clipped to ``roi`` in one
+    ``computePixels`` request. ``landcover_for_year(y)`` returns the NLCD
+    landcover ee.Image for a year.
+    """
+    import ee
+
+    proj = ee.Projection(ALBERS)
+    bounds = roi.transform(proj, 1).bounds(1, proj).coordinates().getInfo()[0]
+    x0, y0, width, height = _snapped_grid(bounds, scale)
+    if width * height > max_pixels:
+        raise ValueError(
+            f"ROI needs {width * height:,} pixels per year at {scale} m "
+            f"(local engine limit is {max_pixels:,})"
+        )
+
+    band_ids = [f"y{y}" for y in years]
+    image = (
+        ee.Image.cat([ee.Image(landcover_for_year(y)).rename(b) for y, b in zip(years, band_ids)])
+        .clip(roi)
+        .unmask(NODATA)
+        .toUint8()
+    )
+    pixels = ee.data.computePixels({
+        "expression": image,
+        "fileFormat": "NUMPY_NDARRAY",
+        "bandIds": band_ids,
+        "grid": {
+            "dimensions": {"width": width, "height": height},
+            "affineTransform": {
+                "scaleX": scale, "shearX": 0, "translateX": x0,
+                "shearY": 0, "scaleY": -scale, "translateY": y0,
+            },
+            "crsCode": ALBERS,
+        },
+    })
+    data = np.stack([np.asarray(pixels[b], dtype=np.uint8) for b in band_ids])
+    return NlcdStack(data, years, pixel_area_km2=scale * scale / 1_000_000)
+
+
+def evict_stacks(cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES, keep: str = None) -> int:
+    """
+    Remove the least recently used stacks (by mtime) until ``cache_dir`` holds
+    at most ``max_bytes``; ``keep`` is never removed. Returns the bytes freed.
+    Stacks still memory-mapped elsewhere stay readable until they are closed.
+    """
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return 0
+    files = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        if not name.endswith(".npy"):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    freed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        freed += size
+    return freed
+
+
+def load_or_fetch_stack(roi, years, landcover_for_year, scale: int = SCALE, cache_dir: str = CACHE_DIR,
+                        max_bytes: int = CACHE_MAX_BYTES) -> NlcdStack:
+    """Return the memory-mapped stack for this ROI, downloading it on first use."""
+    key = stack_cache_key(roi, years, scale)
+    path = os.path.join(cache_dir, f"{key}.npy")
+    try:
+        # A hit refreshes the mtime, which orders the LRU eviction below.
+        os.utime(path)
+    except FileNotFoundError:
+        with tracing.expr_scope(key):
+            fetch_nlcd_stack(roi, years, landcover_for_year, scale=scale).save(path)
+        evict_stacks(cache_dir, max_bytes, keep=path)
+    return NlcdStack.load(path, years, pixel_area_km2=scale * scale / 1_000_000)
+
+
+def synthetic_stack(shape=(256, 256), years=("2001", "2019"), seed: int = 0, change_rate: float = 0.02) -> NlcdStack:
+    """
+    Deterministic synthetic NLCD stack for exercising the engine without EE:
+    random valid class codes in year one, a small fraction of pixels changing
+    class each following year, and a nodata border like a clipped ROI.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array([int(k.split("_")[1]) for k in NLCD_CLASSES], dtype=np.uint8)
+    h, w = shape
+    data = np.empty((len(years), h, w), dtype=np.uint8)
+    data[0] = rng.choice(codes, size=shape)
+    for i in range(1, len(years)):
+        data[i] = data[i - 1]
+        changed = rng.random(shape) < change_rate
+        data[i][changed] = rng.choice(codes, size=int(changed.sum()))
+    border = max(1, min(h, w) // 16)
+    data[:, :border, :] = NODATA
+    data[:, :, :border] = NODATA
+    return NlcdStack(data, years)
@@ -0,0 +1,324 @@
+"""
+Precomputed NLCD class areas for US states and counties.
+
+Most statistics requests are for a whole state or county, and drawing one by
+hand costs a full 30 m reduction per year. A batch job builds an index of
+class areas for every county, and every state, in every year in ``YEARS``:
+
+    python -m utils.region_index --out data/nlcd_region_index.parquet
+
+Counties are reduced in chunks of ``REGION_CHUNK_SIZE`` with
+``utils.zonal.reduce_collection`` (one ``reduceRegions`` call per chunk, all
+years as bands); chunks run concurrently. A chunk that fails is retried with
+backoff, then split in half down to single counties, so one oversized county
+cannot sink its neighbours. State totals are the sum of their counties, so no
+request ever reduces a whole state. Counties that still fail are logged and
+left out; the rest is written anyway, and ``--resume`` fills the gaps on a
+later run. A state whose counties are not all present gets no state row.
+
+NLCD here is the CONUS product: Alaska, Hawaii and the territories
+(``NO_NLCD_STATES``) have no data, so they are skipped with a log message and
+the page says so under its picker.
+
+The result is a long Parquet table keyed by FIPS code:
+
+    fips | level | name | state_fips | year | class_code | area_km2
+
+``fips`` is the 2-digit state or 5-digit county code. The Land Use page loads
+the index once per process (``RegionIndex``) and answers state/county
+requests from memory, falling back to live computation only for custom ROIs.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import ee
+import pandas as pd
+
+from utils.nlcd import NLCD_CLASSES, YEARS
+from utils.zonal import reduce_collection
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_PATH = os.environ.get("REGION_INDEX_PATH") or os.path.join(APP_DIR, "data", "nlcd_region_index.parquet")
+
+STATES = "TIGER/2018/States"
+COUNTIES = "TIGER/2018/Counties"
+STATE, COUNTY = "state", "county"
+
+REGION_CHUNK_SIZE = int(os.environ.get("REGION_CHUNK_SIZE", "25"))
+RETRIES = 3
+RETRY_BACKOFF = 5.0
+
+# States and territories outside the CONUS NLCD product.
+NO_NLCD_STATES = {
+    "02": "Alaska",
+    "15": "Hawaii",
+    "60": "American Samoa",
+    "66": "Guam",
+    "69": "Northern Mariana Islands",
+    "72": "Puerto Rico",
+    "78": "U.S. Virgin Islands",
+}
+
+COLUMNS = ["fips", "level", "name", "state_fips", "year", "class_code", "area_km2"]
+
+
+# =============================================================================
+# EE GEOMETRY
+# =============================================================================
+def region_collection(fips: str) -> ee.FeatureCollection:
+    if len(fips) == 2:
+        return ee.FeatureCollection(STATES).filter(ee.Filter.eq("STATEFP", fips))
+    return ee.FeatureCollection(COUNTIES).filter(ee.Filter.eq("GEOID", fips))
+
+
+def region_geometry(fips: str) -> ee.Geometry:
+    """Geometry of a state or county, for live computation when the index lacks it."""
+    return region_collection(fips).geometry()
+
+
+def region_outline(fips: str) -> ee.Image:
+    return region_collection(fips).style(color="orange", width=2, fillColor="00000000")
+
+
+# =============================================================================
+# BATCH JOB
+# =============================================================================
+def _tiger_properties(fc: ee.FeatureCollection) -> list:
+    """Properties of every feature of a TIGER collection, without geometries."""
+    info = fc.select(["GEOID", "STATEFP", "NAME"], None, False).getInfo()
+    return [f.get("properties", {}) for f in info.get("features", [])]
+
+
+def list_counties(states=None) -> tuple:
+    """
+    ({state FIPS: name}, [county properties]) for the CONUS states (or the
+    given state FIPS codes), logging the ones NLCD does not cover.
+    """
+    states_fc = ee.FeatureCollection(STATES)
+    if states:
+        states_fc = states_fc.filter(ee.Filter.inList("STATEFP", list(states)))
+    state_names = {str(p["STATEFP"]): p.get("NAME", p["STATEFP"]) for p in _tiger_properties(states_fc)}
+    for fp in sorted(set(state_names) & set(NO_NLCD_STATES)):
+        logger.info("skipping %s (%s): no CONUS NLCD data", state_names.pop(fp), fp)
+    if not state_names:
+        return {}, []
+    counties_fc = ee.FeatureCollection(COUNTIES).filter(ee.Filter.inList("STATEFP", sorted(state_names)))
+    return state_names, _tiger_properties(counties_fc)
+
+
+def _county_collection(geoids) -> ee.FeatureCollection:
+    return (
+        ee.FeatureCollection(COUNTIES)
+        .filter(ee.Filter.inList("GEOID", list(geoids)))
+        .select(["GEOID", "STATEFP", "NAME"])
+    )
+
+
+def _reduce_chunk(geoids, years, landcover_for_year, tile_scale, retries=RETRIES, backoff=RETRY_BACKOFF) -> tuple:
+    """
+    (results, failed GEOIDs) for one chunk of counties: retried with backoff,
+    then split in half until single counties fail on their own.
+    """
+    for attempt in range(retries):
+        try:
+            return reduce_collection(_county_collection(geoids), years, landcover_for_year, tile_scale=tile_scale), []
+        except Exception as exc:
+            logger.warning("chunk of %d counties (%s...) failed, attempt %d/%d: %s",
+                           len(geoids), geoids[0], attempt + 1, retries, exc)
+            if attempt + 1 < retries:
+                time.sleep(backoff * 2 ** attempt)
+    if len(geoids) == 1:
+        logger.error("county %s failed after %d attempts; left out of the index", geoids[0], retries)
+        return [], list(geoids)
+    half = len(geoids) // 2
+    first, failed_first = _reduce_chunk(geoids[:half], years, landcover_for_year, tile_scale, retries, backoff)
+    second, failed_second = _reduce_chunk(geoids[half:], years, landcover_for_year, tile_scale, retries, backoff)
+    return first + second, failed_first + failed_second
+
+
+def _county_rows(results) -> list:
+    rows = []
+    for props, per_year in results:
+        fips = str(props["GEOID"])
+        for year, areas in per_year.items():
+            for code, km2 in areas.items():
+                rows.append((fips, COUNTY, props.get("NAME", fips), fips[:2], str(year), int(code), float(km2)))
+    return rows
+
+
+def _state_rows(counties: pd.DataFrame, county_counts: dict, state_names: dict) -> pd.DataFrame:
+    """State totals summed from counties, for states whose counties are all present."""
+    present = counties.groupby("state_fips", observed=True)["fips"].nunique()
+    complete = [fp for fp, n in county_counts.items() if present.get(fp, 0) == n]
+    for fp in sorted(set(county_counts) - set(complete)):
+        logger.warning("state %s (%s): %d/%d counties indexed; no state row",
+                       state_names.get(fp, fp), fp, present.get(fp, 0), county_counts[fp])
+    sums = (
+        counties[counties["state_fips"].isin(complete)]
+        .groupby(["state_fips", "year", "class_code"], observed=True, as_index=False)["area_km2"].sum()
+    )
+    return sums.assign(
+        fips=sums["state_fips"], level=STATE, name=sums["state_fips"].map(state_names).fillna(sums["state_fips"]),
+    )[COLUMNS]
+
+
+def build_index(years=YEARS, landcover_for_year=None, states=None, tile_scale: float = 16, workers: int = 4,
+                chunk_size: int = REGION_CHUNK_SIZE, existing: pd.DataFrame = None,
+                retries: int = RETRIES, backoff: float = RETRY_BACKOFF) -> tuple:
+    """
+    (index frame, failed county GEOIDs) for every CONUS county (or those of
+    the given states) plus state totals. Counties already in ``existing`` (a
+    previous index, for resuming) are kept and not recomputed.
+    """
+    if landcover_for_year is None:
+        from utils.layers import ee_landcover_for_year as landcover_for_year
+
+    years = [str(y) for y in years]
+    state_names, counties = list_counties(states)
+    county_counts = {}
+    for props in counties:
+        fp = str(props["STATEFP"])
+        county_counts[fp] = county_counts.get(fp, 0) + 1
+
+    done = pd.DataFrame(columns=COLUMNS)
+    if existing is not None and len(existing):
+        done = existing[(existing["level"].astype(str) == COUNTY) & existing["year"].astype(str).isin(years)]
+        done = done.astype({"fips": str, "year": str, "state_fips": str})
+        have = done.groupby("fips")["year"].nunique()
+        done = done[done["fips"].isin(have[have == len(years)].index)]
+    skip = set(done["fips"])
+    todo = sorted(str(p["GEOID"]) for p in counties if str(p["GEOID"]) not in skip)
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), max(1, chunk_size))]
+    logger.info("%d states, %d counties (%d already indexed), %d chunks",
+                len(state_names), len(counties), len(skip), len(chunks))
+
+    rows, failed = [], []
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="region-index") as pool:
+        futures = [
+            pool.submit(_reduce_chunk, chunk, years, landcover_for_year, tile_scale, retries, backoff)
+            for chunk in chunks
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            results, chunk_failed = future.result()
+            rows += _county_rows(results)
+            failed += chunk_failed
+            logger.info("chunk %d/%d done (%.0fs)", i, len(chunks), time.perf_counter() - t0)
+
+    county_df = pd.concat([done, pd.DataFrame(rows, columns=COLUMNS)], ignore_index=True)
+    df = pd.concat([county_df, _state_rows(county_df, county_counts, state_names)], ignore_index=True)
+    df["class_code"] = df["class_code"].astype("int16")
+    df["area_km2"] = df["area_km2"].astype(float)
+    for col in ("level", "year"):
+        df[col] = df[col].astype(str).astype("category")
+    return df.sort_values(["fips", "year", "class_code"]).reset_index(drop=True), sorted(failed)
+
+
+def write_index(df: pd.DataFrame, path: str = INDEX_PATH):
+    """Write the index atomically."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# =============================================================================
+# LOOKUP
+# =============================================================================
+class RegionIndex:
+    """In-memory index: per-(fips, year) class-area frames in the page's stats format."""
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.assign(
+            fips=df["fips"].astype(str),
+            year=df["year"].astype(str),
+            class_key="Class_" + df["class_code"].astype(str),
+        )
+        df["class_label"] = df["class_key"].map(NLCD_CLASSES).fillna(df["class_code"].astype(str))
+        self.regions = (
+            df[["fips", "level", "name", "state_fips"]]
+            .drop_duplicates("fips")
+            .astype({"level": str})
+            .set_index("fips")
+            .sort_values("name")
+        )
+        # One frame sorted by region, year and descending area; a lookup is a
+        # positional slice of it.
+        df = df.sort_values(["fips", "year", "area_km2"], ascending=[True, True, False], kind="stable")
+        self._table = df[["class_key", "class_label", "area_km2"]].reset_index(drop=True)
+        keys = list(zip(df["fips"], df["year"]))
+        self._slices = {}
+        start = 0
+        for i in range(1, len(keys) + 1):
+            if i == len(keys) or keys[i] != keys[start]:
+                self._slices[keys[start]] = (start, i)
+                start = i
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH):
+        """The index at ``path``, or None if it has not been built."""
+        if not os.path.exists(path):
+            return None
+        return cls(pd.read_parquet(path))
+
+    def states(self) -> list:
+        s = self.regions[self.regions["level"] == STATE]
+        return list(zip(s.index, s["name"]))
+
+    def counties(self, state_fips: str) -> list:
+        c = self.regions[(self.regions["level"] == COUNTY) & (self.regions["state_fips"] == state_fips)]
+        return list(zip(c.index, c["name"]))
+
+    def name(self, fips: str) -> str:
+        return self.regions.at[fips, "name"] if fips in self.regions.index else fips
+
+    def areas_frame(self, fips: str, year) -> pd.DataFrame:
+        """class_key / class_label / area_km2 for one region and year, or None if not indexed."""
+        bounds = self._slices.get((fips, str(year)))
+        if bounds is None:
+            return None
+        return self._table.iloc[bounds[0]:bounds[1]].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=INDEX_PATH)
+    parser.add_argument("--years", nargs="+", default=list(YEARS))
+    parser.add_argument("--states", nargs="+", help="only these state FIPS codes (default: all)")
+    parser.add_argument("--tile-scale", type=float, default=16, help="reduceRegions tileScale")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent chunk requests")
+    parser.add_argument("--chunk-size", type=int, default=REGION_CHUNK_SIZE, help="counties per request")
+    parser.add_argument("--resume", action="store_true", help="keep counties already in --out")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    from utils import ee_auth
+
+    ee_auth.ensure_initialized()
+    existing = pd.read_parquet(args.out) if args.resume and os.path.exists(args.out) else None
+    t0 = time.perf_counter()
+    df, failed = build_index(args.years, states=args.states, tile_scale=args.tile_scale, workers=args.workers,
+                             chunk_size=args.chunk_size, existing=existing)
+    write_index(df, args.out)
+    logger.info("%d rows for %d regions written to %s in %.1fs",
+                len(df), df["fips"].nunique(), args.out, time.perf_counter() - t0)
+    if failed:
+        logger.error("%d counties failed (%s); rerun with --resume to fill them in",
+                     len(failed), ", ".join(failed[:20]) + (" ..." if len(failed) > 20 else ""))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Bounded per-session storage for large objects.
+
+``st.session_state`` lives as long as the browser session, so every idle
+session keeps its ROI geometry, statistics frames and comparison arrays in
+memory indefinitely. ``SessionMemory`` is a small mapping that pages use
+instead of ``st.session_state`` for such objects. It records an approximate
+size of every value (``approx_size``) and keeps the entries in LRU order.
+
+Two budgets are enforced whenever a value is stored:
+
+- per session (``SESSION_MEMORY_MB``): the session's least recently used
+  entries are moved out of memory until it fits;
+- per process (``SESSION_MEMORY_GLOBAL_MB``): the least recently used entries
+  of *all* sessions are moved out, so idle sessions go first.
+
+An entry moved out of memory is spilled to a pickle under
+``SESSION_SPILL_DIR`` and loaded back transparently on its next access.
+Values that cannot be pickled, and every value when ``SESSION_SPILL=0``, are
+dropped instead; pages treat a missing key as "not computed yet". Spill
+files are removed when their session is garbage collected.
+
+``memory_stats()`` reports per-session and process totals (and the process
+RSS), which the performance panel shows to help size containers.
+"""
+import itertools
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+SESSION_BUDGET = int(float(os.environ.get("SESSION_MEMORY_MB", "64")) * MB)
+GLOBAL_BUDGET = int(float(os.environ.get("SESSION_MEMORY_GLOBAL_MB", "1024")) * MB)
+SPILL_ENABLED = os.environ.get("SESSION_SPILL", "1").lower() not in ("0", "false", "no", "off")
+SPILL_DIR = os.environ.get("SESSION_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "wnmaps_session_spill")
+
+STATE_KEY = "_session_memory"
+
+_MAX_DEPTH = 8
+# Long containers are sized from a sample of their items.
+_SAMPLE = 32
+
+
+# =============================================================================
+# SIZE ESTIMATE
+# =============================================================================
+def approx_size(value, _depth: int = 0) -> int:
+    """
+    Approximate bytes held by ``value``: exact for arrays and frames, a
+    sampled walk of containers and object attributes otherwise (EE objects
+    keep their GeoJSON coordinates as nested lists, which dominate).
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None or _depth >= _MAX_DEPTH:
+        return size
+    if isinstance(value, dict):
+        items = list(itertools.islice(value.items(), _SAMPLE))
+        sample = sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in items)
+        return size + (sample * len(value) // len(items) if items else 0)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = list(itertools.islice(value, _SAMPLE))
+        sample = sum(approx_size(v, _depth + 1) for v in items)
+        return size + (sample * len(value) // len(items) if items else 0)
+    if hasattr(value, "__dict__"):
+        return size + approx_size(vars(value), _depth + 1)
+    return size
+
+
+# =============================================================================
+# MANAGER
+# =============================================================================
+class _Entry:
+    __slots__ = ("value", "size", "path", "last_access")
+
+    def __init__(self, value, size):
+        self.value = value
+        self.size = size
+        self.path = None
+        self.last_access = time.monotonic()
+
+
+def _remove_files(paths):
+    for path in list(paths):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class SessionMemoryManager:
+    """Process-wide registry of ``SessionMemory`` objects and the global budget."""
+
+    def __init__(self, session_budget: int = SESSION_BUDGET, global_budget: int = GLOBAL_BUDGET,
+                 spill: bool = SPILL_ENABLED, spill_dir: str = SPILL_DIR):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self._lock = threading.RLock()
+        self._sessions = weakref.WeakValueDictionary()
+        self.bytes = 0
+        self.spilled_bytes = 0
+        self.spills = 0
+        self.drops = 0
+        self.loads = 0
+
+    def session(self, session_id: str) -> "SessionMemory":
+        with self._lock:
+            mem = self._sessions.get(session_id)
+            if mem is None:
+                mem = self._sessions[session_id] = SessionMemory(self, session_id)
+            return mem
+
+    # -------------------------------------------------------------------------
+    def _move_out(self, mem: "SessionMemory", key: str):
+        """Spill (or drop) one in-memory entry; caller holds the lock."""
+        entry = mem._items[key]
+        self.bytes -= entry.size
+        mem.bytes -= entry.size
+        if self.spill:
+            path = os.path.join(self.spill_dir, f"{mem.session_id}-{uuid.uuid4().hex}.pkl")
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                with open(path, "wb") as f:
+                    pickle.dump(entry.value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as exc:
+                logger.debug("session memory: cannot spill %s/%s (%s); dropping it", mem.session_id, key, exc)
+                _remove_files([path])
+            else:
+                entry.value = None
+                entry.path = path
+                mem._paths.add(path)
+                mem.spilled_bytes += entry.size
+                self.spilled_bytes += entry.size
+                self.spills += 1
+                mem._items.move_to_end(key, last=False)
+                return
+        del mem._items[key]
+        self.drops += 1
+
+    def _in_memory_lru(self, mem: "SessionMemory", keep: str = None):
+        for key, entry in mem._items.items():
+            if entry.path is None and key != keep:
+                return key, entry
+        return None, None
+
+    def _enforce(self, mem: "SessionMemory", keep: str):
+        """Apply both budgets after ``mem[keep]`` was stored; caller holds the lock."""
+        while mem.bytes > self.session_budget:
+            key, _ = self._in_memory_lru(mem, keep)
+            if key is None:
+                break
+            self._move_out(mem, key)
+
+        while self.bytes > self.global_budget:
+            oldest = None
+            for other in list(self._sessions.values()):
+                key, entry = self._in_memory_lru(other, keep if other is mem else None)
+                if key is not None and (oldest is None or entry.last_access < oldest[2].last_access):
+                    oldest = (other, key, entry)
+            if oldest is None:
+                break
+            self._move_out(oldest[0], oldest[1])
+
+    def _forget(self, size: int, spilled_size: int):
+        with self._lock:
+            self.bytes -= size
+            self.spilled_bytes -= spilled_size
+
+    # -------------------------------------------------------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = [mem.stats() for mem in list(self._sessions.values())]
+            return {
+                "sessions": len(sessions),
+                "bytes": self.bytes,
+                "spilled_bytes": self.spilled_bytes,
+                "spills": self.spills,
+                "drops": self.drops,
+                "loads": self.loads,
+                "session_budget": self.session_budget,
+                "global_budget": self.global_budget,
+                "rss_bytes": process_rss(),
+                "per_session": sorted(sessions, key=lambda s: -s["bytes"]),
+            }
+
+
+class SessionMemory:
+    """LRU mapping of one session's large objects, bounded by the manager's budgets."""
+
+    def __init__(self, manager: SessionMemoryManager, session_id: str):
+        self.manager = manager
+        self.session_id = session_id
+        self._items = OrderedDict()
+        self._paths = set()
+        # [in-memory bytes, spilled bytes]; shared with the finalizer, which
+        # gives the budget back and removes spill files when the session goes away.
+        self._usage = [0, 0]
+        weakref.finalize(self, SessionMemory._release, manager, self._paths, self._usage)
+
+    @staticmethod
+    def _release(manager, paths, usage):
+        manager._forget(usage[0], usage[1])
+        _remove_files(paths)
+
+    @property
+    def bytes(self) -> int:
+        return self._usage[0]
+
+    @bytes.setter
+    def bytes(self, value: int):
+        self._usage[0] = value
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._usage[1]
+
+    @spilled_bytes.setter
+    def spilled_bytes(self, value: int):
+        self._usage[1] = value
+
+    def __setitem__(self, key: str, value):
+        size = approx_size(value)
+        m = self.manager
+        with m._lock:
+            self._discard(key)
+            self._items[key] = _Entry(value, size)
+            self.bytes += size
+            m.bytes += size
+            m._enforce(self, keep=key)
+
+    def get(self, key: str, default=None):
+        m = self.manager
+        with m._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return default
+            if entry.path is not None:
+                try:
+                    with open(entry.path, "rb") as f:
+                        value = pickle.load(f)
+                except Exception as exc:
+                    logger.warning("session memory: lost spilled %s/%s: %s", self.session_id, key, exc)
+                    self._discard(key)
+                    return default
+                self._discard(key)
+                self._items[key] = _Entry(value, entry.size)
+                self.bytes += entry.size
+                m.bytes += entry.size
+                m.loads += 1
+                m._enforce(self, keep=key)
+                return value
+            entry.last_access = time.monotonic()
+            self._items.move_to_end(key)
+            return entry.value
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        with self.manager._lock:
+            return key in self._items
+
+    def discard(self, key: str):
+        """Remove ``key`` if present; a spilled entry is deleted from disk without loading it."""
+        with self.manager._lock:
+            self._discard(key)
+
+    def _discard(self, key: str):
+        entry = self._items.pop(key, None)
+        if entry is None:
+            return
+        if entry.path is None:
+            self.bytes -= entry.size
+            self.manager.bytes -= entry.size
+        else:
+            self.spilled_bytes -= entry.size
+            self.manager.spilled_bytes -= entry.size
+            self._paths.discard(entry.path)
+            _remove_files([entry.path])
+
+    def stats(self) -> dict:
+        with self.manager._lock:
+            return {
+                "session": self.session_id,
+                "entries": len(self._items),
+                "spilled_entries": sum(e.path is not None for e in self._items.values()),
+                "bytes": self.bytes,
+                "spilled_bytes": self.spilled_bytes,
+                "keys": {k: e.size for k, e in self._items.items()},
+            }
+
+
+_MISSING = object()
+
+manager = SessionMemoryManager()
+
+
+def process_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def session_memory() -> SessionMemory:
+    """The current Streamlit session's bounded store, created on first use."""
+    import streamlit as st
+
+    mem = st.session_state.get(STATE_KEY)
+    if mem is None:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        session_id = ctx.session_id if ctx is not None else uuid.uuid4().hex
+        mem = st.session_state[STATE_KEY] = manager.session(session_id)
+    return mem
+
+
+def memory_stats() -> dict:
+    return manager.stats()
@@ -0,0 +1,521 @@
+"""
+Cross-process cache tier for map IDs and statistics.
+
+``st.cache_resource`` and ``st.session_state`` live inside one process, so
+every replica behind a load balancer recomputes the same tile URLs and NLCD
+statistics. ``SharedCache`` puts a small in-process LRU (tier "local") in
+front of a pluggable backend shared by all processes (tier "shared"):
+
+- ``sqlite:///path/to/cache.db``  a SQLite file (replicas on one host / shared volume)
+- ``redis://host:6379/0``         a Redis-protocol server (needs the ``redis`` package)
+- ``memory://``                   process-local; the default when nothing is configured
+
+The backend comes from the ``SHARED_CACHE_URL`` environment variable. Every
+entry has a TTL. Entries are stored as JSON together with their absolute
+expiry, so an entry copied into the local tier expires when the shared one
+does; values must be JSON-serializable (map IDs, ``getInfo`` results, paths).
+
+Fills are atomic across processes: the first process to miss takes a lock
+(set-if-absent, holding a random token) and computes; the others wait for its
+result instead of computing the same thing. The filler renews the lock every
+``LOCK_TTL / 3`` seconds while ``compute()`` runs and only deletes it while it
+still holds its own token, so a slow fill never hands its lock to a second
+filler. Waiters never compute without the lock: they take it over when a fill
+fails, and raise ``FillTimeout`` once their ``wait`` runs out.
+
+The memory backend is bounded (``SHARED_CACHE_MEMORY_MAX_ENTRIES``, least
+recently used first); it and the SQLite backend sweep expired entries every
+``SWEEP_INTERVAL`` seconds.
+
+``LocalRedis`` is an in-memory stand-in for the subset of the redis client
+used here, so the Redis code path can be exercised without a server.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_URL = os.environ.get("SHARED_CACHE_URL", "memory://")
+LOCAL_MAX_ENTRIES = int(os.environ.get("SHARED_CACHE_LOCAL_MAX_ENTRIES", "512"))
+MEMORY_MAX_ENTRIES = int(os.environ.get("SHARED_CACHE_MEMORY_MAX_ENTRIES", "4096"))
+SWEEP_INTERVAL = 300.0
+KEY_PREFIX = "wnmaps:"
+
+# Fill lock lifetime; the filler renews it while it computes. Also the
+# default time other callers wait for a fill.
+LOCK_TTL = 120.0
+LOCK_POLL = 0.1
+
+
+class FillTimeout(TimeoutError):
+    """Another caller held the fill lock for longer than this caller's ``wait``."""
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+class MemoryBackend:
+    """Process-local backend with the same interface as the shared ones; LRU-bounded."""
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.time() + SWEEP_INTERVAL
+
+    def _live(self, key, now):
+        item = self._items.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self._items[key]
+            return None
+        return item
+
+    def _store(self, key, value, ttl, now):
+        self._items[key] = (value, now + ttl if ttl else None)
+        self._items.move_to_end(key)
+        if now >= self._next_sweep:
+            self._next_sweep = now + SWEEP_INTERVAL
+            for k in [k for k, (_, expires) in self._items.items() if expires is not None and expires <= now]:
+                del self._items[k]
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        with self._lock:
+            self._store(key, value, ttl, time.time())
+
+    def add(self, key: str, value: bytes, ttl: float = None) -> bool:
+        """Set only if absent; True if this call set it."""
+        with self._lock:
+            now = time.time()
+            if self._live(key, now) is not None:
+                return False
+            self._store(key, value, ttl, now)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def delete_if(self, key: str, value: bytes) -> bool:
+        """Delete ``key`` only while it still holds ``value``; True if deleted."""
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None or item[0] != value:
+                return False
+            del self._items[key]
+            return True
+
+    def renew(self, key: str, value: bytes, ttl: float) -> bool:
+        """Reset the TTL of ``key`` only while it still holds ``value``."""
+        with self._lock:
+            now = time.time()
+            item = self._live(key, now)
+            if item is None or item[0] != value:
+                return False
+            self._items[key] = (value, now + ttl)
+            return True
+
+
+class SQLiteBackend:
+    """Shared SQLite file; one connection per thread, WAL journal."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None),
+        )
+        self._maybe_sweep()
+
+    def _maybe_sweep(self):
+        """Delete expired rows, at most once per SWEEP_INTERVAL per process."""
+        now = time.time()
+        with self._sweep_lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + SWEEP_INTERVAL
+        self._conn().execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+
+    def add(self, key: str, value: bytes, ttl: float = None) -> bool:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires IS NOT NULL AND expires <= ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount == 1
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_if(self, key: str, value: bytes) -> bool:
+        cur = self._conn().execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, value))
+        return cur.rowcount == 1
+
+    def renew(self, key: str, value: bytes, ttl: float) -> bool:
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE cache SET expires = ? WHERE key = ? AND value = ? AND (expires IS NULL OR expires > ?)",
+            (now + ttl, key, value, now),
+        )
+        return cur.rowcount == 1
+
+
+class RedisBackend:
+    """
+    Redis-protocol server (Redis, Valkey, KeyDB, ...) through a redis-py style client.
+
+    Every process that can write to the server can put values in front of the
+    app; entries are JSON, so that is a data-integrity boundary, not a
+    code-execution one. Keep the server private to the app's replicas.
+    """
+
+    # Compare-and-delete / compare-and-renew of a fill lock, atomically on the server.
+    DELETE_IF = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+    RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str):
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str):
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key: str, value: bytes, ttl: float = None) -> bool:
+        return bool(self.client.set(key, value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def delete_if(self, key: str, value: bytes) -> bool:
+        return bool(self.client.eval(self.DELETE_IF, 1, key, value))
+
+    def renew(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self.client.eval(self.RENEW, 1, key, value, int(ttl * 1000)))
+
+
+class LocalRedis:
+    """
+    In-memory stand-in for the redis-py calls ``RedisBackend`` makes, including
+    its two Lua scripts (tests; ``SHARED_CACHE_URL=localredis://``).
+    """
+
+    def __init__(self):
+        self._store = MemoryBackend()
+
+    def get(self, name):
+        return self._store.get(name)
+
+    def set(self, name, value, ex=None, px=None, nx=False):
+        ttl = px / 1000.0 if px else ex
+        if nx:
+            return True if self._store.add(name, value, ttl) else None
+        self._store.set(name, value, ttl)
+        return True
+
+    def delete(self, *names):
+        for name in names:
+            self._store.delete(name)
+
+    def eval(self, script, numkeys, *keys_and_args):
+        key, value = keys_and_args[0], keys_and_args[1]
+        if script == RedisBackend.DELETE_IF:
+            return int(self._store.delete_if(key, value))
+        if script == RedisBackend.RENEW:
+            return int(self._store.renew(key, value, int(keys_and_args[2]) / 1000.0))
+        raise NotImplementedError("LocalRedis only runs RedisBackend's scripts")
+
+
+def backend_from_url(url: str):
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryBackend()
+    if parsed.scheme == "sqlite":
+        path = parsed.path or os.path.join(tempfile.gettempdir(), "wnmaps_cache.db")
+        return SQLiteBackend(path)
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisBackend.from_url(url)
+    if parsed.scheme == "localredis":
+        return RedisBackend(LocalRedis())
+    raise ValueError(f"unsupported SHARED_CACHE_URL scheme: {url!r}")
+
+
+# =============================================================================
+# TIERED CACHE
+# =============================================================================
+class _LocalTier:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item
+
+    def set(self, key, value, expires):
+        with self._lock:
+            self._items[key] = (value, expires)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class _Lease:
+    """Keeps a fill lock alive while its holder computes; releases it only if still owned."""
+
+    def __init__(self, backend, key: str, token: bytes):
+        self.backend = backend
+        self.key = key
+        self.token = token
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._renew, name="shared-cache-lease", daemon=True)
+        self._thread.start()
+
+    def _renew(self):
+        while not self._stop.wait(LOCK_TTL / 3):
+            try:
+                if not self.backend.renew(self.key, self.token, LOCK_TTL):
+                    logger.warning("shared cache: lost fill lock %s", self.key)
+                    return
+            except Exception as exc:
+                logger.debug("shared cache: cannot renew %s: %s", self.key, exc)
+
+    def release(self) -> bool:
+        self._stop.set()
+        self._thread.join()
+        return self.backend.delete_if(self.key, self.token)
+
+
+class SharedCache:
+    def __init__(self, backend, local_max_entries: int = LOCAL_MAX_ENTRIES, prefix: str = KEY_PREFIX):
+        self.backend = backend
+        self.prefix = prefix
+        self._local = _LocalTier(local_max_entries)
+        self._lock = threading.Lock()
+        self._stats = {
+            "local": {"hits": 0, "misses": 0},
+            "shared": {"hits": 0, "misses": 0, "errors": 0},
+            "fills": 0,
+            "failed_fills": 0,
+            "lock_waits": 0,
+        }
+
+    def _count(self, tier, what):
+        with self._lock:
+            if tier is None:
+                self._stats[what] += 1
+            else:
+                self._stats[tier][what] += 1
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    @staticmethod
+    def _load(raw: bytes):
+        """(value, absolute expiry) of a stored entry, or None if it has expired."""
+        value, expires = json.loads(raw)
+        if expires is not None and expires <= time.time():
+            return None
+        return value, expires
+
+    def _shared_get(self, full_key):
+        """(value, expiry) from the shared tier, copied into the local tier; None on a miss."""
+        try:
+            raw = self.backend.get(full_key)
+        except Exception:
+            self._count("shared", "errors")
+            return None
+        found = None if raw is None else self._load(raw)
+        if found is None:
+            self._count("shared", "misses")
+            return None
+        self._count("shared", "hits")
+        self._local.set(full_key, found[0], found[1])
+        return found
+
+    def get(self, namespace: str, key: str, default=None):
+        full_key = self._key(namespace, key)
+        item = self._local.get(full_key)
+        if item is not None:
+            self._count("local", "hits")
+            return item[0]
+        self._count("local", "misses")
+        found = self._shared_get(full_key)
+        return default if found is None else found[0]
+
+    def set(self, namespace: str, key: str, value, ttl: float):
+        full_key = self._key(namespace, key)
+        expires = time.time() + ttl
+        self._local.set(full_key, value, expires)
+        try:
+            self.backend.set(full_key, json.dumps([value, expires]).encode("utf-8"), ttl)
+        except Exception:
+            self._count("shared", "errors")
+
+    def _wait_for_fill(self, full_key: str, lock_key: str, deadline: float):
+        """
+        Wait while another caller fills ``full_key``: (value, expiry) once it
+        appears, or None when the lock is released without a value (the fill
+        failed), the deadline passes or the backend fails.
+        """
+        while time.time() < deadline:
+            time.sleep(LOCK_POLL)
+            try:
+                raw = self.backend.get(full_key)
+                found = None if raw is None else self._load(raw)
+                if found is not None:
+                    self._local.set(full_key, found[0], found[1])
+                    return found
+                if self.backend.get(lock_key) is None:
+                    return None
+            except Exception:
+                self._count("shared", "errors")
+                return None
+        return None
+
+    def get_or_compute(self, namespace: str, key: str, compute, ttl: float, wait: float = None):
+        """
+        Cached ``compute()`` under (namespace, key). Across processes only the
+        caller holding the fill lock computes a missing entry; the rest wait
+        for it up to ``wait`` seconds (default ``LOCK_TTL``) and raise
+        ``FillTimeout`` if it is still being filled then. Only an unreachable
+        backend makes a caller compute without the lock.
+        """
+        full_key = self._key(namespace, key)
+        item = self._local.get(full_key)
+        if item is not None:
+            self._count("local", "hits")
+            return item[0]
+        self._count("local", "misses")
+
+        found = self._shared_get(full_key)
+        if found is not None:
+            return found[0]
+
+        lock_key = full_key + ":lock"
+        token = uuid.uuid4().hex.encode()
+        wait = LOCK_TTL if wait is None else wait
+        deadline = time.time() + wait
+        while True:
+            try:
+                have_lock = self.backend.add(lock_key, token, LOCK_TTL)
+            except Exception:
+                self._count("shared", "errors")
+                have_lock = None
+            if have_lock is not False:
+                break
+            self._count(None, "lock_waits")
+            found = self._wait_for_fill(full_key, lock_key, deadline)
+            if found is not None:
+                return found[0]
+            if time.time() >= deadline:
+                raise FillTimeout(f"{namespace}:{key} still being filled by another caller after {wait:.0f}s")
+            # The filler gave up; take the lock over (or wait for whoever did).
+
+        lease = _Lease(self.backend, lock_key, token) if have_lock else None
+        try:
+            value = compute()
+            self._count(None, "fills")
+            self.set(namespace, key, value, ttl)
+            return value
+        except BaseException:
+            self._count(None, "failed_fills")
+            raise
+        finally:
+            if lease is not None:
+                try:
+                    lease.release()
+                except Exception:
+                    self._count("shared", "errors")
+
+    def clear_local(self):
+        self._local.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {
+                "local": dict(self._stats["local"]),
+                "shared": dict(self._stats["shared"]),
+                "fills": self._stats["fills"],
+                "failed_fills": self._stats["failed_fills"],
+                "lock_waits": self._stats["lock_waits"],
+            }
+        for tier in ("local", "shared"):
+            lookups = out[tier]["hits"] + out[tier]["misses"]
+            out[tier]["hit_rate"] = out[tier]["hits"] / lookups if lookups else 0.0
+        out["backend"] = type(self.backend).__name__
+        return out
+
+
+shared_cache = SharedCache(backend_from_url(SHARED_CACHE_URL))
@@ -0,0 +1,188 @@
+"""
+Yearly Landsat timelapse GIFs for the Lake Recession page.
+
+Showing every year through map tiles would need one ``getMapId()`` per year
+per lake. A timelapse instead asks Earth Engine for one PNG thumbnail per
+yearly composite (``getThumbURL`` plus a download). These requests go out
+concurrently through a bounded pool (``TIMELAPSE_WORKERS``). The frames are
+labelled and stitched into an animated GIF locally with Pillow.
+
+GIFs are stored in a content-addressed disk cache. The file name is a hash of
+the frames' serialized EE expressions and the render settings, so each lake's
+animation is produced once and reused until its inputs change. Deriving the
+name needs no server call. The cache lives under ``static/`` next to the app,
+so with ``server.enableStaticServing`` Streamlit serves the files directly.
+The ``shared_cache`` fill lock makes concurrent sessions (or replicas) asking
+for the same GIF wait for one build instead of starting their own. They wait
+up to ``build_wait()``, the worst case of a build in which every request runs
+into ``DOWNLOAD_TIMEOUT``, so a slow build is never started twice.
+"""
+import contextvars
+import functools
+import hashlib
+import io
+import json
+import math
+import os
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import ee
+
+from utils.layers import LAKES, LANDSAT_VIS, landsat_composite
+from utils.shared_cache import shared_cache
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+CACHE_DIR = os.environ.get("TIMELAPSE_CACHE_DIR") or os.path.join(STATIC_DIR, "timelapse")
+
+TIMELAPSE_YEARS = tuple(range(2001, 2021))
+TIMELAPSE_WORKERS = int(os.environ.get("TIMELAPSE_WORKERS", "6"))
+DIMENSIONS = 600
+FRAME_MS = 500
+DOWNLOAD_TIMEOUT = 120
+# Labelling and stitching the frames, on top of the downloads.
+STITCH_SECONDS = 60
+
+# Bump when the way frames are rendered changes, to invalidate cached GIFs.
+RENDER_VERSION = 1
+
+
+def lake_region(lat: float, lon: float, zoom: int) -> list:
+    """[west, south, east, north] roughly matching the lake's map view."""
+    half_w = 360.0 / 2 ** zoom * 1.5
+    half_h = half_w * 0.75
+    return [lon - half_w, lat - half_h, lon + half_w, lat + half_h]
+
+
+def _thumb_params(region) -> dict:
+    return {**LANDSAT_VIS, "region": region, "dimensions": DIMENSIONS, "format": "png"}
+
+
+def timelapse_key(frames, region) -> str:
+    """Content hash of a timelapse: every frame's expression plus the render settings."""
+    h = hashlib.sha1()
+    for year, image in frames:
+        h.update(str(year).encode())
+        h.update(image.serialize().encode("utf-8"))
+    settings = {"params": _thumb_params(region), "frame_ms": FRAME_MS, "version": RENDER_VERSION}
+    h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def build_wait(n_frames: int, workers: int = TIMELAPSE_WORKERS) -> float:
+    """
+    Worst-case seconds for ``build_timelapse``: frames go in rounds of
+    ``workers``, and each frame's thumbnail request and download may both
+    take up to ``DOWNLOAD_TIMEOUT``.
+    """
+    rounds = math.ceil(n_frames / max(1, workers))
+    return rounds * 2 * DOWNLOAD_TIMEOUT + STITCH_SECONDS
+
+
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as resp:
+        return resp.read()
+
+
+def _fetch_frame(image: ee.Image, region) -> bytes:
+    return _download(image.getThumbURL(_thumb_params(region)))
+
+
+def _label(frame, text: str):
+    from PIL import ImageDraw, ImageFont
+
+    draw = ImageDraw.Draw(frame)
+    try:
+        font = ImageFont.load_default(size=max(14, frame.height // 14))
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    x, y = 10, frame.height - 10
+    box = draw.textbbox((x, y), text, font=font, anchor="lb")
+    draw.rectangle((box[0] - 6, box[1] - 4, box[2] + 6, box[3] + 4), fill="white")
+    draw.text((x, y), text, fill="blue", font=font, anchor="lb")
+
+
+def stitch_gif(pngs, labels, frame_ms: int = FRAME_MS) -> bytes:
+    """Animated GIF from PNG frames, each labelled in the bottom-left corner."""
+    from PIL import Image
+
+    frames = []
+    for png, label in zip(pngs, labels):
+        frame = Image.open(io.BytesIO(png)).convert("RGB")
+        _label(frame, label)
+        frames.append(frame.quantize(colors=255, method=Image.Quantize.FASTOCTREE))
+    out = io.BytesIO()
+    frames[0].save(out, format="GIF", save_all=True, append_images=frames[1:],
+                   duration=frame_ms, loop=0)
+    return out.getvalue()
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".gif.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def build_timelapse(frames, region, path: str, workers: int = TIMELAPSE_WORKERS) -> str:
+    """Fetch all frames concurrently, stitch them and write the GIF to ``path``."""
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="timelapse") as pool:
+        # copy_context keeps the page tag on the thumbnail spans.
+        pngs = list(pool.map(
+            lambda image: contextvars.copy_context().run(_fetch_frame, image, region),
+            [image for _, image in frames],
+        ))
+    _write_atomic(path, stitch_gif(pngs, [str(year) for year, _ in frames]))
+    return path
+
+
+@functools.lru_cache(maxsize=32)
+def _lake_job(lake: str, years):
+    """(frames, region, cache path) of a lake's timelapse; no server calls, memoized per process."""
+    frames = [(year, landsat_composite(year)) for year in years]
+    region = lake_region(*LAKES[lake])
+    return frames, region, os.path.join(CACHE_DIR, timelapse_key(frames, region) + ".gif")
+
+
+def cached_timelapse_path(lake: str, years=TIMELAPSE_YEARS) -> str:
+    """Path of the lake's GIF if it has already been built, else None."""
+    path = _lake_job(lake, tuple(years))[2]
+    return path if os.path.exists(path) else None
+
+
+def lake_timelapse(lake: str, years=TIMELAPSE_YEARS) -> str:
+    """Path of the lake's timelapse GIF, building it on first request."""
+    frames, region, path = _lake_job(lake, tuple(years))
+    if os.path.exists(path):
+        return path
+
+    def build():
+        # Another session may have finished it while this one waited for the lock.
+        return path if os.path.exists(path) else build_timelapse(frames, region, path)
+
+    key = os.path.basename(path)[:-len(".gif")]
+    shared_cache.get_or_compute("timelapse", key, build, ttl=24 * 3600, wait=build_wait(len(frames)))
+    if not os.path.exists(path):
+        # Built by a replica that does not share this disk.
+        build_timelapse(frames, region, path)
+    return path
+
+
+def static_url(path: str):
+    """App-relative URL for a file under ``static/`` when static serving is on, else None."""
+    import streamlit as st
+
+    if not st.get_option("server.enableStaticServing"):
+        return None
+    rel = os.path.relpath(os.path.abspath(path), STATIC_DIR)
+    if rel.startswith(".."):
+        return None
+    return "app/static/" + rel.replace(os.sep, "/")
@@ -0,0 +1,323 @@
+"""
+Lightweight tracing of Earth Engine calls and map renders.
+
+``instrument_ee()`` wraps the EE client calls that go to the server
+(``Initialize``, ``getInfo``, ``getMapId``, ``getThumbURL``,
+``data.computePixels``) so every call on every page is timed without touching
+call sites; map rendering is wrapped explicitly with ``span()``.
+
+Each span is tagged with the page (``set_page()``), the operation and, for EE
+calls made inside ``expr_scope(key)``, the first characters of that cache key
+(``utils.ee_cache`` opens the scope with the key it already computed, so
+tracing never serializes an expression itself). Every ``set_page()`` starts a
+new trace ID shared by the spans of that script run. Durations are aggregated
+into per-process histograms by (page, operation), and the most recent spans
+are kept in a bounded buffer that can be exported as JSON lines or as
+OpenTelemetry OTLP/JSON.
+
+``perf_panel()`` draws an opt-in sidebar panel, shown when the
+``PERF_PANEL`` environment variable is set or the URL has ``?perf=1``.
+"""
+import bisect
+import contextvars
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+SERVICE_NAME = "willnelsonsworldmaps"
+
+# Histogram bucket upper bounds (ms); the last bucket is open-ended.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "5000"))
+
+EXPR_CHARS = 12
+
+# Spans recorded outside any script run share one trace per process.
+_BACKGROUND_TRACE_ID = os.urandom(16).hex()
+
+_page = contextvars.ContextVar("trace_page", default="background")
+_trace_id = contextvars.ContextVar("trace_id", default=_BACKGROUND_TRACE_ID)
+_expr = contextvars.ContextVar("trace_expr", default=None)
+
+
+def set_page(name: str):
+    """Tag spans recorded by the current script run with ``name`` and a new trace ID."""
+    _page.set(name)
+    _trace_id.set(os.urandom(16).hex())
+
+
+def current_page() -> str:
+    return _page.get()
+
+
+def current_trace_id() -> str:
+    return _trace_id.get()
+
+
+@contextlib.contextmanager
+def expr_scope(key: str):
+    """Tag EE calls made in this block with ``key`` (an ``ee_cache.expr_key``)."""
+    token = _expr.set(key[:EXPR_CHARS] if key else None)
+    try:
+        yield
+    finally:
+        _expr.reset(token)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (capped at the max seen)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                bound = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "min_ms": self.min_ms if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": self.max_ms,
+            "buckets_ms": dict(zip([str(b) for b in BUCKETS_MS] + ["inf"], self.counts)),
+        }
+
+
+class Tracer:
+    """Per-process span store: histograms by (page, operation) plus recent spans."""
+
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._spans = deque(maxlen=max_spans)
+
+    def record(self, operation: str, start_ns: int, end_ns: int, page: str, attrs: dict, trace_id: str = None):
+        ms = (end_ns - start_ns) / 1e6
+        with self._lock:
+            hist = self._histograms.get((page, operation))
+            if hist is None:
+                hist = self._histograms[(page, operation)] = Histogram()
+            hist.add(ms)
+            self._spans.append({
+                "name": operation,
+                "page": page,
+                "trace_id": trace_id or _BACKGROUND_TRACE_ID,
+                "start_ns": start_ns,
+                "end_ns": end_ns,
+                "duration_ms": ms,
+                "attrs": attrs,
+            })
+
+    def histograms(self) -> list:
+        with self._lock:
+            return [
+                {"page": page, "operation": op, **hist.summary()}
+                for (page, op), hist in sorted(self._histograms.items())
+            ]
+
+    def spans(self) -> list:
+        with self._lock:
+            return list(self._spans)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._spans.clear()
+
+    def export_jsonl(self) -> str:
+        return "".join(json.dumps(s, default=str) + "\n" for s in self.spans())
+
+    def export_otlp_json(self) -> str:
+        """Recent spans as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        def attr(k, v):
+            if isinstance(v, bool):
+                return {"key": k, "value": {"boolValue": v}}
+            if isinstance(v, int):
+                return {"key": k, "value": {"intValue": str(v)}}
+            if isinstance(v, float):
+                return {"key": k, "value": {"doubleValue": v}}
+            return {"key": k, "value": {"stringValue": str(v)}}
+
+        otlp_spans = [
+            {
+                "traceId": s["trace_id"],
+                "spanId": os.urandom(8).hex(),
+                "name": s["name"],
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s["start_ns"]),
+                "endTimeUnixNano": str(s["end_ns"]),
+                "attributes": [attr("page", s["page"])]
+                + [attr(k, v) for k, v in s["attrs"].items() if v is not None],
+            }
+            for s in self.spans()
+        ]
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [attr("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+            }]
+        })
+
+
+tracer = Tracer()
+
+
+class span:
+    """Context manager timing one operation: ``with span("map.render", cache="hit"): ...``"""
+
+    def __init__(self, operation: str, **attrs):
+        self.operation = operation
+        self.attrs = attrs
+
+    def __enter__(self):
+        self._start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        tracer.record(self.operation, self._start, time.time_ns(), current_page(), self.attrs, current_trace_id())
+        return False
+
+
+# =============================================================================
+# EE INSTRUMENTATION
+# =============================================================================
+def _traced_method(fn, operation):
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with span(operation, expr=_expr.get()):
+            return fn(self, *args, **kwargs)
+
+    wrapper._traced = True
+    return wrapper
+
+
+def _traced_function(fn, operation):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(operation, expr=_expr.get()):
+            return fn(*args, **kwargs)
+
+    wrapper._traced = True
+    return wrapper
+
+
+_instrument_lock = threading.Lock()
+
+
+def instrument_ee():
+    """Wrap EE server calls with spans; safe to call on every rerun."""
+    import ee
+
+    with _instrument_lock:
+        targets = [
+            (ee.ComputedObject, "getInfo", "ee.getInfo"),
+            (ee.Image, "getMapId", "ee.getMapId"),
+            (ee.Image, "getThumbURL", "ee.getThumbURL"),
+        ]
+        for cls, name, operation in targets:
+            fn = cls.__dict__.get(name)
+            if fn is not None and not getattr(fn, "_traced", False):
+                setattr(cls, name, _traced_method(fn, operation))
+
+        if not getattr(ee.Initialize, "_traced", False):
+            ee.Initialize = _traced_function(ee.Initialize, "ee.Initialize")
+        compute = getattr(ee.data, "computePixels", None)
+        if compute is not None and not getattr(compute, "_traced", False):
+            ee.data.computePixels = _traced_function(compute, "ee.computePixels")
+
+
+# =============================================================================
+# UI
+# =============================================================================
+def perf_panel_enabled() -> bool:
+    import streamlit as st
+
+    if os.environ.get("PERF_PANEL"):
+        return True
+    try:
+        return st.query_params.get("perf") in ("1", "true")
+    except Exception:
+        return False
+
+
+def perf_panel():
+    """Opt-in sidebar panel with per-process timing histograms and exports."""
+    if not perf_panel_enabled():
+        return
+    import pandas as pd
+    import streamlit as st
+
+    from utils.map_cache import map_html_cache
+    from utils.session_memory import STATE_KEY, memory_stats
+    from utils.shared_cache import shared_cache
+    from utils.warmup import warmup
+
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        rows = tracer.histograms()
+        if rows:
+            df = pd.DataFrame(rows).drop(columns=["buckets_ms"])
+            st.dataframe(df.round(1), use_container_width=True, hide_index=True)
+        else:
+            st.write("No spans recorded yet.")
+
+        cache = map_html_cache.stats()
+        st.caption(
+            f"Map HTML cache: {cache['hit_rate']:.0%} hit rate "
+            f"({cache['hits']} hits / {cache['misses']} misses, {cache['entries']} entries)"
+        )
+        shared = shared_cache.stats()
+        st.caption(
+            f"EE result cache ({shared['backend']}): local {shared['local']['hit_rate']:.0%}, "
+            f"shared {shared['shared']['hit_rate']:.0%} hit rate; {shared['fills']} fills, "
+            f"{shared['lock_waits']} lock waits"
+        )
+        warm = warmup.status()
+        if warm["duration_s"] is not None:
+            st.caption(
+                f"Layer warm-up: {warm['state']}, {warm['ready']}/{warm['total']} layers ready "
+                f"in {warm['duration_s']:.1f}s"
+            )
+
+        mem = memory_stats()
+        mine = st.session_state.get(STATE_KEY)
+        mine = mine.stats() if mine is not None else {"bytes": 0, "spilled_bytes": 0}
+        rss = f", process RSS {mem['rss_bytes'] / 2**20:.0f} MB" if mem["rss_bytes"] else ""
+        st.caption(
+            f"Session memory: this session {mine['bytes'] / 2**20:.1f} MB "
+            f"(+{mine['spilled_bytes'] / 2**20:.1f} MB spilled); all {mem['sessions']} sessions "
+            f"{mem['bytes'] / 2**20:.1f} / {mem['global_budget'] / 2**20:.0f} MB "
+            f"(+{mem['spilled_bytes'] / 2**20:.1f} MB spilled){rss}"
+        )
+
+        st.download_button("Spans (JSON lines)", tracer.export_jsonl(), file_name="spans.jsonl",
+                           mime="application/x-ndjson", use_container_width=True)
+        st.download_button("Spans (OTLP/JSON)", tracer.export_otlp_json(), file_name="spans.otlp.json",
+                           mime="application/json", use_container_width=True)
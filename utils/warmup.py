@@ -0,0 +1,186 @@
+"""
+Process-start warm-up of the featured Earth Engine layers.
+
+After a deploy or restart the first visitor to each page would otherwise pay
+for every ``getMapId()`` on it (ERA5 decadal means, Landsat composites, the
+snow mosaic, NLCD years). ``start_warmup()`` builds all featured layers from
+``utils.layers`` in a background thread and stores their tile URLs in the
+shared cache (``utils.ee_cache.tile_url``), so pages find them ready. The
+server keeps accepting traffic while this runs; a page that gets there first
+simply computes the layer itself, and the cache's fill lock stops the two
+from doing the same work twice.
+
+Configured through environment variables:
+
+- ``WARMUP_ENABLED``  ``1`` (default) or ``0``
+- ``WARMUP_LAYERS``   ``all`` (default), ``none``, or a comma-separated list
+                      of groups: ``home,heatmap,lakes,nlcd``
+- ``WARMUP_WORKERS``  concurrent ``getMapId()`` calls (default 4)
+
+The main script and every page call ``start_warmup()``, which does nothing
+once it has run in the process, so under ``streamlit run`` the warm-up starts
+with the first script run. ``serve.py`` is an optional entry point that
+starts it before the server accepts connections.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import tracing
+from utils.layers import featured_layers
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+WARMUP_LAYERS = os.environ.get("WARMUP_LAYERS", "all")
+WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", "4"))
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+def selected_groups(spec: str = WARMUP_LAYERS) -> list:
+    groups = list(featured_layers())
+    spec = (spec or "").strip().lower()
+    if spec in ("", "all"):
+        return groups
+    if spec == "none":
+        return []
+    wanted = [g.strip() for g in spec.split(",") if g.strip()]
+    unknown = sorted(set(wanted) - set(groups))
+    if unknown:
+        logger.warning("WARMUP_LAYERS: unknown groups %s (known: %s)", unknown, groups)
+    return [g for g in groups if g in wanted]
+
+
+class Warmup:
+    """Builds the map IDs of the selected featured layer groups, once."""
+
+    def __init__(self, groups=None, workers: int = WARMUP_WORKERS):
+        self.groups = selected_groups() if groups is None else list(groups)
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = PENDING
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.layers = {}
+
+    # -------------------------------------------------------------------------
+    def start(self) -> bool:
+        """Run in a daemon thread; True if this call started it."""
+        with self._lock:
+            if self._thread is not None or self.state != PENDING:
+                return False
+            self._thread = threading.Thread(target=self.run, name="layer-warmup", daemon=True)
+        self._thread.start()
+        return True
+
+    def run(self):
+        """Warm every selected layer in the calling thread."""
+        from utils import ee_auth
+        from utils.ee_cache import tile_url
+
+        catalog = featured_layers()
+        jobs = [(group, name, build) for group in self.groups for name, build in catalog[group]]
+        with self._lock:
+            self.state = RUNNING
+            self.started_at = time.time()
+            self.layers = {
+                (group, name): {"group": group, "name": name, "state": PENDING, "seconds": None, "error": None}
+                for group, name, _ in jobs
+            }
+        tracing.set_page("warmup")
+        logger.info("warm-up: %d layers in groups %s", len(jobs), self.groups)
+
+        try:
+            ee_auth.ensure_initialized()
+        except Exception as exc:
+            self._finish(FAILED, f"{type(exc).__name__}: {exc}")
+            logger.warning("warm-up skipped, Earth Engine not initialized: %s", exc)
+            return
+
+        def warm(job):
+            group, name, build = job
+            tracing.set_page("warmup")  # pool threads start with a fresh context
+            entry = self.layers[(group, name)]
+            entry["state"] = RUNNING
+            t0 = time.perf_counter()
+            try:
+                image, vis = build()
+                tile_url(image, vis)
+                entry["state"] = READY
+            except Exception as exc:
+                entry["state"] = FAILED
+                entry["error"] = f"{type(exc).__name__}: {exc}"
+                logger.warning("warm-up: %s/%s failed: %s", group, name, exc)
+            entry["seconds"] = time.perf_counter() - t0
+            logger.debug("warm-up: %s/%s %s in %.2fs", group, name, entry["state"], entry["seconds"])
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="layer-warmup") as pool:
+            list(pool.map(warm, jobs))
+
+        failed = [k for k, v in self.layers.items() if v["state"] == FAILED]
+        self._finish(FAILED if failed else READY, f"{len(failed)} layers failed" if failed else None)
+        logger.info(
+            "warm-up finished in %.2fs: %d/%d layers ready",
+            self.finished_at - self.started_at, len(jobs) - len(failed), len(jobs),
+        )
+
+    def _finish(self, state, error=None):
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.finished_at = time.time()
+
+    # -------------------------------------------------------------------------
+    def is_ready(self, group: str = None, name: str = None) -> bool:
+        """True once the layer (or every layer of the group, or all of them) is warm."""
+        with self._lock:
+            entries = [
+                v for (g, n), v in self.layers.items()
+                if (group is None or g == group) and (name is None or n == name)
+            ]
+            return bool(entries) and all(v["state"] == READY for v in entries)
+
+    def status(self) -> dict:
+        with self._lock:
+            layers = [dict(v) for v in self.layers.values()]
+            duration = None
+            if self.started_at is not None:
+                duration = (self.finished_at or time.time()) - self.started_at
+            return {
+                "enabled": WARMUP_ENABLED,
+                "state": self.state,
+                "groups": list(self.groups),
+                "duration_s": duration,
+                "ready": sum(v["state"] == READY for v in layers),
+                "total": len(layers),
+                "error": self.error,
+                "layers": layers,
+            }
+
+
+warmup = Warmup()
+
+
+def start_warmup() -> bool:
+    """Start the process-wide warm-up if enabled; safe to call on every rerun."""
+    if not WARMUP_ENABLED or not warmup.groups:
+        return False
+    return warmup.start()
+
+
+def readiness_indicator(group: str):
+    """Small caption while the page's featured layers are still warming up."""
+    import streamlit as st
+
+    status = warmup.status()
+    if status["state"] != RUNNING or group not in status["groups"]:
+        return
+    layers = [v for v in status["layers"] if v["group"] == group]
+    ready = sum(v["state"] == READY for v in layers)
+    if ready < len(layers):
+        st.caption(f"⏳ Warming up map layers ({ready}/{len(layers)} ready); the first load may be slower.")
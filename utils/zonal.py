@@ -0,0 +1,170 @@
+"""
+Per-feature NLCD class areas for comparing several ROIs at once.
+
+Instead of unioning an uploaded FeatureCollection into one geometry, every
+feature keeps its own statistics. All requested years are stacked into one
+multi-band image and reduced over a chunk of features with a single
+``reduceRegions(frequencyHistogram)`` call, so an upload costs one EE request
+per ``ZONAL_CHUNK_SIZE`` features regardless of the number of years. Chunks
+run concurrently (``ZONAL_WORKERS``).
+
+Pixels are counted on the 30 m CONUS Albers grid (equal-area, like the local
+engine in ``utils.nlcd_local``), so area = weighted count * ``PIXEL_AREA_KM2``.
+Results are cached per (feature geometry, year) in the shared cache, so
+re-uploading or re-selecting years only computes what is missing.
+
+The result is a (n_features, n_years, n_classes) array on the ``NLCD_CODES``
+axis, which ``ChangeAnalysis`` takes as a batch.
+"""
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import ee
+import numpy as np
+import pandas as pd
+
+from utils.ee_cache import STATS_TTL
+from utils.nlcd import NLCD_CLASSES, NLCD_CODES
+from utils.nlcd_local import ALBERS, PIXEL_AREA_KM2, SCALE
+from utils.shared_cache import shared_cache
+
+ZONAL_CHUNK_SIZE = int(os.environ.get("ZONAL_CHUNK_SIZE", "100"))
+ZONAL_WORKERS = int(os.environ.get("ZONAL_WORKERS", "4"))
+
+# Property names tried, in order, for a feature's display label.
+LABEL_PROPERTIES = ("name", "NAME", "Name", "label", "title", "GEOID", "id", "ID")
+
+
+def feature_labels(properties_list) -> list:
+    """Display labels from feature properties, made unique by numbering repeats."""
+    labels, seen = [], {}
+    for i, properties in enumerate(properties_list):
+        label = next(
+            (str(properties[k]) for k in LABEL_PROPERTIES if (properties or {}).get(k) not in (None, "")),
+            f"Feature {i + 1}",
+        )
+        seen[label] = seen.get(label, 0) + 1
+        labels.append(label if seen[label] == 1 else f"{label} ({seen[label]})")
+    return labels
+
+
+def _band(year) -> str:
+    return f"y{year}"
+
+
+def _cache_key(fid: str, year) -> str:
+    return f"{fid}:{year}:{SCALE}"
+
+
+def reduce_collection(fc, years, landcover_for_year, tile_scale: float = 1) -> list:
+    """
+    Class areas for every feature of an ee.FeatureCollection with one
+    ``reduceRegions`` call, as [(feature properties, {year: {code: km2}})].
+    """
+    years = [str(y) for y in years]
+    image = ee.Image.cat([landcover_for_year(y).rename(_band(y)) for y in years])
+    reduced = image.reduceRegions(
+        collection=fc,
+        reducer=ee.Reducer.frequencyHistogram(),
+        scale=SCALE,
+        crs=ALBERS,
+        tileScale=tile_scale,
+    )
+    info = reduced.getInfo()
+
+    out = []
+    for feature in info.get("features", []):
+        props = dict(feature.get("properties", {}))
+        per_year = {}
+        for y in years:
+            # A single-band image reports under the reducer's output name.
+            hist = props.pop(_band(y), None)
+            if hist is None and len(years) == 1:
+                hist = props.pop("histogram", None)
+            per_year[y] = {int(float(code)): float(n) * PIXEL_AREA_KM2 for code, n in (hist or {}).items()}
+        out.append((props, per_year))
+    return out
+
+
+def _reduce_chunk(chunk, years, landcover_for_year) -> dict:
+    """{fid: {year: {code: km2}}} for one chunk of (fid, geometry)."""
+    fc = ee.FeatureCollection([ee.Feature(ee.Geometry(geom), {"fid": fid}) for fid, geom in chunk])
+    return {props.get("fid"): per_year for props, per_year in reduce_collection(fc, years, landcover_for_year)}
+
+
+def feature_class_areas(features, years, landcover_for_year) -> np.ndarray:
+    """
+    Class areas (km²) for every feature and year, shape (n_features, n_years, n_classes).
+
+    ``features`` is a list of (fid, GeoJSON geometry) with ``fid`` the
+    geometry hash; ``landcover_for_year(y)`` returns the NLCD ee.Image.
+    """
+    years = [str(y) for y in years]
+    cached = {}
+    # Features grouped by the years they still need, so a newly selected year
+    # only reduces that year.
+    todo = {}
+    for fid, geom in features:
+        need = []
+        for y in years:
+            hit = shared_cache.get("zonal", _cache_key(fid, y))
+            if hit is None:
+                need.append(y)
+            else:
+                # Shared-tier entries are JSON, whose object keys are strings.
+                cached[(fid, y)] = {int(code): km2 for code, km2 in hit.items()}
+        if need:
+            todo.setdefault(tuple(need), {}).setdefault(fid, geom)
+
+    jobs = []
+    for need, geoms in todo.items():
+        items = list(geoms.items())
+        jobs += [(items[i:i + ZONAL_CHUNK_SIZE], need) for i in range(0, len(items), ZONAL_CHUNK_SIZE)]
+    if jobs:
+        with ThreadPoolExecutor(max_workers=max(1, min(ZONAL_WORKERS, len(jobs)))) as pool:
+            results = pool.map(
+                lambda job: contextvars.copy_context().run(_reduce_chunk, job[0], job[1], landcover_for_year),
+                jobs,
+            )
+            for result in results:
+                for fid, per_year in result.items():
+                    for y, areas in per_year.items():
+                        shared_cache.set("zonal", _cache_key(fid, y), areas, STATS_TTL)
+                        cached[(fid, y)] = areas
+
+    code_index = {c: i for i, c in enumerate(NLCD_CODES)}
+    out = np.zeros((len(features), len(years), len(NLCD_CODES)), dtype=float)
+    for f, (fid, _) in enumerate(features):
+        for j, y in enumerate(years):
+            for code, km2 in cached.get((fid, y), {}).items():
+                if code in code_index:
+                    out[f, j, code_index[code]] = km2
+    return out
+
+
+def areas_long_frame(areas: np.ndarray, labels, years) -> pd.DataFrame:
+    """Tidy (feature, year, class) table of a (n_features, n_years, n_classes) array; zero rows dropped."""
+    n_f, n_y, n_c = areas.shape
+    df = pd.DataFrame({
+        "feature": np.repeat(list(labels), n_y * n_c),
+        "year": np.tile(np.repeat([str(y) for y in years], n_c), n_f),
+        "class_key": np.tile([f"Class_{c}" for c in NLCD_CODES], n_f * n_y),
+        "area_km2": areas.ravel(),
+    })
+    df["class_label"] = df["class_key"].map(NLCD_CLASSES)
+    return df[df["area_km2"] > 0].reset_index(drop=True)
+
+
+def areas_wide_frame(areas: np.ndarray, labels, years) -> pd.DataFrame:
+    """One row per (feature, year) with total area and a km² column per present class."""
+    n_f, n_y, _ = areas.shape
+    present = areas.reshape(-1, areas.shape[-1]).any(axis=0)
+    df = pd.DataFrame(
+        areas.reshape(n_f * n_y, -1)[:, present],
+        columns=[NLCD_CLASSES[f"Class_{c}"] for c in np.asarray(NLCD_CODES)[present]],
+    )
+    df.insert(0, "Total (km²)", areas.sum(axis=-1).ravel())
+    df.insert(0, "Year", np.tile([str(y) for y in years], n_f))
+    df.insert(0, "Feature", np.repeat(list(labels), n_y))
+    return df